@@ -0,0 +1,29 @@
+from __future__ import print_function, unicode_literals
+
+import json
+
+import wee_slack
+from wee_slack import EventRouter, SlackRequest
+
+
+def test_handle_rtmstart_sets_notification_prefs(mock_websocket, mock_weechat):
+    with open("_pytest/data/http/rtm.start.json") as rtmstartfile:
+        rtmstart = json.loads(rtmstartfile.read())
+    rtmstart["self"]["prefs"]["all_notifications_prefs"] = json.dumps(
+        {
+            "channels": {"C407ABS94": {"muted": True}},
+            "global": {"global_keywords": "word1,word2"},
+        }
+    )
+
+    e = EventRouter()
+    wee_slack.EVENTROUTER = e
+    context = e.store_context(SlackRequest(None, "rtm.start", token="xoxs-token"))
+    response = "HTTP/2 200\r\n\r\n" + json.dumps(rtmstart)
+    e.receive_httprequest_callback(context, "", 0, response, "")
+    while len(e.queue):
+        e.handle_next()
+
+    team = next(iter(e.teams.values()))
+    assert team.muted_channels == {"C407ABS94"}
+    assert team.highlight_words == {"word1", "word2"}
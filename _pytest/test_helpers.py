@@ -2,7 +2,7 @@
 
 from __future__ import print_function, unicode_literals
 
-from wee_slack import url_encode_if_not_encoded
+from wee_slack import SortedDict, url_encode_if_not_encoded
 
 
 def test_should_url_encode_if_not_encoded():
@@ -15,3 +15,27 @@ def test_should_not_url_encode_if_encoded():
     value = "%3D"
     encoded = url_encode_if_not_encoded(value)
     assert encoded == value
+
+
+def test_sorted_dict_keeps_keys_sorted():
+    sorted_dict = SortedDict()
+    for key in [3, 1, 4, 2]:
+        sorted_dict[key] = str(key)
+    del sorted_dict[4]
+
+    assert list(sorted_dict.items()) == [(1, "1"), (2, "2"), (3, "3")]
+    assert next(reversed(sorted_dict)) == 3
+    assert sorted_dict.after(1) == [2, 3]
+    assert sorted_dict.before(3, inclusive=True) == [1, 2, 3]
+
+
+def test_sorted_dict_remove_from_front():
+    sorted_dict = SortedDict()
+    for key in range(10):
+        sorted_dict[key] = str(key)
+    for key in range(6):
+        del sorted_dict[key]
+
+    assert list(sorted_dict) == [6, 7, 8, 9]
+    assert list(reversed(sorted_dict)) == [9, 8, 7, 6]
+    assert sorted_dict.before(8) == [6, 7]
@@ -24,3 +24,16 @@ def test_slackts():
     assert base == "1485976156.000017"
     assert base > "1485976156.000016"
     assert base < "1485976156.000018"
+
+
+def test_slackts_key():
+    base = SlackTS("1485976156.000017")
+
+    assert base.key == 1485976156000017
+    assert base.major == 1485976156
+    assert base.minor == 17
+    assert SlackTS(base) == base
+    assert SlackTS(1485976156) == "1485976156.000000"
+    assert hash(base) == hash(SlackTS("1485976156.17"))
+    assert {base: 1}[SlackTS("1485976156.000017")] == 1
+    assert base != None  # noqa: E711
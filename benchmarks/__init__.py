@@ -0,0 +1,2 @@
+# Sets up the weechat stub and the test data, so slack can be imported
+import tests.conftest  # noqa: F401  # pyright: ignore [reportUnusedImport]
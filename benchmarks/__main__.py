@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+import benchmarks.bench_slack  # pyright: ignore [reportUnusedImport]
+from benchmarks.runner import (
+    benchmarks,
+    format_header,
+    format_result,
+    results_to_json,
+    run_benchmarks,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Run the wee-slack benchmarks. Must be run from the project root.",
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="only run benchmarks with names starting with one of these",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply the number of items in each benchmark by this",
+    )
+    parser.add_argument(
+        "--json",
+        metavar="FILE",
+        help="write the results as JSON to FILE, or stdout if FILE is -",
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, bench in benchmarks.items():
+            print(f"{name} ({bench.size})")
+        return 0
+
+    to_stdout = args.json == "-"
+    if not to_stdout:
+        print(format_header())
+    results = run_benchmarks(
+        args.names,
+        args.repeat,
+        args.scale,
+        None if to_stdout else lambda result: print(format_result(result)),
+    )
+
+    if args.json:
+        data = results_to_json(results)
+        if to_stdout:
+            json.dump(data, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w") as f:
+                json.dump(data, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
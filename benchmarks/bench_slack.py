@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, cast
+from unittest.mock import patch
+
+import weechat
+
+from benchmarks.runner import benchmark
+from slack.shared import shared
+from slack.slack_conversation import SlackConversation, SlackConversationMessageHashes
+from slack.slack_message import SlackMessage, SlackTs
+from slack.slack_workspace import SlackWorkspace
+from slack.task import run_async, weechat_task_cb
+from tests.conftest import (
+    channel_public_id,
+    create_workspace,
+    user_test1_id,
+    user_test2_id,
+)
+
+if TYPE_CHECKING:
+    from slack_api.slack_conversations_history import SlackMessage as SlackMessageDict
+
+
+def create_channel() -> SlackConversation:
+    workspace = create_workspace()
+    return workspace.conversations[channel_public_id].result()
+
+
+def message_ts(index: int) -> str:
+    return f"{1700000000 + index // 1000}.{index % 1000:06}"
+
+
+def text_message_json(index: int) -> Dict[str, Any]:
+    chunk = (
+        f"Hello <@{user_test1_id}> and <@{user_test2_id}>, see "
+        f"<#{channel_public_id}|general> and <https://example.com/{index}|link {index}>"
+        " &amp; <!here> :smile: &lt;quoted&gt;\n"
+    )
+    return {
+        "type": "message",
+        "user": user_test1_id,
+        "ts": message_ts(index),
+        "text": chunk * 10,
+    }
+
+
+def blocks_message_json(index: int) -> Dict[str, Any]:
+    section_elements: List[Dict[str, Any]] = [
+        {"type": "text", "text": "normal "},
+        {"type": "text", "text": "bold", "style": {"bold": True}},
+        {"type": "text", "text": " "},
+        {"type": "text", "text": "italic", "style": {"italic": True}},
+        {"type": "text", "text": " "},
+        {"type": "text", "text": "code", "style": {"code": True}},
+        {"type": "text", "text": " "},
+        {"type": "user", "user_id": user_test1_id},
+        {"type": "text", "text": " "},
+        {"type": "channel", "channel_id": channel_public_id},
+        {"type": "text", "text": " "},
+        {"type": "link", "url": f"https://example.com/{index}", "text": "link"},
+        {"type": "emoji", "name": "smile"},
+        {"type": "text", "text": "\n"},
+    ]
+    return {
+        "type": "message",
+        "user": user_test1_id,
+        "ts": message_ts(index),
+        "text": "",
+        "blocks": [
+            {
+                "type": "rich_text",
+                "block_id": "bench",
+                "elements": [
+                    {"type": "rich_text_section", "elements": section_elements},
+                    {
+                        "type": "rich_text_list",
+                        "style": "ordered",
+                        "indent": 0,
+                        "elements": [
+                            {"type": "rich_text_section", "elements": section_elements}
+                            for _ in range(3)
+                        ],
+                    },
+                    {"type": "rich_text_quote", "elements": section_elements},
+                    {
+                        "type": "rich_text_preformatted",
+                        "elements": [{"type": "text", "text": "code block\n" * 5}],
+                    },
+                ],
+            },
+            {"type": "divider"},
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": f"Section <@{user_test2_id}>"},
+            },
+        ],
+    }
+
+
+def attachments_message_json(index: int) -> Dict[str, Any]:
+    return {
+        "type": "message",
+        "user": user_test1_id,
+        "ts": message_ts(index),
+        "text": "",
+        "attachments": [
+            {
+                "id": attachment_id,
+                "color": "36a64f",
+                "pretext": f"Pretext <@{user_test1_id}>",
+                "author_name": "Author",
+                "author_link": "https://author.example.com",
+                "title": f"Title {index}",
+                "title_link": f"https://example.com/{index}",
+                "text": f"Attachment text <#{channel_public_id}>\nwith lines",
+                "fields": [
+                    {"title": "Priority", "value": "High", "short": True},
+                    {"title": "Status", "value": "Open", "short": True},
+                ],
+                "footer": "Footer",
+                "ts": 1700000000,
+                "fallback": "Fallback",
+            }
+            for attachment_id in range(1, 4)
+        ],
+    }
+
+
+def create_message(
+    channel: SlackConversation, message_json: Dict[str, Any]
+) -> SlackMessage:
+    return SlackMessage(channel, cast("SlackMessageDict", message_json))
+
+
+def create_messages(
+    channel: SlackConversation,
+    size: int,
+    message_json: Callable[[int], Dict[str, Any]],
+) -> List[SlackMessage]:
+    return [create_message(channel, message_json(i)) for i in range(size)]
+
+
+@benchmark("parse_message_text.text", 1000)
+def bench_parse_message_text(size: int):
+    messages = create_messages(create_channel(), size, text_message_json)
+
+    def run():
+        for message in messages:
+            message.parse_message_text(update=True)
+
+    return run
+
+
+@benchmark("parse_message_text.blocks", 1000)
+def bench_parse_message_text_blocks(size: int):
+    messages = create_messages(create_channel(), size, blocks_message_json)
+
+    def run():
+        for message in messages:
+            message.parse_message_text(update=True)
+
+    return run
+
+
+@benchmark("render_blocks", 1000)
+def bench_render_blocks(size: int):
+    messages = create_messages(create_channel(), size, blocks_message_json)
+
+    def run():
+        for message in messages:
+            message._render_blocks(message.message_json.get("blocks", []))  # pyright: ignore [reportPrivateUsage]
+
+    return run
+
+
+@benchmark("render_attachments", 1000)
+def bench_render_attachments(size: int):
+    messages = create_messages(create_channel(), size, attachments_message_json)
+
+    def run():
+        for message in messages:
+            message._render_attachments(["Text before"])  # pyright: ignore [reportPrivateUsage]
+
+    return run
+
+
+@benchmark("render_message.config_change", 1000)
+def bench_render_message_config_change(size: int):
+    channel = create_channel()
+    messages = create_messages(channel, size // 2, text_message_json)
+    messages += create_messages(channel, size - size // 2, blocks_message_json)
+    for message in messages:
+        run_async(message._render_message())  # pyright: ignore [reportPrivateUsage]
+
+    def run():
+        for render_emoji_as in ("name", "emoji"):
+            shared.config.look.render_emoji_as.value = render_emoji_as
+            for message in messages:
+                run_async(message._render_message(rerender=True))  # pyright: ignore [reportPrivateUsage]
+
+    return run
+
+
+@benchmark("render_reactions.change", 1000)
+def bench_render_reactions_change(size: int):
+    message = create_message(create_channel(), text_message_json(0))
+    shared.config.look.display_reaction_nicks.value = True
+    for i in range(30):
+        message.reaction_add(f"reaction{i}", user_test2_id)
+    run_async(message._create_reactions_string())  # pyright: ignore [reportPrivateUsage]
+
+    def run():
+        for i in range(size):
+            reaction = f"reaction{i % 30}"
+            if i % 60 < 30:
+                message.reaction_add(reaction, user_test1_id)
+            else:
+                message.reaction_remove(reaction, user_test1_id)
+            run_async(message._create_reactions_string())  # pyright: ignore [reportPrivateUsage]
+
+    return run
+
+
+@benchmark("message_hashes.insert", 10000)
+def bench_message_hashes_insert(size: int):
+    hashes = SlackConversationMessageHashes(create_channel())
+    tss = [SlackTs(message_ts(i)) for i in range(size)]
+
+    def run():
+        for ts in tss:
+            hashes[ts]
+
+    return run
+
+
+@benchmark("slackts.parse", 100000)
+def bench_slackts_parse(size: int):
+    tss = [message_ts(i) for i in range(size)]
+
+    def run():
+        for ts in tss:
+            SlackTs(ts)
+
+    return run
+
+
+@benchmark("slackts.sort", 100000)
+def bench_slackts_sort(size: int):
+    tss = [SlackTs(message_ts((i * 7919) % size)) for i in range(size)]
+
+    def run():
+        sorted(tss)
+
+    return run
+
+
+@benchmark("slackts.compare_str", 100000)
+def bench_slackts_compare_str(size: int):
+    tss = [SlackTs(message_ts(i)) for i in range(size)]
+    other = message_ts(size // 2)
+
+    def run():
+        for ts in tss:
+            ts < other  # noqa: B015  # pyright: ignore [reportUnusedExpression]
+
+    return run
+
+
+def create_ws_events(size: int) -> List[Dict[str, Any]]:
+    events: List[Dict[str, Any]] = []
+    for i in range(size):
+        kind = i % 4
+        if kind == 0:
+            events.append(
+                {**text_message_json(i), "channel": channel_public_id, "text": "hi"}
+            )
+        elif kind == 1:
+            events.append(
+                {
+                    "type": "reaction_added",
+                    "user": user_test2_id,
+                    "reaction": "smile",
+                    "item": {
+                        "type": "message",
+                        "channel": channel_public_id,
+                        "ts": message_ts(i - 1),
+                    },
+                    "event_ts": message_ts(i),
+                }
+            )
+        elif kind == 2:
+            events.append(
+                {
+                    "type": "channel_marked",
+                    "channel": channel_public_id,
+                    "ts": message_ts(i),
+                }
+            )
+        else:
+            events.append({"type": "pong", "reply_to": i})
+    return events
+
+
+def open_channel(workspace: SlackWorkspace) -> SlackConversation:
+    channel = workspace.conversations[channel_public_id].result()
+    workspace.open_conversations[channel.id] = channel
+    return channel
+
+
+@benchmark("ws_recv.dispatch", 10000)
+def bench_ws_recv_dispatch(size: int):
+    workspace = create_workspace()
+    open_channel(workspace)
+    events = create_ws_events(size)
+
+    def run():
+        for event in events:
+            run_async(workspace.ws_recv(event))  # pyright: ignore [reportArgumentType]
+
+    return run
+
+
+@benchmark("reactions.burst", 2000)
+def bench_reactions_burst(size: int):
+    channel = create_channel()
+    channel._buffer_pointer = "0x1"  # pyright: ignore [reportPrivateUsage]
+    message = create_message(channel, text_message_json(0))
+    channel._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+    timer_futures: List[str] = []
+
+    def hook_timer(*args: object):
+        timer_futures.append(str(args[-1]))
+
+    def run():
+        with patch.object(weechat, "hook_timer", hook_timer):
+            for i in range(size):
+                reaction = f"reaction{i % 20}"
+                run_async(channel.reaction_add(message.ts, reaction, user_test2_id))
+            while timer_futures:
+                weechat_task_cb(timer_futures.pop(), 0)
+
+    return run
@@ -0,0 +1,184 @@
+# Generated responses for the Slack API methods used when connecting and
+# receiving events, based on the test data in mock_data. Used both in process
+# by benchmarks.rtm_load and over HTTP by benchmarks.stub_server.
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple, cast
+from urllib.parse import parse_qsl, urlparse
+
+from tests.conftest import (
+    channel_public_info,
+    user_test1_info,
+    user_test2_info,
+    workspace_id,
+)
+
+SlackObject = Dict[str, Any]
+
+ALL_NOTIFICATIONS_PREFS = json.dumps(
+    {"channels": {}, "global": {"global_keywords": ""}}
+)
+
+
+class FakeSlackApi:
+    def __init__(
+        self,
+        num_channels: int = 1,
+        num_users: int = 2,
+        history_size: int = 50,
+        ws_url: str = "",
+    ):
+        self.history_size = history_size
+        self.ws_url = ws_url
+        self.requests: Dict[str, int] = {}
+        self.self_user = user_test1_info
+        # The test data is typed, but the generated objects are plain dicts
+        self.users: List[SlackObject] = [
+            cast(SlackObject, user_test1_info),
+            cast(SlackObject, user_test2_info),
+        ]
+        self.users += [self.user(f"UGEN{i:07}") for i in range(num_users - 2)]
+        self.channels: List[SlackObject] = [cast(SlackObject, channel_public_info)]
+        self.channels += [self.channel(f"CGEN{i:07}") for i in range(num_channels - 1)]
+
+    @property
+    def user_ids(self) -> List[str]:
+        return [user["id"] for user in self.users]
+
+    @property
+    def channel_ids(self) -> List[str]:
+        return [channel["id"] for channel in self.channels]
+
+    def user(self, user_id: str) -> SlackObject:
+        name = user_id.lower()
+        return {
+            **user_test2_info,
+            "id": user_id,
+            "name": name,
+            "profile": {**user_test2_info["profile"], "display_name": name},
+        }
+
+    def channel(self, channel_id: str) -> SlackObject:
+        name = channel_id.lower()
+        return {**channel_public_info, "id": channel_id, "name": name}
+
+    def message(self, ts: str, text: str, **kwargs: Any) -> SlackObject:
+        user_id = self.users[int(ts.split(".")[1]) % len(self.users)]["id"]
+        return {"type": "message", "user": user_id, "text": text, "ts": ts, **kwargs}
+
+    def _team(self) -> SlackObject:
+        return {"id": workspace_id, "name": "Stub", "domain": "stub"}
+
+    # Returns the HTTP status and body for a request to url, which can be for
+    # either the API or the edge API
+    def response(self, url: str, postfields: str) -> Tuple[int, str]:
+        parsed_url = urlparse(url)
+        path = parsed_url.path
+        if path.startswith("/cache/"):
+            method = path.split("/", 3)[-1]
+        else:
+            method = path.rsplit("/", 1)[-1]
+        params = dict(parse_qsl(parsed_url.query))
+        if postfields.startswith("{"):
+            params.update(json.loads(postfields))
+        else:
+            params.update(parse_qsl(postfields))
+        self.requests[method] = self.requests.get(method, 0) + 1
+
+        body = self.method_response(method, params)
+        if body is None:
+            return 404, json.dumps({"ok": False, "error": "unknown_method"})
+        return 200, json.dumps({"ok": True, **body})
+
+    def method_response(
+        self, method: str, params: Dict[str, Any]
+    ) -> Optional[SlackObject]:
+        if method == "rtm.connect":
+            return {
+                "url": self.ws_url,
+                "team": self._team(),
+                "self": {"id": self.self_user["id"], "name": self.self_user["name"]},
+            }
+        elif method == "team.info":
+            return {"team": self._team()}
+        elif method == "users.info":
+            if "user" in params:
+                return {"user": self.user(params["user"])}
+            return {"users": [self.user(u) for u in params["users"].split(",")]}
+        elif method == "bots.info":
+            return {"bot": {"id": params["bot"], "name": "bot", "deleted": False}}
+        elif method == "conversations.info":
+            return {"channel": self.channel(params["channel"])}
+        elif method == "conversations.history":
+            limit = min(int(params.get("limit", 100)), self.history_size)
+            messages = [
+                self.message(f"1700000000.{i:06}", f"history message {i}")
+                for i in range(limit, 0, -1)
+            ]
+            return {"messages": messages, "has_more": False}
+        elif method == "conversations.replies":
+            thread_ts = params["ts"]
+            parent = self.message(
+                thread_ts, "thread parent", thread_ts=thread_ts, reply_count=3
+            )
+            replies = [
+                self.message(f"1700000001.{i:06}", f"reply {i}", thread_ts=thread_ts)
+                for i in range(1, 4)
+            ]
+            return {"messages": [parent, *replies], "has_more": False}
+        elif method == "conversations.members":
+            return {
+                "members": self.user_ids,
+                "response_metadata": {"next_cursor": ""},
+            }
+        elif method == "users.conversations":
+            return {
+                "channels": self.channels,
+                "response_metadata": {"next_cursor": ""},
+            }
+        elif method == "users.prefs.get":
+            return {"prefs": {"all_notifications_prefs": ALL_NOTIFICATIONS_PREFS}}
+        elif method == "usergroups.list":
+            return {"usergroups": []}
+        elif method == "emoji.list":
+            return {"emoji": {}}
+        elif method == "client.userBoot":
+            return {
+                "self": self.self_user,
+                "team": self._team(),
+                "ims": [],
+                "is_open": [],
+                "prefs": {"all_notifications_prefs": ALL_NOTIFICATIONS_PREFS},
+                "subteams": {"self": []},
+                "starred": [],
+                "channels_priority": {},
+                "read_only_channels": [],
+                "non_threadable_channels": [],
+                "thread_only_channels": [],
+                "channels": self.channels,
+            }
+        elif method == "client.counts":
+            counts = [
+                {
+                    "id": channel["id"],
+                    "last_read": "1700000000.000001",
+                    "latest": f"1700000000.{self.history_size:06}",
+                    "updated": "1700000000.000001",
+                    "history_invalid": "0000000000.000000",
+                    "mention_count": 0,
+                    "has_unreads": True,
+                }
+                for channel in self.channels
+            ]
+            return {
+                "threads": {"has_unreads": False, "mention_count": 0},
+                "channels": counts,
+                "mpims": [],
+                "ims": [],
+            }
+        elif "/" in method:
+            # Edge API methods
+            return {"results": []}
+        elif "." in method:
+            return {}
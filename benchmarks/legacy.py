@@ -0,0 +1,98 @@
+# Sets up the legacy wee_slack.py script with a fake weechat, in the same way as
+# the fixtures in _pytest/conftest.py
+from __future__ import annotations
+
+import random
+import string
+from typing import Any, Dict
+
+import wee_slack as wee_slack_module
+
+# wee_slack.py has no type annotations, and many of its globals are only set
+# when it's loaded by WeeChat, so use it untyped
+wee_slack: Any = wee_slack_module
+
+
+class LegacyFakeWeechat:
+    WEECHAT_RC_ERROR = 0
+    WEECHAT_RC_OK = 1
+    WEECHAT_RC_OK_EAT = 2
+
+    def __init__(self):
+        self.config: Dict[str, str] = {}
+
+    def hdata_get(self, *args: Any):
+        return "0x000001"
+
+    def hdata_integer(self, *args: Any):
+        return 1
+
+    def hdata_pointer(self, *args: Any):
+        return "0x000002"
+
+    def hdata_time(self, *args: Any):
+        return "1355517519"
+
+    def hdata_string(self, *args: Any):
+        return "testuser"
+
+    def buffer_new(self, *args: Any):
+        return "0x" + "".join(random.choice(string.digits) for _ in range(8))
+
+    def prefix(self, type: str):
+        return ""
+
+    def config_get_plugin(self, key: str):
+        return self.config.get(key, "")
+
+    def config_get(self, key: str):
+        return ""
+
+    def config_integer(self, key: str):
+        return 1000
+
+    def config_set_plugin(self, key: str, value: str):
+        self.config[key] = value
+
+    def config_string(self, key: str):
+        return ""
+
+    def color(self, name: str):
+        return f"<[color {name}]>"
+
+    def info_get(self, info_name: str, arguments: str):
+        if info_name == "color_rgb2term":
+            return arguments
+        elif info_name == "weechat_data_dir":
+            return "."
+        else:
+            return ""
+
+    def __getattr__(self, name: str):
+        def method(*args: Any):
+            pass
+
+        return method
+
+
+def create_legacy_eventrouter() -> Any:
+    wee_slack.w = LegacyFakeWeechat()
+    wee_slack.config = wee_slack.PluginConfig()
+    wee_slack.hdata = wee_slack.Hdata(wee_slack.w)
+    wee_slack.debug_string = None
+    wee_slack.slack_debug = "debug_buffer_ptr"
+    wee_slack.STOP_TALKING_TO_SLACK = False
+    wee_slack.proc = {}
+    wee_slack.weechat_version = 0x10500000
+
+    eventrouter = wee_slack.EventRouter()
+    wee_slack.EVENTROUTER = eventrouter
+    context = eventrouter.store_context(
+        wee_slack.SlackRequest(None, "rtm.start", token="xoxs-token")
+    )
+    with open("_pytest/data/http/rtm.start.json") as f:
+        response = "HTTP/2 200\r\n\r\n" + f.read()
+    eventrouter.receive_httprequest_callback(context, "", 0, response, "")
+    while eventrouter.queue:
+        eventrouter.handle_next()
+    return eventrouter
@@ -0,0 +1,135 @@
+# Measures the memory retained per message, user and nick with tracemalloc.
+# Messages are added to a conversation, parsed and rendered, so the result
+# includes the parsed and rendered state which is kept for each message.
+#
+# Run with `python -m benchmarks.memory --help` from the project root.
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench_slack import (
+    attachments_message_json,
+    blocks_message_json,
+    create_channel,
+    text_message_json,
+)
+from slack.shared import shared
+from slack.slack_conversation import SlackConversation
+from slack.slack_message import SlackMessage
+from slack.slack_user import SlackUser, get_user_nick
+from slack.task import run_async
+from tests.conftest import user_test2_info
+
+
+@dataclass
+class MemoryResult:
+    name: str
+    count: int
+    bytes_per_item: float
+
+
+def measure(name: str, count: int, create: Callable[[int], object]) -> MemoryResult:
+    gc.collect()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    retained = [create(i) for i in range(count)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    if not was_tracing:
+        tracemalloc.stop()
+    # The list holding the items isn't part of what is retained per item
+    retained_bytes = after - before - sys.getsizeof(retained)
+    return MemoryResult(name, count, retained_bytes / count)
+
+
+def add_message(
+    channel: SlackConversation, message_json: Callable[[int], Dict[str, Any]]
+) -> Callable[[int], object]:
+    def create(index: int) -> object:
+        # Round trip through json, so nothing is shared between the messages,
+        # like when they are received from the API
+        message = SlackMessage(channel, json.loads(json.dumps(message_json(index))))
+        channel._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+        run_async(message.render(channel.context))
+        return None
+
+    return create
+
+
+def measure_messages(count: int) -> List[MemoryResult]:
+    message_types = {
+        "text": text_message_json,
+        "blocks": blocks_message_json,
+        "attachments": attachments_message_json,
+    }
+    results: List[MemoryResult] = []
+    for compact in [False, True]:
+        for name, message_json in message_types.items():
+            channel = create_channel()
+            shared.config.look.compact_messages.value = compact
+            # Render one message first so caches which are shared between the
+            # messages aren't counted
+            add_message(channel, message_json)(count)
+            result_name = f"message.{name}" + (".compact" if compact else "")
+            create = add_message(channel, message_json)
+            results.append(measure(result_name, count, create))
+    return results
+
+
+def measure_users(count: int) -> List[MemoryResult]:
+    workspace = create_channel().workspace
+
+    def create_user(index: int) -> SlackUser:
+        info = json.loads(json.dumps(user_test2_info))
+        info["id"] = f"UMEM{index:07}"
+        return SlackUser(workspace, info)
+
+    def create_nick(index: int) -> object:
+        return get_user_nick(f"nick{index}", is_external=False, is_self=False)
+
+    return [
+        measure("user", count, create_user),
+        measure("nick", count, create_nick),
+    ]
+
+
+def format_result(result: MemoryResult) -> str:
+    return f"{result.name:<40} {result.count:>7} {result.bytes_per_item:>12.0f}"
+
+
+def format_header() -> str:
+    return f"{'name':<40} {'count':>7} {'bytes/item':>12}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.memory",
+        description="Measure the memory retained per message, user and nick. "
+        "Must be run from the project root.",
+    )
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--json", metavar="FILE", help="write results as json")
+    args = parser.parse_args()
+
+    print(format_header())
+    results = measure_messages(args.messages) + measure_users(args.users)
+    for result in results:
+        print(format_result(result))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
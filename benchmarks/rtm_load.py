@@ -0,0 +1,578 @@
+# Generates synthetic RTM event streams and replays them through the event
+# handling of both the slack package and the legacy wee_slack.py script,
+# reporting throughput, per event latency and memory growth.
+#
+# Run with `python -m benchmarks.rtm_load --help` from the project root.
+from __future__ import annotations
+
+import argparse
+import copy
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import weechat
+
+from benchmarks.fake_slack_api import FakeSlackApi
+from benchmarks.legacy import create_legacy_eventrouter, wee_slack
+from benchmarks.runner import results_to_json
+from slack.shared import shared
+from slack.slack_conversation import SlackConversation
+from slack.slack_message import SlackTs
+from slack.slack_workspace import SlackWorkspace
+from slack.task import create_task, weechat_task_cb
+from slack.util import get_callback_name
+from tests.conftest import channel_public_id, create_workspace
+
+RtmEvent = Dict[str, Any]
+
+DEFAULT_EVENT_MIX: Dict[str, float] = {
+    "message": 40,
+    "message_changed": 10,
+    "reaction_added": 20,
+    "reaction_removed": 5,
+    "user_typing": 15,
+    "thread_marked": 5,
+    "presence_change": 5,
+}
+
+
+def parse_event_mix(value: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in value.split(","):
+        name, weight = part.split("=", maxsplit=1)
+        if name not in DEFAULT_EVENT_MIX:
+            raise ValueError(f"Unknown event type: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+class RtmEventGenerator:
+    def __init__(
+        self,
+        channel_ids: List[str],
+        user_ids: List[str],
+        mix: Dict[str, float] = DEFAULT_EVENT_MIX,
+        unknown_user_ratio: float = 0.0,
+        thread_reply_ratio: float = 0.1,
+        seed: int = 0,
+        start_time: int = 1700000000,
+    ):
+        self.channel_ids = channel_ids
+        self.user_ids = user_ids
+        self.unknown_user_ratio = unknown_user_ratio
+        self.thread_reply_ratio = thread_reply_ratio
+        self._event_types = list(mix)
+        self._weights = [mix[event_type] for event_type in self._event_types]
+        self._random = random.Random(seed)
+        self._time = start_time
+        self._counter = 0
+        self._unknown_users = 0
+        # Recent messages per channel, as (ts, message json), which edits,
+        # reactions and thread replies refer to
+        self._messages: Dict[str, List[Tuple[str, RtmEvent]]] = {
+            channel_id: [] for channel_id in channel_ids
+        }
+        self._reactions: List[Tuple[str, str, str, str]] = []
+
+    def _next_ts(self) -> str:
+        self._counter += 1
+        if self._counter % 1000 == 0:
+            self._time += 1
+        return f"{self._time}.{self._counter % 1000000:06}"
+
+    def _user(self) -> str:
+        if self._random.random() < self.unknown_user_ratio:
+            self._unknown_users += 1
+            return f"UGEN{self._unknown_users:07}"
+        return self._random.choice(self.user_ids)
+
+    def _text(self) -> str:
+        words = ["lorem", "ipsum", "dolor", "sit", "amet", ":smile:", "&amp;"]
+        text = " ".join(self._random.choice(words) for _ in range(12))
+        if self._random.random() < 0.2:
+            text += f" <@{self._random.choice(self.user_ids)}>"
+        if self._random.random() < 0.1:
+            text += " <https://example.com|a link>"
+        return text
+
+    def _recent_message(self, channel_id: str) -> Optional[Tuple[str, RtmEvent]]:
+        messages = self._messages[channel_id]
+        if not messages:
+            return None
+        return messages[-1 - int(self._random.random() ** 3 * len(messages))]
+
+    def _message(self, channel_id: str) -> RtmEvent:
+        ts = self._next_ts()
+        event: RtmEvent = {
+            "type": "message",
+            "channel": channel_id,
+            "user": self._user(),
+            "text": self._text(),
+            "ts": ts,
+            "event_ts": ts,
+        }
+        parent = self._recent_message(channel_id)
+        if parent and self._random.random() < self.thread_reply_ratio:
+            event["thread_ts"] = parent[1].get("thread_ts", parent[0])
+        messages = self._messages[channel_id]
+        messages.append((ts, event))
+        if len(messages) > 200:
+            del messages[0]
+        return event
+
+    def _message_changed(self, channel_id: str) -> RtmEvent:
+        target = self._recent_message(channel_id)
+        if target is None:
+            return self._message(channel_id)
+        ts, message = target
+        event_ts = self._next_ts()
+        message = {
+            **{key: value for key, value in message.items() if key != "channel"},
+            "text": self._text(),
+            "edited": {"user": message["user"], "ts": event_ts},
+        }
+        return {
+            "type": "message",
+            "subtype": "message_changed",
+            "hidden": True,
+            "channel": channel_id,
+            "ts": ts,
+            "event_ts": event_ts,
+            "message": message,
+        }
+
+    def _reaction_added(self, channel_id: str) -> RtmEvent:
+        target = self._recent_message(channel_id)
+        if target is None:
+            return self._message(channel_id)
+        reaction = self._random.choice(["+1", "smile", "tada", "eyes", "heart"])
+        user_id = self._random.choice(self.user_ids)
+        self._reactions.append((channel_id, target[0], reaction, user_id))
+        return {
+            "type": "reaction_added",
+            "user": user_id,
+            "reaction": reaction,
+            "item": {"type": "message", "channel": channel_id, "ts": target[0]},
+            "event_ts": self._next_ts(),
+        }
+
+    def _reaction_removed(self, channel_id: str) -> RtmEvent:
+        if not self._reactions:
+            return self._reaction_added(channel_id)
+        index = self._random.randrange(len(self._reactions))
+        channel_id, ts, reaction, user_id = self._reactions.pop(index)
+        return {
+            "type": "reaction_removed",
+            "user": user_id,
+            "reaction": reaction,
+            "item": {"type": "message", "channel": channel_id, "ts": ts},
+            "event_ts": self._next_ts(),
+        }
+
+    def _user_typing(self, channel_id: str) -> RtmEvent:
+        return {"type": "user_typing", "channel": channel_id, "user": self._user()}
+
+    def _thread_marked(self, channel_id: str) -> RtmEvent:
+        target = self._recent_message(channel_id)
+        if target is None:
+            return self._message(channel_id)
+        thread_ts = target[1].get("thread_ts", target[0])
+        return {
+            "type": "thread_marked",
+            "subscription": {
+                "type": "thread",
+                "channel": channel_id,
+                "thread_ts": thread_ts,
+                "last_read": target[0],
+                "active": True,
+                "date_create": self._time,
+            },
+            "event_ts": self._next_ts(),
+        }
+
+    def _presence_change(self, channel_id: str) -> RtmEvent:
+        return {
+            "type": "presence_change",
+            "users": self._random.sample(
+                self.user_ids, self._random.randint(1, len(self.user_ids))
+            ),
+            "presence": self._random.choice(["active", "away"]),
+        }
+
+    def event(self) -> RtmEvent:
+        event_type = self._random.choices(self._event_types, self._weights)[0]
+        channel_id = self._random.choice(self.channel_ids)
+        generate: Callable[[str], RtmEvent] = getattr(self, f"_{event_type}")
+        return generate(channel_id)
+
+    def events(self, count: int) -> Iterator[RtmEvent]:
+        for _ in range(count):
+            yield self.event()
+
+
+def read_events(path: str) -> List[RtmEvent]:
+    # Uses the same format as /slack debug replay_events, so captured debug
+    # output can be replayed
+    events: List[RtmEvent] = []
+    with open(path) as f:
+        for line in f:
+            first_brace_pos = line.find("{")
+            if first_brace_pos != -1:
+                events.append(json.loads(line[first_brace_pos:]))
+    return events
+
+
+def write_events(path: str, events: List[RtmEvent]):
+    with open(path, "w") as f:
+        f.writelines(json.dumps(event) + "\n" for event in events)
+
+
+# Stands in for the WeeChat main loop. HTTP requests and timers started by the
+# slack package are queued, and run_until_idle completes them in order, with
+# the responses from FakeSlackApi. Timers complete at once without waiting, so
+# client side rate limiting doesn't add to the measured time.
+class FakeEventLoop:
+    def __init__(self, api: FakeSlackApi):
+        self.api = api
+        self.pending: List[Tuple[str, Tuple[object, ...]]] = []
+        self.timers = 0
+
+    def hook_url(
+        self,
+        url: str,
+        options: Dict[str, str],
+        timeout: int,
+        callback: str,
+        callback_data: str,
+    ) -> str:
+        status, body = self.api.response(url, options.get("postfields", ""))
+        output = {"response_code": str(status), "headers": "", "output": body}
+        self.pending.append((callback_data, (url, options, output)))
+        return ""
+
+    def hook_timer(
+        self,
+        interval: int,
+        align_second: int,
+        max_calls: int,
+        callback: str,
+        callback_data: str,
+    ) -> str:
+        # Only timers used for sleep are completed, periodic timers are ignored
+        if callback == get_callback_name(weechat_task_cb):
+            self.timers += 1
+            self.pending.append((callback_data, (0,)))
+        return ""
+
+    def run_until_idle(self):
+        while self.pending:
+            callback_data, args = self.pending.pop(0)
+            weechat_task_cb(callback_data, *args)
+
+    def buffer_get_string(self, buffer: str, property: str) -> str:
+        return ""
+
+    @contextmanager
+    def installed(self):
+        original = weechat.hook_url, weechat.hook_timer, weechat.buffer_get_string
+        weechat.hook_url = self.hook_url
+        weechat.hook_timer = self.hook_timer
+        weechat.buffer_get_string = self.buffer_get_string
+        try:
+            yield
+        finally:
+            (
+                weechat.hook_url,
+                weechat.hook_timer,
+                weechat.buffer_get_string,
+            ) = original
+
+
+class FakeLegacyHttp:
+    def __init__(self, api: FakeSlackApi):
+        self.api = api
+        self.pending: List[Tuple[str, str]] = []
+
+    def hook_process_hashtable(
+        self,
+        command: str,
+        options: Dict[str, str],
+        timeout: int,
+        callback: str,
+        callback_data: str,
+    ):
+        url = command[len("url:") :]
+        status, body = self.api.response(url, options.get("postfields", ""))
+        self.pending.append((callback_data, f"HTTP/2 {status}\r\n\r\n{body}"))
+
+
+@dataclass
+class LoadResult:
+    name: str
+    events: int
+    seconds: float
+    events_per_second: float
+    latency_p50_ms: float
+    latency_p99_ms: float
+    latency_max_ms: float
+    memory_growth_kb: float
+    api_requests: Dict[str, int] = field(default_factory=lambda: {})
+    errors: int = 0
+
+
+def percentile(sorted_values: List[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percentile))
+    return sorted_values[index]
+
+
+def current_memory_kb() -> float:
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0] / 1024
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_load(
+    name: str,
+    events: List[RtmEvent],
+    handle_event: Callable[[RtmEvent], bool],
+    api: FakeSlackApi,
+    rate: float = 0,
+) -> LoadResult:
+    latencies: List[float] = []
+    errors = 0
+    gc.collect()
+    memory_before = current_memory_kb()
+    start = time.perf_counter()
+    for i, event in enumerate(events):
+        scheduled = start + i / rate if rate > 0 else time.perf_counter()
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if not handle_event(event):
+            errors += 1
+        latencies.append(time.perf_counter() - scheduled)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    memory_growth = current_memory_kb() - memory_before
+
+    latencies.sort()
+    return LoadResult(
+        name=name,
+        events=len(events),
+        seconds=seconds,
+        events_per_second=len(events) / seconds if seconds > 0 else float("inf"),
+        latency_p50_ms=percentile(latencies, 0.5) * 1000,
+        latency_p99_ms=percentile(latencies, 0.99) * 1000,
+        latency_max_ms=latencies[-1] * 1000 if latencies else 0.0,
+        memory_growth_kb=memory_growth,
+        api_requests=dict(api.requests),
+        errors=errors,
+    )
+
+
+def open_conversation(workspace: SlackWorkspace, conversation_id: str):
+    conversation: SlackConversation = workspace.conversations[conversation_id].result()
+    workspace.open_conversations[conversation.id] = conversation
+    # Pretend there's a buffer, so messages are rendered and printed to the
+    # weechat stub like they would be in a real session
+    conversation._buffer_pointer = "0x1"  # pyright: ignore [reportPrivateUsage]
+    conversation.last_printed_ts = SlackTs("0.0")
+    return conversation
+
+
+def run_slack_load(
+    generator_args: Dict[str, Any],
+    count: int,
+    rate: float,
+    events: Optional[List[RtmEvent]] = None,
+) -> LoadResult:
+    workspace = create_workspace()
+    open_conversation(workspace, channel_public_id)
+    if events is None:
+        generator = RtmEventGenerator(
+            [channel_public_id],
+            [str(user_id) for user_id in workspace.users],
+            **generator_args,
+        )
+        events = list(generator.events(count))
+
+    api = FakeSlackApi()
+    loop = FakeEventLoop(api)
+
+    def handle_event(event: RtmEvent) -> bool:
+        # ws_recv catches and stores errors itself, so check if any was added
+        num_errors = len(shared.uncaught_errors)
+        task = create_task(workspace.ws_recv(event))  # pyright: ignore [reportArgumentType]
+        loop.run_until_idle()
+        return (
+            task.done()
+            and task.exception() is None
+            and len(shared.uncaught_errors) == num_errors
+        )
+
+    with loop.installed():
+        return run_load("slack", events, handle_event, api, rate)
+
+
+def run_legacy_load(
+    generator_args: Dict[str, Any],
+    count: int,
+    rate: float,
+    events: Optional[List[RtmEvent]] = None,
+) -> LoadResult:
+    eventrouter = create_legacy_eventrouter()
+    team = next(iter(eventrouter.teams.values()))
+    if events is None:
+        channel_ids = [
+            channel_id
+            for channel_id, channel in team.channels.items()
+            if channel.active
+        ]
+        generator = RtmEventGenerator(channel_ids, list(team.users), **generator_args)
+        events = list(generator.events(count))
+
+    api = FakeSlackApi()
+    http = FakeLegacyHttp(api)
+    wee_slack.w.hook_process_hashtable = http.hook_process_hashtable
+
+    def handle_event(event: RtmEvent) -> bool:
+        event = {**event, "wee_slack_metadata_team": team}
+        eventrouter.receive(event)
+        try:
+            while eventrouter.queue or http.pending:
+                while eventrouter.queue:
+                    eventrouter.handle_next()
+                while http.pending:
+                    context, response = http.pending.pop(0)
+                    eventrouter.receive_httprequest_callback(
+                        context, "", 0, response, ""
+                    )
+        except Exception:
+            eventrouter.queue.clear()
+            return False
+        return True
+
+    return run_load("legacy", events, handle_event, api, rate)
+
+
+def format_load_result(result: LoadResult) -> str:
+    return (
+        f"{result.name:<8} {result.events:>8} {result.events_per_second:>10.0f} "
+        f"{result.latency_p50_ms:>8.3f} {result.latency_p99_ms:>8.3f} "
+        f"{result.latency_max_ms:>8.2f} {result.memory_growth_kb:>10.0f} "
+        f"{result.errors:>6}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.rtm_load",
+        description="Replay synthetic RTM events through the event handling. "
+        "Must be run from the project root.",
+    )
+    parser.add_argument("--target", choices=["slack", "legacy", "both"], default="both")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="events per second to send, 0 to send them as fast as possible",
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_event_mix,
+        default=DEFAULT_EVENT_MIX,
+        help="relative weights of the event types, e.g. message=50,reaction_added=20 "
+        f"(default: {','.join(f'{k}={v:g}' for k, v in DEFAULT_EVENT_MIX.items())})",
+    )
+    parser.add_argument(
+        "--unknown-users",
+        type=float,
+        default=0.01,
+        help="ratio of messages and typing events from users which must be "
+        "fetched from the API",
+    )
+    parser.add_argument("--thread-replies", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--input",
+        metavar="FILE",
+        help="replay the events in FILE instead of generating them "
+        "(same format as /slack debug replay_events)",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="write the generated events for the slack target to FILE",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="measure memory growth with tracemalloc instead of RSS (slower)",
+    )
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = parser.parse_args()
+
+    generator_args: Dict[str, Any] = {
+        "mix": args.mix,
+        "unknown_user_ratio": args.unknown_users,
+        "thread_reply_ratio": args.thread_replies,
+        "seed": args.seed,
+    }
+    events = read_events(args.input) if args.input else None
+    if args.output:
+        workspace = create_workspace()
+        generator = RtmEventGenerator(
+            [channel_public_id], list(workspace.users), **generator_args
+        )
+        write_events(args.output, list(generator.events(args.events)))
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    print(
+        f"{'target':<8} {'events':>8} {'events/s':>10} {'p50 ms':>8} "
+        f"{'p99 ms':>8} {'max ms':>8} {'memory kB':>10} {'errors':>6}"
+    )
+    results: List[LoadResult] = []
+    if args.target in ["slack", "both"]:
+        results.append(
+            run_slack_load(
+                generator_args, args.events, args.rate, copy.deepcopy(events)
+            )
+        )
+        print(format_load_result(results[-1]))
+    if args.target in ["legacy", "both"]:
+        results.append(
+            run_legacy_load(
+                generator_args, args.events, args.rate, copy.deepcopy(events)
+            )
+        )
+        print(format_load_result(results[-1]))
+
+    if args.json:
+        data = results_to_json([])
+        data["results"] = [asdict(result) for result in results]
+        data["options"] = {**generator_args, "events": args.events, "rate": args.rate}
+        with open(args.json, "w") as f:
+            json.dump(data, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
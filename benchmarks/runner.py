@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+# A benchmark gets the number of items to generate, does its setup and
+# returns a function which processes all the items once
+BenchmarkSetup = Callable[[int], Callable[[], None]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: BenchmarkSetup
+    size: int
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    size: int
+    repeat: int
+    min_seconds: float
+    median_seconds: float
+    mean_seconds: float
+    ops_per_second: float
+
+
+benchmarks: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, size: int):
+    def decorator(setup: BenchmarkSetup) -> BenchmarkSetup:
+        benchmarks[name] = Benchmark(name, setup, size)
+        return setup
+
+    return decorator
+
+
+def run_benchmark(bench: Benchmark, repeat: int, scale: float = 1.0) -> BenchmarkResult:
+    size = max(1, int(bench.size * scale))
+    timings: List[float] = []
+    for _ in range(repeat):
+        # Each repeat gets fresh state, so e.g. inserts doesn't turn into lookups
+        run = bench.setup(size)
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return BenchmarkResult(
+        name=bench.name,
+        size=size,
+        repeat=repeat,
+        min_seconds=min(timings),
+        median_seconds=median,
+        mean_seconds=statistics.mean(timings),
+        ops_per_second=size / median if median > 0 else float("inf"),
+    )
+
+
+def run_benchmarks(
+    names: Optional[List[str]] = None,
+    repeat: int = 5,
+    scale: float = 1.0,
+    progress: Optional[Callable[[BenchmarkResult], None]] = None,
+) -> List[BenchmarkResult]:
+    results: List[BenchmarkResult] = []
+    for name, bench in benchmarks.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        result = run_benchmark(bench, repeat, scale)
+        if progress is not None:
+            progress(result)
+        results.append(result)
+    return results
+
+
+def results_to_json(results: List[BenchmarkResult]) -> Dict[str, object]:
+    return {
+        "time": time.time(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "results": [asdict(result) for result in results],
+    }
+
+
+def format_result(result: BenchmarkResult) -> str:
+    return (
+        f"{result.name:<40} {result.size:>7} "
+        f"{result.median_seconds * 1000:>10.2f} {result.ops_per_second:>12.0f}"
+    )
+
+
+def format_header() -> str:
+    return f"{'name':<40} {'size':>7} {'median ms':>10} {'ops/s':>12}"
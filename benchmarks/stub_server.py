@@ -0,0 +1,370 @@
+# A local stand-in for the Slack API and RTM websocket, serving generated data
+# from FakeSlackApi, with injectable latency, rate limiting and server errors.
+# Point a workspace to it with the api_base_url option to test or benchmark
+# connecting, reconnecting and rate limit handling without a live Slack.
+#
+# Run with `python -m benchmarks.stub_server --help` from the project root.
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from benchmarks.fake_slack_api import FakeSlackApi
+from benchmarks.rtm_load import DEFAULT_EVENT_MIX, RtmEventGenerator, parse_event_mix
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+@dataclass
+class StubFaults:
+    latency_ms: float = 0
+    latency_jitter_ms: float = 0
+    ratelimit_ratio: float = 0
+    retry_after: int = 1
+    server_error_ratio: float = 0
+
+
+@dataclass
+class StubRtmOptions:
+    events_per_second: float = 0
+    mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_EVENT_MIX))
+    unknown_user_ratio: float = 0.01
+    # Close websocket connections after this many seconds, 0 to keep them open
+    disconnect_after: float = 0
+    fast_reconnect: bool = False
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    ratelimited: int = 0
+    server_errors: int = 0
+    ws_connections: int = 0
+    ws_events_sent: int = 0
+    ws_messages_received: int = 0
+
+
+def encode_frame(opcode: int, payload: bytes) -> bytes:
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 2**16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+def _recv_exactly(sock: socket.socket, length: int) -> bytes:
+    data = b""
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError("Websocket closed by client")
+        data += chunk
+    return data
+
+
+def decode_frame(sock: socket.socket) -> Tuple[int, bytes]:
+    first, second = _recv_exactly(sock, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exactly(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exactly(sock, 8))[0]
+    mask = _recv_exactly(sock, 4) if second & 0x80 else None
+    payload = _recv_exactly(sock, length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return opcode, payload
+
+
+class StubSlackServer:
+    def __init__(
+        self,
+        api: Optional[FakeSlackApi] = None,
+        faults: Optional[StubFaults] = None,
+        rtm: Optional[StubRtmOptions] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        self.api = api or FakeSlackApi()
+        self.faults = faults or StubFaults()
+        self.rtm = rtm or StubRtmOptions()
+        self.stats = StubStats()
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.handle_request(self)
+
+            def do_POST(self):
+                server.handle_request(self)
+
+            def log_message(self, format: str, *args: object):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.api.ws_url = f"{self.ws_url}/websocket"
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ws_url(self) -> str:
+        return "ws" + self.url[len("http") :]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _send(
+        self,
+        handler: BaseHTTPRequestHandler,
+        status: int,
+        body: str,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        data = body.encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def handle_request(self, handler: BaseHTTPRequestHandler):
+        if handler.headers.get("Upgrade", "").lower() == "websocket":
+            self.handle_websocket(handler)
+            return
+
+        length = int(handler.headers.get("Content-Length") or 0)
+        postfields = handler.rfile.read(length).decode() if length else ""
+
+        with self._lock:
+            self.stats.requests += 1
+            latency = self.faults.latency_ms + self._random.uniform(
+                0, self.faults.latency_jitter_ms
+            )
+            fault = self._random.random()
+        time.sleep(latency / 1000)
+
+        if fault < self.faults.ratelimit_ratio:
+            with self._lock:
+                self.stats.ratelimited += 1
+            body = json.dumps({"ok": False, "error": "ratelimited"})
+            headers = {"Retry-After": str(self.faults.retry_after)}
+            self._send(handler, 429, body, headers)
+        elif fault < self.faults.ratelimit_ratio + self.faults.server_error_ratio:
+            with self._lock:
+                self.stats.server_errors += 1
+            self._send(handler, 500, json.dumps({"ok": False, "error": "fatal_error"}))
+        else:
+            with self._lock:
+                status, body = self.api.response(handler.path, postfields)
+            self._send(handler, status, body)
+
+    def handle_websocket(self, handler: BaseHTTPRequestHandler):
+        key = handler.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        handler.send_response(101, "Switching Protocols")
+        handler.send_header("Upgrade", "websocket")
+        handler.send_header("Connection", "Upgrade")
+        handler.send_header("Sec-WebSocket-Accept", accept)
+        handler.end_headers()
+        handler.wfile.flush()
+        handler.close_connection = True
+
+        with self._lock:
+            self.stats.ws_connections += 1
+            connection_number = self.stats.ws_connections
+        try:
+            self._run_websocket(handler.connection, connection_number)
+        except (ConnectionError, OSError):
+            pass
+
+    def _send_event(self, sock: socket.socket, event: Mapping[str, object]):
+        sock.sendall(encode_frame(OPCODE_TEXT, json.dumps(event).encode()))
+
+    def _run_websocket(self, sock: socket.socket, connection_number: int):
+        fast_reconnect = self.rtm.fast_reconnect and connection_number > 1
+        self._send_event(sock, {"type": "hello", "fast_reconnect": fast_reconnect})
+        self._send_event(
+            sock, {"type": "reconnect_url", "url": f"{self.ws_url}/websocket"}
+        )
+
+        generator = RtmEventGenerator(
+            self.api.channel_ids,
+            self.api.user_ids,
+            self.rtm.mix,
+            self.rtm.unknown_user_ratio,
+            seed=self.seed + connection_number,
+            start_time=int(time.time()),
+        )
+        start = time.monotonic()
+        interval = (
+            1 / self.rtm.events_per_second if self.rtm.events_per_second > 0 else None
+        )
+        next_event = start + interval if interval else None
+
+        while True:
+            now = time.monotonic()
+            if self.rtm.disconnect_after and now - start >= self.rtm.disconnect_after:
+                sock.sendall(encode_frame(OPCODE_CLOSE, struct.pack("!H", 1001)))
+                return
+            if next_event is not None and interval is not None and now >= next_event:
+                self._send_event(sock, generator.event())
+                with self._lock:
+                    self.stats.ws_events_sent += 1
+                next_event += interval
+                continue
+
+            timeouts = [1.0]
+            if next_event is not None:
+                timeouts.append(next_event - now)
+            if self.rtm.disconnect_after:
+                timeouts.append(start + self.rtm.disconnect_after - now)
+            readable, _, _ = select.select([sock], [], [], max(0, min(timeouts)))
+            if not readable:
+                continue
+
+            opcode, payload = decode_frame(sock)
+            if opcode == OPCODE_CLOSE:
+                sock.sendall(encode_frame(OPCODE_CLOSE, payload[:2]))
+                return
+            elif opcode == OPCODE_PING:
+                sock.sendall(encode_frame(OPCODE_PONG, payload))
+            elif opcode == OPCODE_TEXT:
+                with self._lock:
+                    self.stats.ws_messages_received += 1
+                message = json.loads(payload)
+                if message.get("type") == "ping":
+                    reply = {"type": "pong", "reply_to": message.get("id")}
+                    self._send_event(sock, reply)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.stub_server",
+        description="Serve a local stand-in for the Slack API and RTM websocket. "
+        "Must be run from the project root.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--history", type=int, default=50, help="messages per channel")
+    parser.add_argument("--latency", type=float, default=0, help="added latency in ms")
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="max random extra latency in ms"
+    )
+    parser.add_argument(
+        "--ratelimit", type=float, default=0, help="ratio of requests answered with 429"
+    )
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument(
+        "--server-errors",
+        type=float,
+        default=0,
+        help="ratio of requests answered with 500",
+    )
+    parser.add_argument(
+        "--events-per-second",
+        type=float,
+        default=1,
+        help="RTM events to send per second on each websocket, 0 for none",
+    )
+    parser.add_argument("--mix", type=parse_event_mix, default=DEFAULT_EVENT_MIX)
+    parser.add_argument("--unknown-users", type=float, default=0.01)
+    parser.add_argument(
+        "--disconnect-after",
+        type=float,
+        default=0,
+        help="close websockets after this many seconds, to test reconnects",
+    )
+    parser.add_argument("--fast-reconnect", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubSlackServer(
+        FakeSlackApi(args.channels, args.users, args.history),
+        StubFaults(
+            args.latency,
+            args.jitter,
+            args.ratelimit,
+            args.retry_after,
+            args.server_errors,
+        ),
+        StubRtmOptions(
+            args.events_per_second,
+            args.mix,
+            args.unknown_users,
+            args.disconnect_after,
+            args.fast_reconnect,
+        ),
+        args.host,
+        args.port,
+        args.seed,
+    )
+    server.start()
+    lines: List[str] = [
+        f"Serving the Slack API on {server.url}, to use it run in WeeChat:",
+        "/slack add stub xoxp-stub",
+        f"/set slack.workspace.stub.api_base_url {server.url}",
+        "/slack connect stub",
+        "Press Ctrl-C to stop and print statistics",
+    ]
+    print("\n".join(lines))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    print(
+        json.dumps({**asdict(server.stats), "methods": server.api.requests}, indent=2)
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List
+
+import weechat
+
+from slack.http import HttpRequestInfo
+from slack.log import print_error
+from slack.shared import shared
+from slack.util import get_callback_name
+
+# Upper bounds of the latency histogram buckets, the last bucket is unbounded
+API_LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class ApiMethodStats:
+    def __init__(self):
+        self.count = 0
+        self.failed = 0
+        self.retries = 0
+        self.ratelimited = 0
+        self.server_errors = 0
+        self.response_bytes = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.latency_histogram = [0] * (len(API_LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, latency: float, request_info: HttpRequestInfo, failed: bool):
+        self.count += 1
+        self.failed += failed
+        self.retries += request_info.retries
+        self.ratelimited += request_info.ratelimited
+        self.server_errors += request_info.server_errors
+        self.response_bytes += request_info.response_bytes
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        bucket = bisect_left(API_LATENCY_BUCKETS_MS, latency * 1000)
+        self.latency_histogram[bucket] += 1
+
+    # Returns the upper bound of the histogram bucket containing the
+    # percentile, formatted for display
+    def latency_percentile(self, percentile: float) -> str:
+        target = self.count * percentile
+        cumulative = 0
+        for i, bucket_count in enumerate(self.latency_histogram):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                if i < len(API_LATENCY_BUCKETS_MS):
+                    return f"<{API_LATENCY_BUCKETS_MS[i]}"
+                return f">{API_LATENCY_BUCKETS_MS[-1]}"
+        return "-"
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "failed": self.failed,
+            "retries": self.retries,
+            "ratelimited": self.ratelimited,
+            "server_errors": self.server_errors,
+            "response_bytes": self.response_bytes,
+            "total_latency_ms": round(self.total_latency * 1000, 1),
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+            "latency_histogram_ms": {
+                str(bound): count
+                for bound, count in zip(
+                    [*API_LATENCY_BUCKETS_MS, "inf"], self.latency_histogram
+                )
+            },
+        }
+
+
+class ApiMetrics:
+    def __init__(self):
+        self.methods: Dict[str, ApiMethodStats] = {}
+
+    def add(
+        self,
+        method: str,
+        latency: float,
+        request_info: HttpRequestInfo,
+        failed: bool,
+    ):
+        if method not in self.methods:
+            self.methods[method] = ApiMethodStats()
+        self.methods[method].add(latency, request_info, failed)
+
+    def report(self) -> List[str]:
+        header = (
+            f"{'count':>6} {'failed':>6} {'retry':>5} {'429':>4} {'5xx':>4} "
+            f"{'avg ms':>8} {'p50':>6} {'p90':>6} {'max ms':>8} {'kB':>8}  method"
+        )
+        lines = [header]
+        sorted_methods = sorted(
+            self.methods.items(), key=lambda item: item[1].total_latency, reverse=True
+        )
+        for method, stats in sorted_methods:
+            lines.append(
+                f"{stats.count:>6} {stats.failed:>6} {stats.retries:>5} "
+                f"{stats.ratelimited:>4} {stats.server_errors:>4} "
+                f"{stats.total_latency * 1000 / stats.count:>8.1f} "
+                f"{stats.latency_percentile(0.5):>6} "
+                f"{stats.latency_percentile(0.9):>6} "
+                f"{stats.max_latency * 1000:>8.1f} "
+                f"{stats.response_bytes / 1024:>8.1f}  {method}"
+            )
+        return lines
+
+    def to_json(self) -> Dict[str, object]:
+        return {method: stats.to_json() for method, stats in self.methods.items()}
+
+
+def get_api_stats_dump_path() -> str:
+    weechat_dir = weechat.info_get("weechat_data_dir", "") or weechat.info_get(
+        "weechat_dir", ""
+    )
+    return os.path.join(weechat_dir, "slack", "api_stats.json")
+
+
+def write_api_stats_dump():
+    path = get_api_stats_dump_path()
+    data = {
+        "time": time.time(),
+        "workspaces": {
+            workspace.name: workspace.api.metrics.to_json()
+            for workspace in shared.workspaces.values()
+        },
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print_error(f"Failed writing API stats to {path}: {e}")
+
+
+def api_stats_dump_cb(data: str, remaining_calls: int) -> int:
+    write_api_stats_dump()
+    return weechat.WEECHAT_RC_OK
+
+
+def update_api_stats_dump_timer(interval_seconds: int):
+    if shared.api_stats_dump_timer is not None:
+        weechat.unhook(shared.api_stats_dump_timer)
+        shared.api_stats_dump_timer = None
+    if interval_seconds > 0:
+        shared.api_stats_dump_timer = weechat.hook_timer(
+            interval_seconds * 1000, 0, 0, get_callback_name(api_stats_dump_cb), ""
+        )
@@ -24,6 +24,7 @@ import weechat
 
 from slack.error import SlackError, SlackRtmError, UncaughtError
 from slack.log import open_debug_buffer, print_error
+from slack.profiler import profiler
 from slack.python_compatibility import format_exception, removeprefix
 from slack.shared import EMOJI_CHAR_OR_NAME_REGEX_STRING, shared
 from slack.slack_buffer import SlackBuffer
@@ -579,7 +580,10 @@ def print_uncaught_error(error: UncaughtError, detailed: bool, options: Options)
             print_error("This error does not have any data")
 
 
-@weechat_command("tasks|buffer|open_buffer|replay_events|errors|error", max_split=0)
+@weechat_command(
+    "tasks|buffer|open_buffer|replay_events|errors|error|ratelimits|profile|api-stats",
+    max_split=0,
+)
 async def command_slack_debug(buffer: str, args: List[str], options: Options):
     # TODO: Add message info (message_json)
     if args[0] == "tasks":
@@ -640,6 +644,56 @@ async def command_slack_debug(buffer: str, args: List[str], options: Options):
             error = shared.uncaught_errors[-1]
             weechat.prnt("", "Last error:")
         print_uncaught_error(error, True, options)
+    elif args[0] == "profile":
+        action = args[1] if len(args) > 1 else "report"
+        if action == "start":
+            if profiler.enabled:
+                print_error("Profiling is already running")
+                return
+            profiler.start()
+            weechat.prnt("", "Profiling started")
+        elif action == "stop":
+            path = profiler.stop()
+            if path is None:
+                print_error("Profiling is not running")
+                return
+            weechat.prnt("", f"Profiling stopped, cProfile stats written to {path}")
+            for line in profiler.report():
+                weechat.prnt("", line)
+        elif action == "report":
+            num = int(args[2]) if len(args) > 2 and args[2].isdecimal() else None
+            for line in profiler.report(num):
+                weechat.prnt("", line)
+        else:
+            print_error(f"Unknown profile action {action}, use start, stop or report")
+    elif args[0] == "api-stats":
+        if len(args) > 1 and args[1] == "reset":
+            for workspace in shared.workspaces.values():
+                workspace.api.metrics.methods.clear()
+            weechat.prnt("", "API stats reset")
+            return
+        for workspace in shared.workspaces.values():
+            weechat.prnt("", f"API requests for workspace {workspace.name}:")
+            for line in workspace.api.metrics.report():
+                weechat.prnt("", f"  {line}")
+    elif args[0] == "ratelimits":
+        for workspace in shared.workspaces.values():
+            rate_limiter = workspace.api.rate_limiter
+            weechat.prnt(
+                "",
+                f"{workspace.name}: {rate_limiter.queue_depth} queued request(s)",
+            )
+            for bucket in rate_limiter.buckets.values():
+                paused = (
+                    f", paused for {bucket.paused_for:.0f}s"
+                    if bucket.paused_for > 0
+                    else ""
+                )
+                weechat.prnt(
+                    "",
+                    f"  {bucket.name}: queued: {bucket.queue_depth}, "
+                    f"tokens: {bucket.tokens:.1f}/{bucket.capacity:.0f}{paused}",
+                )
 
 
 @weechat_command("-clear")
@@ -678,9 +732,9 @@ def _get_linkarchive_url(
     if conversation is not None:
         url += f"archives/{conversation.id}/"
         if message_ts is not None:
-            message = conversation.messages[message_ts]
-            url += f"p{message.ts.major}{message.ts.minor:0>6}"
-            if message.thread_ts is not None:
+            message = conversation.messages.get(message_ts)
+            url += f"p{message_ts.major}{message_ts.minor:0>6}"
+            if message is not None and message.thread_ts is not None:
                 url += f"?thread_ts={message.thread_ts}&cid={conversation.id}"
     return url
 
@@ -4,7 +4,8 @@ from typing import TYPE_CHECKING, Callable, Optional, Tuple
 
 import weechat
 
-from slack.log import print_error
+from slack.api_metrics import update_api_stats_dump_timer
+from slack.log import DebugMessageType, LogLevel, debug_messages, print_error
 from slack.shared import shared
 from slack.slack_conversation import invalidate_nicklists, update_buffer_props
 from slack.slack_workspace import SlackWorkspace, workspace_get_buffer_to_merge_with
@@ -203,6 +204,13 @@ class SlackConfigSectionLook:
             string_values=("prefix", "all", "none"),
         )
 
+        self.compact_messages = WeeChatOption(
+            self._section,
+            "compact_messages",
+            "store the parts of messages that are only needed to parse them (text, blocks and attachments) compressed after they have been parsed, to use less memory; they are decompressed if the message has to be parsed again, e.g. when display_link_previews or color_message_attachments is changed",
+            False,
+        )
+
         self.display_link_previews: WeeChatOption[
             Literal["always", "only_internal", "never"]
         ] = WeeChatOption(
@@ -241,6 +249,16 @@ class SlackConfigSectionLook:
             True,
         )
 
+        self.max_messages_per_conversation = WeeChatOption(
+            self._section,
+            "max_messages_per_conversation",
+            "maximum number of messages to keep in memory for each conversation, the oldest messages are removed when there are more (messages in open threads and unread messages are always kept); 0 = unlimited; can be overridden per buffer with the buffer localvar max_messages_per_conversation",
+            4096,
+            0,
+            2**31 - 1,
+            parent_option="weechat.history.max_buffer_lines_number",
+        )
+
         self.muted_conversations_notify: WeeChatOption[
             Literal["none", "personal_highlights", "all_highlights", "all"]
         ] = WeeChatOption(
@@ -356,6 +374,104 @@ class SlackConfigSectionLook:
         return weechat.WEECHAT_RC_OK
 
 
+class SlackConfigSectionDebug:
+    def __init__(self, weechat_config: WeeChatConfig):
+        self._section = WeeChatSection(weechat_config, "debug")
+
+        self.api_stats_dump_interval = WeeChatOption(
+            self._section,
+            "api_stats_dump_interval",
+            "interval (in seconds) for writing the API request statistics (shown in /slack debug api-stats) to api_stats.json in the slack directory in the WeeChat data dir; 0 = don't write",
+            0,
+            0,
+            2**31 - 1,
+            callback_change=self.config_change_api_stats_dump_interval_cb,
+        )
+
+        self.log_level: WeeChatOption[
+            Literal["trace", "debug", "info", "warn", "error", "fatal"]
+        ] = WeeChatOption(
+            self._section,
+            "log_level",
+            "minimum level of debug messages to keep in memory; messages below this level are only kept (and formatted) while the debug buffer is open",
+            "info",
+            string_values=("trace", "debug", "info", "warn", "error", "fatal"),
+            callback_change=self.config_change_debug_messages_cb,
+        )
+
+        self.max_messages = WeeChatOption(
+            self._section,
+            "max_messages",
+            "maximum number of debug messages to keep in memory (shown in /slack debug open_buffer), the oldest messages are removed when there are more",
+            10000,
+            0,
+            2**31 - 1,
+            callback_change=self.config_change_debug_messages_cb,
+        )
+
+        self.max_messages_http_request = WeeChatOption(
+            self._section,
+            "max_messages_http_request",
+            "maximum number of debug messages for http requests to keep in memory",
+            2000,
+            0,
+            2**31 - 1,
+            callback_change=self.config_change_debug_messages_cb,
+        )
+
+        self.max_messages_log = WeeChatOption(
+            self._section,
+            "max_messages_log",
+            "maximum number of log debug messages to keep in memory",
+            2000,
+            0,
+            2**31 - 1,
+            callback_change=self.config_change_debug_messages_cb,
+        )
+
+        self.max_messages_websocket_recv = WeeChatOption(
+            self._section,
+            "max_messages_websocket_recv",
+            "maximum number of debug messages for received websocket events to keep in memory",
+            5000,
+            0,
+            2**31 - 1,
+            callback_change=self.config_change_debug_messages_cb,
+        )
+
+        self.max_messages_websocket_send = WeeChatOption(
+            self._section,
+            "max_messages_websocket_send",
+            "maximum number of debug messages for sent websocket messages to keep in memory",
+            1000,
+            0,
+            2**31 - 1,
+            callback_change=self.config_change_debug_messages_cb,
+        )
+
+    def update_debug_messages(self):
+        debug_messages.min_level = LogLevel[self.log_level.value.upper()]
+        debug_messages.set_limits(
+            self.max_messages.value,
+            {
+                DebugMessageType.HTTP_REQUEST: self.max_messages_http_request.value,
+                DebugMessageType.LOG: self.max_messages_log.value,
+                DebugMessageType.WEBSOCKET_RECV: self.max_messages_websocket_recv.value,
+                DebugMessageType.WEBSOCKET_SEND: self.max_messages_websocket_send.value,
+            },
+        )
+
+    def config_change_api_stats_dump_interval_cb(
+        self, option: WeeChatOption[int], parent_changed: bool
+    ):
+        update_api_stats_dump_timer(option.value)
+
+    def config_change_debug_messages_cb(
+        self, option: WeeChatOption[WeeChatOptionType], parent_changed: bool
+    ):
+        self.update_debug_messages()
+
+
 class SlackConfigSectionWorkspace:
     def __init__(
         self,
@@ -367,6 +483,12 @@ class SlackConfigSectionWorkspace:
         self._workspace_name = workspace_name
         self._parent_config = parent_config
 
+        self.api_base_url = self._create_option(
+            "api_base_url",
+            "base URL to send API requests and connect the websocket to instead of the Slack servers, e.g. http://localhost:8080 for a local stub server used for testing; empty value = use the Slack servers",
+            "",
+        )
+
         self.api_token = self._create_option(
             "api_token",
             "The token (note: content is evaluated, see /help eval; workspace options are evaluated with ${workspace} replaced by the workspace name)",
@@ -411,6 +533,12 @@ class SlackConfigSectionWorkspace:
             False,
         )
 
+        self.cache_info = self._create_option(
+            "cache_info",
+            "cache info about users, bots and usergroups on disk, so they don't have to be fetched from the server every time you connect; cached info is refreshed in the background when used",
+            True,
+        )
+
         self.keep_active: WeeChatOption[Literal["on_activity", "always"]] = (
             self._create_option(
                 "keep_active",
@@ -420,6 +548,14 @@ class SlackConfigSectionWorkspace:
             )
         )
 
+        self.max_concurrent_requests = self._create_option(
+            "max_concurrent_requests",
+            "maximum number of requests to run at the same time when info has to be fetched one item at a time (e.g. conversations.info for many conversations, or conversations.replies for the threads in the history of a conversation)",
+            10,
+            1,
+            1000,
+        )
+
         self.network_timeout = self._create_option(
             "network_timeout",
             "timeout (in seconds) for network requests",
@@ -534,6 +670,7 @@ class SlackConfig:
         self.weechat_config = WeeChatConfig("slack")
         self.color = SlackConfigSectionColor(self.weechat_config)
         self.look = SlackConfigSectionLook(self.weechat_config)
+        self.debug = SlackConfigSectionDebug(self.weechat_config)
         self._section_workspace_default = WeeChatSection(
             self.weechat_config, "workspace_default"
         )
@@ -557,6 +694,8 @@ class SlackConfig:
 
     def config_read(self):
         weechat.config_read(self.weechat_config.pointer)
+        self.debug.update_debug_messages()
+        update_api_stats_dump_timer(self.debug.api_stats_dump_interval.value)
 
     def create_workspace_config(self, workspace_name: str):
         if workspace_name in shared.workspaces:
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import os
 import resource
+from dataclasses import dataclass
 from io import StringIO
-from typing import Dict, Tuple
+from typing import Awaitable, Callable, Dict, Optional, Tuple
 
 import weechat
 
@@ -13,6 +14,16 @@ from slack.task import FutureProcess, FutureUrl, sleep, weechat_task_cb
 from slack.util import get_callback_name
 
 
+# Filled in by http_request, so callers can keep statistics about requests
+@dataclass
+class HttpRequestInfo:
+    retries: int = 0
+    ratelimited: int = 0
+    server_errors: int = 0
+    http_status: Optional[int] = None
+    response_bytes: int = 0
+
+
 def available_file_descriptors():
     num_current_file_descriptors = len(os.listdir("/proc/self/fd/"))
     max_file_descriptors = min(resource.getrlimit(resource.RLIMIT_NOFILE))
@@ -26,7 +37,9 @@ async def hook_process_hashtable(
     log(
         LogLevel.DEBUG,
         DebugMessageType.LOG,
-        f"hook_process_hashtable calling ({future.id}): command: {command}",
+        "hook_process_hashtable calling (%s): command: %s",
+        future.id,
+        command,
     )
     while available_file_descriptors() < 10:
         await sleep(100)
@@ -44,7 +57,9 @@ async def hook_process_hashtable(
         log(
             LogLevel.TRACE,
             DebugMessageType.LOG,
-            f"hook_process_hashtable intermediary response ({next_future.id}): command: {command}",
+            "hook_process_hashtable intermediary response (%s): command: %s",
+            next_future.id,
+            command,
         )
         stdout.write(out)
         stderr.write(err)
@@ -54,9 +69,11 @@ async def hook_process_hashtable(
     log(
         LogLevel.DEBUG,
         DebugMessageType.LOG,
-        f"hook_process_hashtable response ({future.id}): command: {command}, "
-        f"return_code: {return_code}, response length: {len(out)}"
-        + (f", error: {err}" if err else ""),
+        lambda: (
+            f"hook_process_hashtable response ({future.id}): command: {command}, "
+            f"return_code: {return_code}, response length: {len(out)}"
+            + (f", error: {err}" if err else "")
+        ),
     )
 
     return command, return_code, out, err
@@ -112,12 +129,20 @@ async def http_request_url(
 
 
 async def http_request(
-    url: str, options: Dict[str, str], timeout: int, max_retries: int = 5
+    url: str,
+    options: Dict[str, str],
+    timeout: int,
+    max_retries: int = 5,
+    ratelimit_callback: Optional[Callable[[int], None]] = None,
+    request_info: Optional[HttpRequestInfo] = None,
+    acquire_token: Optional[Callable[[], Awaitable[None]]] = None,
 ) -> str:
     log(
         LogLevel.DEBUG,
         DebugMessageType.HTTP_REQUEST,
-        f"requesting: {url}, {options.get('postfields')}",
+        "requesting: %s, %s",
+        url,
+        options.get("postfields"),
     )
     try:
         if hasattr(weechat, "hook_url"):
@@ -126,10 +151,17 @@ async def http_request(
             http_status, headers, body = await http_request_process(
                 url, options, timeout
             )
+        if request_info is not None:
+            request_info.http_status = http_status
+            request_info.response_bytes += len(body)
         if http_status >= 500:
+            if request_info is not None:
+                request_info.server_errors += 1
             raise HttpError(url, options, None, http_status, body)
     except HttpError as e:
         if max_retries > 0:
+            if request_info is not None:
+                request_info.retries += 1
             log(
                 LogLevel.INFO,
                 DebugMessageType.LOG,
@@ -137,7 +169,17 @@ async def http_request(
                 f"return_code: {e.return_code}, error: {e.error}, url: {url}",
             )
             await sleep(1000)
-            return await http_request(url, options, timeout, max_retries - 1)
+            if acquire_token is not None:
+                await acquire_token()
+            return await http_request(
+                url,
+                options,
+                timeout,
+                max_retries - 1,
+                ratelimit_callback,
+                request_info,
+                acquire_token,
+            )
         raise
 
     if http_status == 429:
@@ -151,8 +193,22 @@ async def http_request(
                     DebugMessageType.LOG,
                     f"HTTP ratelimit, retrying in {retry_after} seconds, url: {url}",
                 )
+                if ratelimit_callback is not None:
+                    ratelimit_callback(retry_after)
+                if request_info is not None:
+                    request_info.ratelimited += 1
                 await sleep(retry_after * 1000)
-                return await http_request(url, options, timeout)
+                # The retry is a new request, so it needs a token like any other
+                if acquire_token is not None:
+                    await acquire_token()
+                return await http_request(
+                    url,
+                    options,
+                    timeout,
+                    ratelimit_callback=ratelimit_callback,
+                    request_info=request_info,
+                    acquire_token=acquire_token,
+                )
 
     if http_status >= 400:
         raise HttpError(url, options, None, http_status, body)
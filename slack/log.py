@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import heapq
 import time
+from collections import deque
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import List, Set
+from typing import Callable, Deque, Dict, Iterator, Mapping, Optional, Set, Union
 
 import weechat
 
@@ -36,7 +38,71 @@ class DebugMessage:
     message: str
 
 
-debug_messages: List[DebugMessage] = []
+# Keeps the newest debug messages, limited both in total and for each message
+# type, so noisy types (like websocket events) don't push out the others
+class DebugMessages:
+    def __init__(
+        self,
+        max_messages: int,
+        max_messages_per_type: Mapping[DebugMessageType, Optional[int]],
+    ):
+        self._messages: Dict[DebugMessageType, Deque[DebugMessage]] = {}
+        # Messages below this level are only kept while the debug buffer is open
+        self.min_level = LogLevel.INFO
+        self.set_limits(max_messages, max_messages_per_type)
+
+    def set_limits(
+        self,
+        max_messages: int,
+        max_messages_per_type: Mapping[DebugMessageType, Optional[int]],
+    ):
+        self.max_messages = max_messages
+        self._messages = {
+            message_type: deque(
+                self._messages.get(message_type, ()),
+                maxlen=max_messages_per_type.get(message_type),
+            )
+            for message_type in DebugMessageType
+        }
+        self._trim()
+
+    def is_enabled(self, level: LogLevel, message_type: DebugMessageType) -> bool:
+        if level < self.min_level and not shared.debug_buffer_pointer:
+            return False
+        return self.max_messages > 0 and self._messages[message_type].maxlen != 0
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._messages.values())
+
+    def __iter__(self) -> Iterator[DebugMessage]:
+        return heapq.merge(*self._messages.values(), key=lambda message: message.time)
+
+    def append(self, debug_message: DebugMessage):
+        self._messages[debug_message.message_type].append(debug_message)
+        self._trim()
+
+    def clear(self):
+        for messages in self._messages.values():
+            messages.clear()
+
+    def _trim(self):
+        while len(self) > self.max_messages:
+            oldest = min(
+                (messages for messages in self._messages.values() if messages),
+                key=lambda messages: messages[0].time,
+            )
+            oldest.popleft()
+
+
+debug_messages = DebugMessages(
+    10000,
+    {
+        DebugMessageType.WEBSOCKET_SEND: 1000,
+        DebugMessageType.WEBSOCKET_RECV: 5000,
+        DebugMessageType.HTTP_REQUEST: 2000,
+        DebugMessageType.LOG: 2000,
+    },
+)
 printed_exceptions: Set[BaseException] = set()
 
 
@@ -51,14 +117,31 @@ def print_exception_once(e: BaseException):
         printed_exceptions.add(e)
 
 
-def log(level: LogLevel, message_type: DebugMessageType, message: str):
-    if level >= LogLevel.INFO:
+# The message can be a callable or a format string with args, which are only
+# evaluated if the message is going to be printed or kept
+def log(
+    level: LogLevel,
+    message_type: DebugMessageType,
+    message: Union[str, Callable[[], str]],
+    *args: object,
+):
+    should_print = level >= LogLevel.INFO
+    if not should_print and not debug_messages.is_enabled(level, message_type):
+        return
+
+    if callable(message):
+        message = message()
+    elif args:
+        message = message % args
+
+    if should_print:
         prefix = weechat.prefix("error") if level >= LogLevel.ERROR else "\t"
         weechat.prnt("", f"{prefix}{shared.SCRIPT_NAME} {level.name}: {message}")
 
-    debug_message = DebugMessage(time.time(), level, message_type, message)
-    debug_messages.append(debug_message)
-    print_debug_buffer(debug_message)
+    if debug_messages.is_enabled(level, message_type):
+        debug_message = DebugMessage(time.time(), level, message_type, message)
+        debug_messages.append(debug_message)
+        print_debug_buffer(debug_message)
 
 
 def _close_debug_buffer_cb(data: str, buffer: str):
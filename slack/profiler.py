@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from types import TracebackType
+from typing import ContextManager, Dict, List, Optional, Type
+
+import weechat
+
+
+@dataclass
+class ProfileStats:
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+
+
+class ProfileTimer:
+    def __init__(self, profiler: Profiler, name: str):
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ):
+        self._profiler.add(self._name, time.perf_counter() - self._start)
+
+
+_profile_disabled = nullcontext()
+
+
+def get_profile_dir() -> str:
+    weechat_dir = weechat.info_get("weechat_data_dir", "") or weechat.info_get(
+        "weechat_dir", ""
+    )
+    return os.path.join(weechat_dir, "slack")
+
+
+# Collects the count, cumulative and max wall time of the hot paths while
+# enabled, and runs cProfile for the whole script at the same time
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.started: Optional[float] = None
+        self.stats: Dict[str, ProfileStats] = {}
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def start(self):
+        self.stats = {}
+        self.started = time.time()
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+        self.enabled = True
+
+    # Stops profiling and returns the path the cProfile stats were written to
+    def stop(self) -> Optional[str]:
+        self.enabled = False
+        if self._cprofile is None:
+            return None
+        self._cprofile.disable()
+        profile_dir = get_profile_dir()
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(
+            profile_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+        )
+        self._cprofile.dump_stats(path)
+        self._cprofile = None
+        return path
+
+    def measure(self, name: str) -> ContextManager[None]:
+        if not self.enabled:
+            return _profile_disabled
+        return ProfileTimer(self, name)
+
+    def add(self, name: str, duration: float):
+        if name not in self.stats:
+            self.stats[name] = ProfileStats()
+        self.stats[name].add(duration)
+
+    def report(self, limit: Optional[int] = None) -> List[str]:
+        if self.started is None:
+            return ["Profiling has not been started"]
+        state = "running" if self.enabled else "stopped"
+        lines = [
+            f"Profile {state}, started {time.ctime(self.started)}:",
+            f"{'count':>8} {'total ms':>10} {'avg ms':>8} {'max ms':>8}  name",
+        ]
+        sorted_stats = sorted(
+            self.stats.items(), key=lambda item: item[1].total_time, reverse=True
+        )
+        for name, stats in sorted_stats[:limit]:
+            lines.append(
+                f"{stats.count:>8} {stats.total_time * 1000:>10.1f} "
+                f"{stats.total_time * 1000 / stats.count:>8.2f} "
+                f"{stats.max_time * 1000:>8.2f}  {name}"
+            )
+        return lines
+
+
+profiler = Profiler()
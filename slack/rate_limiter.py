@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import time
+from math import ceil
+from typing import Dict
+
+from slack.log import DebugMessageType, LogLevel, log
+from slack.task import sleep
+
+# Requests per minute for each of the Slack API rate limit tiers, see
+# https://api.slack.com/apis/rate-limits
+RATE_LIMIT_TIERS: Dict[str, int] = {
+    "tier1": 1,
+    "tier2": 20,
+    "tier3": 50,
+    "tier4": 100,
+    "post": 60,
+    "edgeapi": 50,
+}
+
+DEFAULT_RATE_LIMIT_TIER = "tier3"
+
+# Methods which are undocumented, or where the documented tier would stall
+# reconnects (rtm.connect is tier 1), use the default tier
+METHOD_RATE_LIMIT_TIERS: Dict[str, str] = {
+    "channels/search": "edgeapi",
+    "usergroups/info": "edgeapi",
+    "users/search": "edgeapi",
+    "bots.info": "tier3",
+    "chat.delete": "tier3",
+    "chat.postMessage": "post",
+    "chat.update": "tier3",
+    "conversations.close": "tier2",
+    "conversations.history": "tier3",
+    "conversations.info": "tier3",
+    "conversations.join": "tier3",
+    "conversations.leave": "tier3",
+    "conversations.list": "tier2",
+    "conversations.mark": "tier3",
+    "conversations.members": "tier4",
+    "conversations.open": "tier3",
+    "conversations.replies": "tier3",
+    "emoji.list": "tier2",
+    "files.info": "tier4",
+    "presence.set": "tier2",
+    "team.info": "tier3",
+    "usergroups.list": "tier2",
+    "users.conversations": "tier3",
+    "users.info": "tier4",
+    "users.profile.set": "tier3",
+}
+
+
+class RateLimitBucket:
+    def __init__(self, name: str, requests_per_minute: int):
+        self.name = name
+        self.capacity = float(requests_per_minute)
+        self.refill_per_second = requests_per_minute / 60
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self.queue_depth = 0
+        self._last_refill = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+
+    # Reserves a token and returns the number of seconds until it can be used.
+    # Tokens can go negative, so waiting requests are served in order.
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        deficit = -self.tokens if self.tokens < 0 else 0
+        return max(self.paused_until - now, 0) + deficit / self.refill_per_second
+
+    @property
+    def paused_for(self) -> float:
+        return max(self.paused_until - time.monotonic(), 0)
+
+    async def acquire(self):
+        self.queue_depth += 1
+        try:
+            wait = self._reserve()
+            while wait > 0:
+                await sleep(ceil(wait * 1000))
+                if self.paused_for > 0:
+                    # The bucket was paused while waiting, so give back the
+                    # reserved token and get in line again after the pause
+                    self.tokens += 1
+                    wait = self._reserve()
+                else:
+                    wait = 0
+        finally:
+            self.queue_depth -= 1
+
+    def pause(self, seconds: int):
+        log(
+            LogLevel.INFO,
+            DebugMessageType.LOG,
+            f"Rate limited in bucket {self.name}, pausing it for {seconds} seconds",
+        )
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = min(self.tokens, 0)
+
+
+# Slack applies the rate limits per method, so each method has its own bucket,
+# with the rate of the tier of the method
+class SlackRateLimiter:
+    def __init__(self):
+        self.buckets: Dict[str, RateLimitBucket] = {}
+
+    def bucket(self, method: str) -> RateLimitBucket:
+        if method not in self.buckets:
+            tier = self.tier_for_method(method)
+            self.buckets[method] = RateLimitBucket(method, RATE_LIMIT_TIERS[tier])
+        return self.buckets[method]
+
+    def tier_for_method(self, method: str) -> str:
+        return METHOD_RATE_LIMIT_TIERS.get(method, DEFAULT_RATE_LIMIT_TIER)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(bucket.queue_depth for bucket in self.buckets.values())
@@ -19,6 +19,8 @@ SCRIPT_DESC = "Extends weechat for typing notification/search/etc on slack.com"
 def shutdown_cb():
     shared.script_is_unloading = True
     weechat.config_write(shared.config.weechat_config.pointer)
+    for workspace in shared.workspaces.values():
+        workspace.info_cache.write()
     return weechat.WEECHAT_RC_OK
 
 
@@ -38,6 +40,13 @@ def signal_buffer_switch_cb(data: str, signal: str, buffer_pointer: str) -> int:
     return weechat.WEECHAT_RC_OK
 
 
+def signal_buffer_cleared_cb(data: str, signal: str, buffer_pointer: str) -> int:
+    slack_buffer = shared.buffers.get(buffer_pointer)
+    if isinstance(slack_buffer, SlackMessageBuffer):
+        slack_buffer.clear_line_pointers()
+    return weechat.WEECHAT_RC_OK
+
+
 def input_text_changed_cb(data: str, signal: str, buffer_pointer: str) -> int:
     reset_completion_context_on_input(buffer_pointer)
     return weechat.WEECHAT_RC_OK
@@ -159,6 +168,9 @@ def register():
         weechat.hook_signal(
             "buffer_switch", get_callback_name(signal_buffer_switch_cb), ""
         )
+        weechat.hook_signal(
+            "buffer_cleared", get_callback_name(signal_buffer_cleared_cb), ""
+        )
         weechat.hook_signal(
             "input_text_changed", get_callback_name(input_text_changed_cb), ""
         )
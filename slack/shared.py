@@ -45,6 +45,7 @@ class Shared:
         self.standard_emojis_inverse: Dict[str, Emoji]
         self.highlight_tag = "highlight"
         self.debug_buffer_pointer: Optional[str] = None
+        self.api_stats_dump_timer: Optional[str] = None
         self.script_is_unloading = False
 
 
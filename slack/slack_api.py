@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import json
+import time
 from itertools import chain
 from typing import (
     TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
     Iterable,
     Mapping,
     Optional,
@@ -12,8 +16,11 @@ from typing import (
 )
 from urllib.parse import urlencode
 
+from slack.api_metrics import ApiMetrics
 from slack.error import HttpError, SlackApiError
-from slack.http import http_request
+from slack.http import HttpRequestInfo, http_request
+from slack.profiler import profiler
+from slack.rate_limiter import SlackRateLimiter
 from slack.shared import shared
 from slack.slack_message import SlackTs
 from slack.task import gather
@@ -27,8 +34,14 @@ if TYPE_CHECKING:
     from slack_api.slack_conversations_history import SlackConversationsHistoryResponse
     from slack_api.slack_conversations_info import SlackConversationsInfoResponse
     from slack_api.slack_conversations_join import SlackConversationsJoinResponse
-    from slack_api.slack_conversations_list import SlackConversationsListPublicResponse
-    from slack_api.slack_conversations_members import SlackConversationsMembersResponse
+    from slack_api.slack_conversations_list import (
+        SlackConversationsListPublicResponse,
+        SlackConversationsListPublicSuccessResponse,
+    )
+    from slack_api.slack_conversations_members import (
+        SlackConversationsMembersResponse,
+        SlackConversationsMembersSuccessResponse,
+    )
     from slack_api.slack_conversations_open import SlackConversationsOpenResponse
     from slack_api.slack_conversations_replies import SlackConversationsRepliesResponse
     from slack_api.slack_emoji import SlackEmojiListResponse
@@ -60,8 +73,18 @@ EdgeParams = Mapping[
 
 
 class SlackApiCommon:
-    def __init__(self, workspace: SlackWorkspace):
+    def __init__(
+        self,
+        workspace: SlackWorkspace,
+        rate_limiter: SlackRateLimiter,
+        metrics: ApiMetrics,
+    ):
         self.workspace = workspace
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+
+    def _base_url(self, default: str) -> str:
+        return self.workspace.config.api_base_url.value.rstrip("/") or default
 
     def _get_request_options(self):
         return {
@@ -70,6 +93,27 @@ class SlackApiCommon:
             "cookie": get_cookies(self.workspace.config.api_cookies.value),
         }
 
+    async def _http_request(self, method: str, url: str, options: Dict[str, str]):
+        bucket = self.rate_limiter.bucket(method)
+        await bucket.acquire()
+        request_info = HttpRequestInfo()
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = await http_request(
+                url,
+                options,
+                self.workspace.config.network_timeout.value * 1000,
+                ratelimit_callback=bucket.pause,
+                acquire_token=bucket.acquire,
+                request_info=request_info,
+            )
+            failed = False
+            return response
+        finally:
+            latency = time.perf_counter() - start
+            self.metrics.add(method, latency, request_info, failed)
+
 
 class SlackEdgeApi(SlackApiCommon):
     @property
@@ -78,15 +122,12 @@ class SlackEdgeApi(SlackApiCommon):
 
     async def _fetch_edgeapi(self, method: str, params: EdgeParams = {}):
         id_for_path = self.workspace.enterprise_id or self.workspace.id
-        url = f"https://edgeapi.slack.com/cache/{id_for_path}/{method}"
+        base_url = self._base_url("https://edgeapi.slack.com")
+        url = f"{base_url}/cache/{id_for_path}/{method}"
         options = self._get_request_options()
         options["postfields"] = json.dumps(params)
         options["httpheader"] += "\nContent-Type: application/json"
-        response = await http_request(
-            url,
-            options,
-            self.workspace.config.network_timeout.value * 1000,
-        )
+        response = await self._http_request(method, url, options)
         return json.loads(response)
 
     async def fetch_usergroups_info(self, usergroup_ids: Sequence[str]):
@@ -135,20 +176,47 @@ class SlackEdgeApi(SlackApiCommon):
 
 class SlackApi(SlackApiCommon):
     def __init__(self, workspace: SlackWorkspace):
-        super().__init__(workspace)
-        self.edgeapi = SlackEdgeApi(workspace)
+        super().__init__(workspace, SlackRateLimiter(), ApiMetrics())
+        self.edgeapi = SlackEdgeApi(workspace, self.rate_limiter, self.metrics)
 
     async def _fetch(self, method: str, params: Params = {}):
-        url = f"https://api.slack.com/api/{method}"
+        if not profiler.enabled:
+            return await self._fetch_unprofiled(method, params)
+        with profiler.measure(f"SlackApi._fetch {method}"):
+            return await self._fetch_unprofiled(method, params)
+
+    async def _fetch_unprofiled(self, method: str, params: Params):
+        url = f"{self._base_url('https://api.slack.com')}/api/{method}"
         options = self._get_request_options()
         options["postfields"] = urlencode(params)
-        response = await http_request(
-            url,
-            options,
-            self.workspace.config.network_timeout.value * 1000,
-        )
+        response = await self._http_request(method, url, options)
         return json.loads(response)
 
+    # Yields each page of a paginated method as it arrives, so the caller can
+    # process it without waiting for (and holding on to) all the pages
+    async def _fetch_list_pages(
+        self,
+        method: str,
+        params: Params = {},
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Any]:
+        remaining = limit
+        cursor = None
+        while True:
+            cur_limit = 1000 if remaining is None or remaining > 1000 else remaining
+            page_params = {**params, "limit": cur_limit}
+            if cursor:
+                page_params["cursor"] = cursor
+            response = await self._fetch(method, page_params)
+            yield response
+            if remaining is not None:
+                remaining -= cur_limit
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not response["ok"] or not cursor:
+                break
+            if remaining is not None and remaining <= 0:
+                break
+
     async def _fetch_list(
         self,
         method: str,
@@ -156,27 +224,21 @@ class SlackApi(SlackApiCommon):
         params: Params = {},
         limit: Optional[int] = None,
     ):
-        cur_limit = 1000 if limit is None or limit > 1000 else limit
-        response = await self._fetch(method, {**params, "limit": cur_limit})
-        remaining = limit - cur_limit if limit is not None else None
-        next_cursor = response.get("response_metadata", {}).get("next_cursor")
-        if (remaining is None or remaining > 0) and next_cursor and response["ok"]:
-            new_params = {**params, "cursor": next_cursor}
-            next_pages = await self._fetch_list(method, list_key, new_params, remaining)
-            response[list_key].extend(next_pages[list_key])
-            return response
+        pages = self._fetch_list_pages(method, params, limit)
+        # _fetch_list_pages always yields at least one page
+        response = await pages.__anext__()
+        async for page in pages:
+            if not page["ok"]:
+                return page
+            response[list_key].extend(page[list_key])
         return response
 
     async def _post(self, method: str, body: Mapping[str, object]):
-        url = f"https://api.slack.com/api/{method}"
+        url = f"{self._base_url('https://api.slack.com')}/api/{method}"
         options = self._get_request_options()
         options["httpheader"] += "\nContent-Type: application/json"
         options["postfields"] = json.dumps(body)
-        response = await http_request(
-            url,
-            options,
-            self.workspace.config.network_timeout.value * 1000,
-        )
+        response = await self._http_request(method, url, options)
         return json.loads(response)
 
     async def fetch_team_info(self):
@@ -248,36 +310,34 @@ class SlackApi(SlackApiCommon):
             raise SlackApiError(self.workspace, method, response, params)
         return response
 
-    async def fetch_conversations_members(
+    async def fetch_conversations_members_pages(
         self,
         conversation: SlackConversation,
         limit: Optional[int] = None,
-    ):
+    ) -> AsyncIterator[SlackConversationsMembersSuccessResponse]:
         method = "conversations.members"
         params: Params = {"channel": conversation.id}
-        response: SlackConversationsMembersResponse = await self._fetch_list(
-            method, "members", params, limit
-        )
-        if response["ok"] is False:
-            raise SlackApiError(self.workspace, method, response, params)
-        return response
+        async for page in self._fetch_list_pages(method, params, limit):
+            response: SlackConversationsMembersResponse = page
+            if response["ok"] is False:
+                raise SlackApiError(self.workspace, method, response, params)
+            yield response
 
-    async def fetch_conversations_list_public(
+    async def fetch_conversations_list_public_pages(
         self,
         exclude_archived: bool = True,
         limit: Optional[int] = 1000,
-    ):
+    ) -> AsyncIterator[SlackConversationsListPublicSuccessResponse]:
         method = "conversations.list"
         params: Params = {
             "exclude_archived": exclude_archived,
             "types": "public_channel",
         }
-        response: SlackConversationsListPublicResponse = await self._fetch_list(
-            method, "chanels", params, limit
-        )
-        if response["ok"] is False:
-            raise SlackApiError(self.workspace, method, response, params)
-        return response
+        async for page in self._fetch_list_pages(method, params, limit):
+            response: SlackConversationsListPublicResponse = page
+            if response["ok"] is False:
+                raise SlackApiError(self.workspace, method, response, params)
+            yield response
 
     async def fetch_users_conversations(
         self,
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import hashlib
-from collections import OrderedDict
+from collections import deque
+from itertools import takewhile
 from typing import (
     TYPE_CHECKING,
+    AsyncIterator,
+    Deque,
     Dict,
     Generator,
     Iterable,
@@ -32,8 +35,8 @@ from slack.slack_message import (
 from slack.slack_message_buffer import SlackMessageBuffer
 from slack.slack_thread import SlackThread
 from slack.slack_user import Nick, SlackUser
-from slack.task import Task, gather, run_async
-from slack.util import unhtmlescape, with_color
+from slack.task import Task, create_task, gather
+from slack.util import PrefixIndex, SortedDict, unhtmlescape, with_color
 
 if TYPE_CHECKING:
     from slack_api.slack_client_userboot import SlackClientUserbootIm
@@ -93,6 +96,7 @@ class SlackConversationMessageHashes(Dict[SlackTs, str]):
         super().__init__()
         self._conversation = conversation
         self._inverse_map: Dict[str, SlackTs] = {}
+        self._hash_index = PrefixIndex()
 
     def __setitem__(self, key: SlackTs, value: str) -> NoReturn:
         raise RuntimeError("Set from outside isn't allowed")
@@ -101,6 +105,7 @@ class SlackConversationMessageHashes(Dict[SlackTs, str]):
         if key in self:
             hash_key = self[key]
             del self._inverse_map[hash_key]
+            self._hash_index.remove(hash_key)
         super().__delitem__(key)
 
     def _setitem(self, key: SlackTs, value: str) -> None:
@@ -111,14 +116,13 @@ class SlackConversationMessageHashes(Dict[SlackTs, str]):
         full_hash = hash_from_ts(key)
         short_hash = full_hash[:hash_len]
 
-        while any(
-            existing_hash.startswith(short_hash) for existing_hash in self._inverse_map
-        ):
+        while self._hash_index.has_prefix(short_hash):
             hash_len += 1
             short_hash = full_hash[:hash_len]
 
         if short_hash[:-1] in self._inverse_map:
             ts_with_same_hash = self._inverse_map.pop(short_hash[:-1])
+            self._hash_index.remove(short_hash[:-1])
             other_full_hash = hash_from_ts(ts_with_same_hash)
             other_short_hash = other_full_hash[:hash_len]
 
@@ -129,17 +133,19 @@ class SlackConversationMessageHashes(Dict[SlackTs, str]):
 
             self._setitem(ts_with_same_hash, other_short_hash)
             self._inverse_map[other_short_hash] = ts_with_same_hash
+            self._hash_index.add(other_short_hash)
 
             other_message = self._conversation.messages.get(ts_with_same_hash)
             if other_message:
-                run_async(self._conversation.rerender_message(other_message))
+                self._conversation.schedule_rerender_message(other_message)
                 if other_message.thread_buffer is not None:
                     other_message.thread_buffer.update_buffer_props()
                 for reply in other_message.replies.values():
-                    run_async(self._conversation.rerender_message(reply))
+                    self._conversation.schedule_rerender_message(reply)
 
         self._setitem(key, short_hash)
         self._inverse_map[short_hash] = key
+        self._hash_index.add(short_hash)
         return self[key]
 
     def get_ts(self, ts_hash: str) -> Optional[SlackTs]:
@@ -169,7 +175,8 @@ class SlackConversation(SlackMessageBuffer):
         self._members: Optional[List[str]] = None
         self._im_user: Optional[SlackUser] = None
         self._mpim_users: Optional[List[SlackUser]] = None
-        self._messages: OrderedDict[SlackTs, SlackMessage] = OrderedDict()
+        self._messages: SortedDict[SlackTs, SlackMessage] = SortedDict()
+        self._removed_hash_tss: Deque[SlackTs] = deque()
         self._nicklist: Dict[Nick, str] = {}
         self.nicklist_needs_refresh = True
         self.message_hashes = SlackConversationMessageHashes(self)
@@ -221,6 +228,10 @@ class SlackConversation(SlackMessageBuffer):
     def id(self) -> str:
         return self._info["id"]
 
+    @property
+    def info(self) -> SlackConversationsInfoInternal:
+        return self._info
+
     @property
     def workspace(self) -> SlackWorkspace:
         return self._workspace
@@ -247,6 +258,10 @@ class SlackConversation(SlackMessageBuffer):
     def messages(self) -> Mapping[SlackTs, SlackMessage]:
         return self._messages
 
+    @property
+    def latest_message_ts(self) -> Optional[SlackTs]:
+        return next(reversed(self._messages), None)
+
     @property
     def type(self) -> Literal["channel", "private", "mpim", "im"]:
         if self._info["is_im"] is True:
@@ -280,6 +295,16 @@ class SlackConversation(SlackMessageBuffer):
         if self.type == "im":
             return self._info.get("user")
 
+    def update_info_json(self, info_json: SlackConversationsInfoInternal):
+        self._info.update(info_json)  # pyright: ignore [reportArgumentType, reportCallIssue]
+        if "topic" in self._info:
+            self._topic = self._info["topic"]
+        if "last_read" in info_json:
+            last_read = SlackTs(info_json["last_read"])
+            if last_read != self.last_read:
+                self.last_read = last_read
+        self.update_buffer_props()
+
     def _add_or_update_message(self, message: SlackMessage):
         if message.ts in self._messages:
             self._messages[message.ts].update_message_json(message.message_json)
@@ -402,14 +427,30 @@ class SlackConversation(SlackMessageBuffer):
         if parent_message and parent_message.thread_buffer:
             await parent_message.thread_buffer.rerender_message(message)
 
+    # Yields the members one page at a time, so large conversations can be
+    # processed while the rest of the members are being fetched
+    async def load_members_pages(
+        self, load_all: bool = False
+    ) -> AsyncIterator[List[str]]:
+        if self._members is not None:
+            self.workspace.users.initialize_items(self._members)
+            yield self._members
+            return
+
+        members: List[str] = []
+        async for page in self.api.fetch_conversations_members_pages(
+            self, limit=None if load_all else 1000
+        ):
+            self.workspace.users.initialize_items(page["members"])
+            members.extend(page["members"])
+            yield page["members"]
+        self._members = members
+
     async def load_members(self, load_all: bool = False):
-        if self._members is None:
-            members_response = await self.api.fetch_conversations_members(
-                self, limit=None if load_all else 1000
-            )
-            self._members = members_response["members"]
-        self.workspace.users.initialize_items(self._members)
-        return self._members
+        members: List[str] = []
+        async for page in self.load_members_pages(load_all):
+            members.extend(page)
+        return members
 
     async def fetch_replies(
         self, thread_ts: SlackTs
@@ -444,8 +485,6 @@ class SlackConversation(SlackMessageBuffer):
         for reply in replies:
             self._add_or_update_message(reply)
 
-        self._messages = OrderedDict(sorted(self._messages.items()))
-
         parent_message.reply_history_filled = True
         return parent_message, replies
 
@@ -500,6 +539,75 @@ class SlackConversation(SlackMessageBuffer):
                     weechat.buffer_set(self.buffer_pointer, "hotlist", priority.value)
                     self.hotlist_tss.add(message.latest_reply)
                 await message.handle_thread_notify_and_auto_open()
+            self._trim_messages()
+
+    # The order thread replies are fetched in when filling the history. Threads
+    # in the current buffer come first, then threads in buffers visible in a
+    # window, then threads with unread replies and then the rest, each oldest
+    # first, so the history can be printed from the top as replies come in.
+    def _replies_fetch_priority(self, message: SlackMessage) -> Tuple[int, SlackTs]:
+        if self.buffer_pointer is not None:
+            if self.buffer_pointer == shared.current_buffer_pointer:
+                return (0, message.ts)
+            if weechat.buffer_get_integer(self.buffer_pointer, "num_displayed"):
+                return (1, message.ts)
+        if message.latest_reply and message.latest_reply > message.last_read:
+            return (2, message.ts)
+        return (3, message.ts)
+
+    def _fetch_replies_limited(self, message: SlackMessage):
+        return create_task(
+            self.workspace.replies_limiter.run(
+                self.fetch_replies(message.ts),
+                lambda: self._replies_fetch_priority(message),
+            )
+        )
+
+    def _unprinted_messages(self, before: Optional[SlackTs]) -> List[SlackMessage]:
+        tss = (
+            self._messages
+            if self.last_printed_ts is None
+            else self._messages.after(self.last_printed_ts)
+        )
+        if before is not None:
+            tss = takewhile(lambda ts: ts < before, tss)
+        unprinted_messages = (self._messages[ts] for ts in tss)
+        return [m for m in unprinted_messages if self.should_display_message(m)]
+
+    async def _print_history_messages(self, messages: List[SlackMessage]):
+        user_ids = [m.sender_user_id for m in messages if m.sender_user_id]
+        if self.display_reaction_nicks():
+            reaction_user_ids = [
+                user_id
+                for m in messages
+                for reaction in m.reactions
+                for user_id in reaction["users"]
+            ]
+            user_ids.extend(reaction_user_ids)
+
+        parsed_messages = [item for m in messages for item in m.parse_message_text()]
+        pending_items = [
+            item for item in parsed_messages if isinstance(item, PendingMessageItem)
+        ]
+        item_user_ids = [
+            item.item_id for item in pending_items if item.item_type == "user"
+        ]
+        user_ids.extend(item_user_ids)
+
+        self.workspace.users.initialize_items(user_ids)
+
+        sender_bot_ids = [
+            m.sender_bot_id
+            for m in messages
+            if m.sender_bot_id and not m.sender_user_id
+        ]
+        self.workspace.bots.initialize_items(sender_bot_ids)
+
+        await gather(*(message.render(self.context) for message in messages))
+
+        for message in messages:
+            await self.print_message(message)
+            await message.handle_thread_notify_and_auto_open()
 
     async def fill_history(self, update: bool = False):
         if self.is_loading:
@@ -522,84 +630,57 @@ class SlackConversation(SlackMessageBuffer):
             for message in reversed(conversation_messages):
                 self._add_or_update_message(message)
 
-            if self.display_thread_replies():
-                await gather(
-                    *(
-                        self.fetch_replies(message.ts)
-                        for message in conversation_messages
-                        if message.is_thread_parent
-                    )
+            # Replies are fetched with a limited number of requests at a time.
+            # The messages before the oldest thread which hasn't got its
+            # replies yet are printed while waiting, since the replies of the
+            # remaining threads are all newer than that.
+            thread_parents = (
+                sorted(
+                    (m for m in conversation_messages if m.is_thread_parent),
+                    key=lambda m: m.ts,
                 )
+                if self.display_thread_replies()
+                else []
+            )
+            replies_tasks = [self._fetch_replies_limited(m) for m in thread_parents]
 
             if self.history_needs_refresh:
                 await self.rerender_history()
 
-            self._messages = OrderedDict(sorted(self._messages.items()))
             self.history_pending_messages.clear()
-            messages = [
-                message
-                for message in self._messages.values()
-                if self.should_display_message(message)
-                and (self.last_printed_ts is None or message.ts > self.last_printed_ts)
-            ]
-
-            user_ids = [m.sender_user_id for m in messages if m.sender_user_id]
-            if self.display_reaction_nicks():
-                reaction_user_ids = [
-                    user_id
-                    for m in messages
-                    for reaction in m.reactions
-                    for user_id in reaction["users"]
-                ]
-                user_ids.extend(reaction_user_ids)
-
-            parsed_messages = [
-                item for m in messages for item in m.parse_message_text()
-            ]
-            pending_items = [
-                item for item in parsed_messages if isinstance(item, PendingMessageItem)
-            ]
-            item_user_ids = [
-                item.item_id for item in pending_items if item.item_type == "user"
-            ]
-            user_ids.extend(item_user_ids)
-
-            self.workspace.users.initialize_items(user_ids)
-
-            sender_bot_ids = [
-                m.sender_bot_id
-                for m in messages
-                if m.sender_bot_id and not m.sender_user_id
-            ]
-            self.workspace.bots.initialize_items(sender_bot_ids)
-
-            await gather(*(message.render(self.context) for message in messages))
-
-            for message in messages:
-                await self.print_message(message)
-                await message.handle_thread_notify_and_auto_open()
+            for parent, replies_task in zip(thread_parents, replies_tasks):
+                if not replies_task.done():
+                    await self._print_history_messages(
+                        self._unprinted_messages(before=parent.ts)
+                    )
+                await replies_task
+                # The reply count of a parent which was already printed may
+                # have changed
+                if self.last_printed_ts and parent.ts <= self.last_printed_ts:
+                    self.schedule_rerender_message(parent)
+            await self._print_history_messages(self._unprinted_messages(before=None))
 
             while self.history_pending_messages:
                 message = self.history_pending_messages.pop(0)
                 await self.print_message(message)
 
             self.history_needs_refresh = False
+            self._trim_messages()
 
     async def nicklist_update(self):
         if self.nicklist_needs_refresh and self.type != "im":
             self.nicklist_needs_refresh = False
             try:
-                members = await self.load_members()
+                async for members in self.load_members_pages():
+                    users = await gather(
+                        *(self.workspace.users[user_id] for user_id in members)
+                    )
+                    for user in users:
+                        self.nicklist_add_nick(user.nick)
             except SlackApiError as e:
                 if e.response["error"] == "enterprise_is_restricted":
                     return
                 raise e
-            else:
-                users = await gather(
-                    *(self.workspace.users[user_id] for user_id in members)
-                )
-                for user in users:
-                    self.nicklist_add_nick(user.nick)
 
     def nicklist_add_nick(self, nick: Nick):
         if nick in self._nicklist or self.type == "im" or self.buffer_pointer is None:
@@ -685,6 +766,15 @@ class SlackConversation(SlackMessageBuffer):
                 return bool(weechat.config_string_to_boolean(buffer_value))
         return shared.config.look.display_reaction_nicks.value
 
+    def max_messages(self) -> int:
+        if self.buffer_pointer is not None:
+            buffer_value = weechat.buffer_get_string(
+                self.buffer_pointer, "localvar_max_messages_per_conversation"
+            )
+            if buffer_value.isdigit():
+                return int(buffer_value)
+        return shared.config.look.max_messages_per_conversation.value
+
     def should_display_message(self, message: SlackMessage) -> bool:
         return (
             not message.is_reply
@@ -692,8 +782,67 @@ class SlackConversation(SlackMessageBuffer):
             or self.display_thread_replies()
         )
 
+    # Messages in the hotlist, with an open thread or in an open thread are
+    # kept. This only looks at the message and its parent, so the messages to
+    # keep don't have to be collected from all messages on every trim.
+    def _keep_message(self, message: SlackMessage) -> bool:
+        if message.ts in self.hotlist_tss or message.thread_buffer is not None:
+            return True
+        parent_message = message.parent_message
+        return parent_message is not None and parent_message.thread_buffer is not None
+
+    # The hashes of removed messages are kept while their lines are still in
+    # the buffer. Lines are removed from the start, like messages, so stop at
+    # the first message which still has a line.
+    def _prune_removed_message_hashes(self):
+        while self._removed_hash_tss:
+            ts = self._removed_hash_tss[0]
+            if self.line_pointer_for_ts(ts) is not None:
+                break
+            self._removed_hash_tss.popleft()
+            if ts not in self._messages and ts in self.message_hashes:
+                del self.message_hashes[ts]
+
+    def _trim_messages(self):
+        self._prune_removed_message_hashes()
+        max_messages = self.max_messages()
+        if max_messages <= 0 or len(self._messages) <= max_messages:
+            return
+
+        remove_count = len(self._messages) - max_messages
+        messages_to_remove: List[SlackMessage] = []
+        # Thread parents are kept while their latest reply is kept, so new
+        # replies don't have to fetch the thread again
+        parents_with_replies: List[SlackMessage] = []
+        for message in self._messages.values():
+            if len(messages_to_remove) >= remove_count:
+                break
+            if self._keep_message(message):
+                continue
+            if message.replies_tss and message.replies_tss[-1] in self._messages:
+                parents_with_replies.append(message)
+            else:
+                messages_to_remove.append(message)
+
+        tss_to_remove = set(message.ts for message in messages_to_remove)
+        for message in parents_with_replies:
+            if message.replies_tss[-1] in tss_to_remove:
+                messages_to_remove.append(message)
+
+        for message in messages_to_remove:
+            ts = message.ts
+            del self._messages[ts]
+            if ts in self.message_hashes:
+                if self.line_pointer_for_ts(ts) is None:
+                    del self.message_hashes[ts]
+                else:
+                    self._removed_hash_tss.append(ts)
+            parent_message = message.parent_message
+            if parent_message and ts in parent_message.replies_tss:
+                parent_message.replies_tss.remove(ts)
+                parent_message.reply_history_filled = False
+
     async def add_new_message(self, message: SlackMessage):
-        # TODO: Remove old messages
         self._add_or_update_message(message)
 
         parent_message = message.parent_message
@@ -741,6 +890,8 @@ class SlackConversation(SlackMessageBuffer):
                     f"{self.buffer_pointer};off;{user.nick.format()}",
                 )
 
+        self._trim_messages()
+
     async def change_message(
         self, data: Union[SlackMessageChanged, SlackMessageReplied]
     ):
@@ -748,7 +899,7 @@ class SlackConversation(SlackMessageBuffer):
         message = self._messages.get(ts)
         if message:
             message.update_message_json(data["message"])
-            await self.rerender_message(message)
+            self.schedule_rerender_message(message)
 
     async def delete_message(self, data: SlackMessageDeleted):
         ts = SlackTs(data["deleted_ts"])
@@ -757,7 +908,7 @@ class SlackConversation(SlackMessageBuffer):
         message = self._messages.get(ts)
         if message:
             message.deleted = True
-            await self.rerender_message(message)
+            self.schedule_rerender_message(message)
 
     async def update_message_room(
         self, data: Union[SlackShRoomJoin, SlackShRoomUpdate]
@@ -766,19 +917,19 @@ class SlackConversation(SlackMessageBuffer):
         message = self._messages.get(ts)
         if message:
             message.update_message_json_room(data["room"])
-            await self.rerender_message(message)
+            self.schedule_rerender_message(message)
 
     async def reaction_add(self, message_ts: SlackTs, reaction: str, user_id: str):
         message = self._messages.get(message_ts)
         if message:
             message.reaction_add(reaction, user_id)
-            await self.rerender_message(message)
+            self.schedule_rerender_message(message)
 
     async def reaction_remove(self, message_ts: SlackTs, reaction: str, user_id: str):
         message = self._messages.get(message_ts)
         if message:
             message.reaction_remove(reaction, user_id)
-            await self.rerender_message(message)
+            self.schedule_rerender_message(message)
 
     async def typing_add_user(self, data: SlackUserTyping):
         if not shared.config.look.typing_status_nicks:
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import weechat
+
+from slack.error import store_and_format_exception
+from slack.log import print_error
+from slack.util import get_callback_name
+
+if TYPE_CHECKING:
+    from typing_extensions import Literal
+
+    from slack.slack_workspace import SlackWorkspace
+
+    InfoCacheItemType = Literal["users", "bots", "usergroups"]
+
+INFO_CACHE_VERSION = 1
+INFO_CACHE_WRITE_DELAY_MS = 60000
+INFO_CACHE_ITEM_TYPES: List[InfoCacheItemType] = [
+    "users",
+    "bots",
+    "usergroups",
+]
+
+
+def get_info_cache_dir() -> str:
+    weechat_dir = (
+        weechat.info_get("weechat_cache_dir", "")
+        or weechat.info_get("weechat_data_dir", "")
+        or weechat.info_get("weechat_dir", "")
+    )
+    return os.path.join(weechat_dir, "slack")
+
+
+class SlackInfoCache:
+    def __init__(self, workspace: SlackWorkspace):
+        self.workspace = workspace
+        self._items: Optional[Dict[InfoCacheItemType, Dict[str, Any]]] = None
+        self._team_id: Optional[str] = None
+        self._write_timer: Optional[str] = None
+        self._write_timer_cb_name = get_callback_name(self._write_timer_cb)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(get_info_cache_dir(), f"{self.workspace.name}.json")
+
+    @property
+    def enabled(self) -> bool:
+        return self.workspace.config.cache_info.value
+
+    def _load(self) -> Dict[InfoCacheItemType, Dict[str, Any]]:
+        if self._items is not None:
+            return self._items
+
+        self._items = {item_type: {} for item_type in INFO_CACHE_ITEM_TYPES}
+        if not self.enabled or not os.path.exists(self.path):
+            return self._items
+
+        try:
+            with open(self.path) as f:
+                cache = json.load(f)
+        except Exception as e:
+            print_error(
+                f"couldn't read info cache for workspace {self.workspace.name}: "
+                f"{store_and_format_exception(e)}"
+            )
+            return self._items
+
+        if cache.get("version") == INFO_CACHE_VERSION:
+            self._team_id = cache.get("team_id")
+            for item_type in INFO_CACHE_ITEM_TYPES:
+                self._items[item_type] = cache.get(item_type, {})
+        return self._items
+
+    def set_team_id(self, team_id: str):
+        items = self._load()
+        if self._team_id != team_id:
+            # The token has been changed to another team, so discard the cache
+            for item_type in INFO_CACHE_ITEM_TYPES:
+                items[item_type] = {}
+            self._team_id = team_id
+
+    def get(self, item_type: InfoCacheItemType, item_id: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        return self._load()[item_type].get(item_id)
+
+    def set(self, item_type: InfoCacheItemType, item_id: str, info: Any):
+        if not self.enabled:
+            return
+        self._load()[item_type][item_id] = info
+        self._schedule_write()
+
+    def remove(self, item_type: InfoCacheItemType, item_id: str):
+        if not self.enabled:
+            return
+        items = self._load()[item_type]
+        if item_id in items:
+            del items[item_id]
+            self._schedule_write()
+
+    def _schedule_write(self):
+        if self._write_timer is None:
+            self._write_timer = weechat.hook_timer(
+                INFO_CACHE_WRITE_DELAY_MS, 0, 1, self._write_timer_cb_name, ""
+            )
+
+    def _write_timer_cb(self, data: str, remaining_calls: int) -> int:
+        self._write_timer = None
+        self.write()
+        return weechat.WEECHAT_RC_OK
+
+    def write(self):
+        if self._write_timer is not None:
+            weechat.unhook(self._write_timer)
+            self._write_timer = None
+
+        if self._items is None or self._team_id is None or not self.enabled:
+            return
+
+        cache: Dict[str, Any] = {
+            "version": INFO_CACHE_VERSION,
+            "team_id": self._team_id,
+            **self._items,
+        }
+        path = self.path
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(cache, f)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            print_error(
+                f"couldn't write info cache for workspace {self.workspace.name}: "
+                f"{store_and_format_exception(e)}"
+            )
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import json
 import re
+import zlib
 from datetime import date, datetime, timedelta
 from enum import Enum
 from typing import (
     TYPE_CHECKING,
+    Any,
+    Dict,
     Generator,
     Iterable,
     List,
     Mapping,
     Match,
     Optional,
+    Tuple,
     Union,
 )
 
@@ -24,6 +29,7 @@ from slack.error import (
     store_uncaught_error,
 )
 from slack.log import print_error
+from slack.profiler import profiler
 from slack.python_compatibility import removeprefix, removesuffix
 from slack.shared import shared
 from slack.slack_emoji import get_emoji
@@ -35,7 +41,7 @@ from slack.slack_user import (
     nick_color,
 )
 from slack.task import gather
-from slack.util import htmlescape, intersperse, unhtmlescape, with_color
+from slack.util import intersperse, unhtmlescape, with_color
 
 if TYPE_CHECKING:
     from slack_api.slack_conversations_history import SlackMessage as SlackMessageDict
@@ -55,11 +61,25 @@ if TYPE_CHECKING:
 
     from slack.slack_conversation import SlackConversation
     from slack.slack_thread import SlackThread
+    from slack.slack_user import SlackUser, SlackUsergroup
     from slack.slack_workspace import SlackWorkspace
+    from slack.weechat_config import WeeChatColor, WeeChatOption
 
     MessageContext = Literal["conversation", "thread"]
+    PendingMessageItemType = Literal[
+        "conversation",
+        "user",
+        "usergroup",
+        "broadcast",
+        "message_nick",
+        "file",
+        "emoji",
+        "url",
+        "text",
+    ]
 else:
     MessageContext = str
+    PendingMessageItemType = str
 
 ts_tag_prefix = "slack_ts_"
 
@@ -164,89 +184,176 @@ class MessagePriority(Enum):
     HIGHLIGHT = weechat.WEECHAT_HOTLIST_HIGHLIGHT
 
 
+# Returns a ts as a single integer which sorts in the same order as the ts
+def slack_ts_key(ts: str) -> int:
+    major, _, minor = ts.partition(".")
+    return int(major) * 1000000 + int(minor or 0)
+
+
+# A ts which is compared and hashed by its integer key, which is only computed
+# once. Comparing with a plain str parses it, without creating a SlackTs.
 class SlackTs(str):
+    __slots__ = ("key",)
+
     def __init__(self, ts: str):
-        self.major, self.minor = [int(x) for x in ts.split(".", maxsplit=1)]
+        self.key = ts.key if isinstance(ts, SlackTs) else slack_ts_key(ts)
+
+    @property
+    def major(self) -> int:
+        return self.key // 1000000
+
+    @property
+    def minor(self) -> int:
+        return self.key % 1000000
 
     def __hash__(self) -> int:
-        return hash((self.major, self.minor))
+        return self.key
 
     def __repr__(self) -> str:
         return f"SlackTs('{self}')"
 
-    def _cmp(self, other: object) -> int:
-        if isinstance(other, str):
-            other = SlackTs(other)
-        if not isinstance(other, SlackTs):
-            return NotImplemented
-        elif self.major > other.major:
-            return 1
-        elif self.major < other.major:
-            return -1
-        elif self.minor > other.minor:
-            return 1
-        elif self.minor < other.minor:
-            return -1
+    def _other_key(self, other: object) -> Optional[int]:
+        if isinstance(other, SlackTs):
+            return other.key
+        elif isinstance(other, str):
+            return slack_ts_key(other)
         else:
-            return 0
+            return None
 
     def __eq__(self, other: object) -> bool:
-        return self._cmp(other) == 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key == other_key
 
     def __ne__(self, other: object) -> bool:
-        return self._cmp(other) != 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key != other_key
 
     def __gt__(self, other: object) -> bool:
-        return self._cmp(other) == 1
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key > other_key
 
     def __ge__(self, other: object) -> bool:
-        return self._cmp(other) >= 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key >= other_key
 
     def __lt__(self, other: object) -> bool:
-        return self._cmp(other) == -1
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key < other_key
 
     def __le__(self, other: object) -> bool:
-        return self._cmp(other) <= 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key <= other_key
 
 
+# An item in a parsed message which is formatted when the message is rendered,
+# either because it refers to something that has to be fetched, or because the
+# formatting depends on the config. What an item refers to is only fetched
+# once, so after a config change the message can be rendered again without
+# parsing it or fetching anything.
 class PendingMessageItem:
+    __slots__ = (
+        "message",
+        "item_type",
+        "item_id",
+        "display_type",
+        "fallback_name",
+        "file",
+        "skin_tone",
+        "color_option",
+        "_fetched",
+        "_conversation",
+        "_user",
+        "_usergroup",
+        "_nick",
+        "_unsupported_file_error_id",
+    )
+
     def __init__(
         self,
         message: SlackMessage,
-        item_type: Literal[
-            "conversation", "user", "usergroup", "broadcast", "message_nick", "file"
-        ],
+        item_type: PendingMessageItemType,
         item_id: str,
         display_type: Literal["mention", "chat"] = "mention",
         fallback_name: Optional[str] = None,
         file: Optional[SlackFile] = None,
+        skin_tone: Optional[int] = None,
+        color_option: Optional[str] = None,
     ):
         self.message = message
-        self.item_type: Literal[
-            "conversation", "user", "usergroup", "broadcast", "message_nick", "file"
-        ] = item_type
+        self.item_type: PendingMessageItemType = item_type
         self.item_id = item_id
         self.display_type: Literal["mention", "chat"] = display_type
         self.fallback_name = fallback_name
         self.file = file
+        self.skin_tone = skin_tone
+        # Name of the option in the color section to show a text item with
+        self.color_option = color_option
+        self._fetched = False
+        self._conversation: Optional[SlackConversation] = None
+        self._user: Optional[SlackUser] = None
+        self._usergroup: Optional[SlackUsergroup] = None
+        self._nick: Optional[Nick] = None
+        self._unsupported_file_error_id: Optional[str] = None
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.message}, {self.item_type}, {self.item_id}, {self.display_type})"
 
-    async def resolve(self) -> str:
+    @property
+    def fetched(self) -> bool:
+        return self._fetched
+
+    async def fetch(self) -> None:
+        if self._fetched:
+            return
+
         if self.item_type == "conversation":
             try:
-                conversation = await self.message.workspace.conversations[self.item_id]
-                name = conversation.name_with_prefix("short_name_without_padding")
+                self._conversation = await self.message.workspace.conversations[
+                    self.item_id
+                ]
             except (SlackApiError, SlackError) as e:
-                if is_not_found_error(e):
-                    name = (
-                        f"#{self.fallback_name}"
-                        if self.fallback_name
-                        else "#<private channel>"
-                    )
-                else:
+                if not is_not_found_error(e):
+                    raise e
+
+        elif self.item_type == "user":
+            try:
+                self._user = await self.message.workspace.users[self.item_id]
+            except (SlackApiError, SlackError) as e:
+                if not is_not_found_error(e):
+                    raise e
+
+        elif self.item_type == "usergroup":
+            try:
+                self._usergroup = await self.message.workspace.usergroups[self.item_id]
+            except (SlackApiError, SlackError) as e:
+                if not (
+                    isinstance(e, SlackApiError)
+                    and e.response["error"] == "invalid_auth"
+                    or is_not_found_error(e)
+                ):
                     raise e
+
+        elif self.item_type == "message_nick":
+            self._nick = await self.message.nick()
+
+        elif self.item_type == "file":
+            if self.file is None or self.file.get("file_access") == "check_file_info":
+                file_response = await self.message.workspace.api.fetch_files_info(
+                    self.item_id
+                )
+                self.file = file_response["file"]
+
+        self._fetched = True
+
+    # Must only be called after fetch
+    def format(self) -> str:
+        if self.item_type == "conversation":
+            if self._conversation is not None:
+                name = self._conversation.name_with_prefix("short_name_without_padding")
+            elif self.fallback_name:
+                name = f"#{self.fallback_name}"
+            else:
+                name = "#<private channel>"
             if self.display_type == "mention":
                 color = shared.config.color.channel_mention.value
             elif self.display_type == "chat":
@@ -256,18 +363,13 @@ class PendingMessageItem:
             return with_color(color, name)
 
         elif self.item_type == "user":
-            try:
-                user = await self.message.workspace.users[self.item_id]
-            except (SlackApiError, SlackError) as e:
-                if is_not_found_error(e):
-                    name = (
-                        f"@{self.fallback_name}"
-                        if self.fallback_name
-                        else f"@{self.item_id}"
-                    )
-                    return name
-                else:
-                    raise e
+            user = self._user
+            if user is None:
+                return (
+                    f"@{self.fallback_name}"
+                    if self.fallback_name
+                    else f"@{self.item_id}"
+                )
 
             if self.display_type == "mention":
                 name = f"@{user.nick.format()}"
@@ -283,20 +385,10 @@ class PendingMessageItem:
                 assert_never(self.display_type)
 
         elif self.item_type == "usergroup":
-            try:
-                usergroup = await self.message.workspace.usergroups[self.item_id]
-                name = f"@{usergroup.handle()}"
-            except (SlackApiError, SlackError) as e:
-                if (
-                    isinstance(e, SlackApiError)
-                    and e.response["error"] == "invalid_auth"
-                    or is_not_found_error(e)
-                ):
-                    name = (
-                        self.fallback_name if self.fallback_name else f"@{self.item_id}"
-                    )
-                else:
-                    raise e
+            if self._usergroup is not None:
+                name = f"@{self._usergroup.handle()}"
+            else:
+                name = self.fallback_name if self.fallback_name else f"@{self.item_id}"
             return with_color(shared.config.color.usergroup_mention.value, name)
 
         elif self.item_type == "broadcast":
@@ -305,18 +397,12 @@ class PendingMessageItem:
             return with_color(shared.config.color.usergroup_mention.value, name)
 
         elif self.item_type == "message_nick":
-            nick = await self.message.nick()
-            return nick.format(colorize=True)
+            assert self._nick is not None
+            return self._nick.format(colorize=True)
 
         elif self.item_type == "file":
-            if self.file is None or self.file.get("file_access") == "check_file_info":
-                file_response = await self.message.workspace.api.fetch_files_info(
-                    self.item_id
-                )
-                file = file_response["file"]
-            else:
-                file = self.file
-
+            assert self.file is not None
+            file = self.file
             if file.get("mode") == "tombstone":
                 return with_color(
                     shared.config.color.deleted_message.value,
@@ -343,17 +429,37 @@ class PendingMessageItem:
                 title = unhtmlescape(file.get("title", ""))
                 return format_url(file["url_private"], title)
             else:
-                error = SlackError(self.message.workspace, "Unsupported file", file)
-                uncaught_error = UncaughtError(error)
-                store_uncaught_error(uncaught_error)
+                if self._unsupported_file_error_id is None:
+                    error = SlackError(self.message.workspace, "Unsupported file", file)
+                    uncaught_error = UncaughtError(error)
+                    store_uncaught_error(uncaught_error)
+                    self._unsupported_file_error_id = uncaught_error.id
                 return with_color(
                     shared.config.color.render_error.value,
-                    f"<Unsupported file, error id: {uncaught_error.id}>",
+                    f"<Unsupported file, error id: {self._unsupported_file_error_id}>",
                 )
 
+        elif self.item_type == "emoji":
+            return get_emoji(self.item_id, self.skin_tone)
+
+        elif self.item_type == "url":
+            return format_url(self.item_id, self.fallback_name)
+
+        elif self.item_type == "text":
+            if self.color_option is None:
+                return self.item_id
+            color_option: WeeChatOption[WeeChatColor] = getattr(
+                shared.config.color, self.color_option
+            )
+            return with_color(color_option.value, self.item_id)
+
         else:
             assert_never(self.item_type)
 
+    async def resolve(self) -> str:
+        await self.fetch()
+        return self.format()
+
     def should_highlight(
         self, *, only_mention: bool = False, only_personal: bool = False
     ) -> bool:
@@ -371,18 +477,67 @@ class PendingMessageItem:
             return not only_personal
         elif self.item_type == "message_nick":
             return False
-        elif self.item_type == "file":
+        elif self.item_type in ("file", "emoji", "url", "text"):
             return False
         else:
             assert_never(self.item_type)
 
 
+# Checks if text is in any of the items, which for URL items means in the URL
+def items_contain_text(items: List[Union[str, PendingMessageItem]], text: str) -> bool:
+    for item in items:
+        if isinstance(item, str):
+            if text in item:
+                return True
+        elif item.item_type == "url" and text in item.item_id:
+            return True
+    return False
+
+
+# Fields which are only needed to parse a message, or rarely after that. With
+# the compact_messages option they are compressed after the message is parsed.
+# The profiles are used for the nick on every render, and the parsed file items
+# keep references to the files, so they aren't included.
+COMPACTED_MESSAGE_FIELDS = (
+    "text",
+    "blocks",
+    "attachments",
+)
+
+
+# Conversations can keep a lot of messages, so use __slots__ to save memory
 class SlackMessage:
+    __slots__ = (
+        "_message_json",
+        "_rendered_prefix",
+        "_rendered_message",
+        "_parsed_message",
+        "_parsed_message_options",
+        "_rendered_reactions",
+        "_reactions_version",
+        "conversation",
+        "ts",
+        "replies_tss",
+        "_replies",
+        "reply_history_filled",
+        "thread_buffer",
+        "_last_thread_notify",
+        "_deleted",
+        "_last_read",
+        "_compacted_fields",
+    )
+
     def __init__(self, conversation: SlackConversation, message_json: SlackMessageDict):
         self._message_json = message_json
+        self._compacted_fields: Optional[bytes] = None
         self._rendered_prefix = None
         self._rendered_message = None
         self._parsed_message: Optional[List[Union[str, PendingMessageItem]]] = None
+        self._parsed_message_options: Optional[Tuple[str, str]] = None
+        # Rendered string for each reaction, so a change to one reaction only
+        # renders that reaction again
+        self._rendered_reactions: Dict[str, str] = {}
+        self._reactions_version = 0
         self.conversation = conversation
         self.ts = SlackTs(message_json["ts"])
         self.replies_tss: List[SlackTs] = []
@@ -406,10 +561,37 @@ class SlackMessage:
     def __repr__(self):
         return f"{self.__class__.__name__}({self.conversation}, {self.ts})"
 
+    # If the message is compacted, this decompresses the compacted fields back
+    # into the message json, and it stays like that until it's parsed again
     @property
     def message_json(self) -> SlackMessageDict:
+        self._expand_message_json()
         return self._message_json
 
+    @property
+    def is_compacted(self) -> bool:
+        return self._compacted_fields is not None
+
+    def _compact_message_json(self):
+        if (
+            not shared.config.look.compact_messages.value
+            or self._compacted_fields is not None
+        ):
+            return
+        message_json: Dict[str, Any] = self._message_json  # pyright: ignore [reportAssignmentType]
+        fields = {
+            key: message_json.pop(key)
+            for key in COMPACTED_MESSAGE_FIELDS
+            if key in message_json
+        }
+        self._compacted_fields = zlib.compress(json.dumps(fields).encode())
+
+    def _expand_message_json(self):
+        if self._compacted_fields is not None:
+            fields = json.loads(zlib.decompress(self._compacted_fields))
+            self._message_json.update(fields)  # pyright: ignore [reportArgumentType, reportCallIssue]
+            self._compacted_fields = None
+
     @property
     def workspace(self) -> SlackWorkspace:
         return self.conversation.workspace
@@ -504,7 +686,7 @@ class SlackMessage:
 
     @property
     def text(self) -> str:
-        return self._message_json["text"]
+        return self.message_json["text"]
 
     @property
     def deleted(self) -> bool:
@@ -517,10 +699,12 @@ class SlackMessage:
         self._parsed_message = None
 
     def update_message_json(self, message_json: SlackMessageDict):
+        self._expand_message_json()
         self._message_json.update(message_json)  # pyright: ignore [reportArgumentType, reportCallIssue]
         self._rendered_prefix = None
         self._rendered_message = None
         self._parsed_message = None
+        self.clear_rendered_reactions()
 
         if "last_read" in message_json:
             self.last_read = SlackTs(message_json["last_read"])
@@ -540,6 +724,15 @@ class SlackMessage:
         if subscribed:
             await self.handle_thread_notify_and_auto_open()
 
+    def clear_rendered_reactions(self):
+        self._rendered_reactions.clear()
+        self._reactions_version += 1
+
+    def _reaction_changed(self, reaction_name: str):
+        self._rendered_reactions.pop(reaction_name, None)
+        self._reactions_version += 1
+        self._rendered_message = None
+
     def _get_reaction(self, reaction_name: str):
         for reaction in self._message_json.get("reactions", []):
             if reaction["name"] == reaction_name:
@@ -557,14 +750,14 @@ class SlackMessage:
             self._message_json["reactions"].append(
                 {"name": reaction_name, "users": [user_id], "count": 1}
             )
-        self._rendered_message = None
+        self._reaction_changed(reaction_name)
 
     def reaction_remove(self, reaction_name: str, user_id: str):
         reaction = self._get_reaction(reaction_name)
         if reaction and user_id in reaction["users"]:
             reaction["users"].remove(user_id)
             reaction["count"] -= 1
-            self._rendered_message = None
+            self._reaction_changed(reaction_name)
 
     def has_reacted(self, reaction_name: str) -> bool:
         reaction = self._get_reaction(reaction_name)
@@ -790,36 +983,37 @@ class SlackMessage:
         self,
         context: MessageContext,
     ) -> str:
-        prefix_coro = self.render_prefix()
-        message_coro = self.render_message(context)
-        prefix, message = await gather(prefix_coro, message_coro)
-        self._rendered = f"{prefix}\t{message}"
-        return self._rendered
+        with profiler.measure("SlackMessage.render"):
+            prefix_coro = self.render_prefix()
+            message_coro = self.render_message(context)
+            prefix, message = await gather(prefix_coro, message_coro)
+            return f"{prefix}\t{message}"
 
     async def nick(self) -> Nick:
-        if "user_profile" in self._message_json:
+        message_json = self._message_json
+        if "user_profile" in message_json:
             # TODO: is_external
             nick = name_from_user_profile(
                 self.workspace,
-                self._message_json["user_profile"],
-                username=self._message_json["user_profile"]["name"],
+                message_json["user_profile"],
+                username=message_json["user_profile"]["name"],
             )
             return get_user_nick(nick, is_self=self.is_self_msg)
-        if "user" in self._message_json:
+        if "user" in message_json:
             try:
-                user = await self.workspace.users[self._message_json["user"]]
+                user = await self.workspace.users[message_json["user"]]
                 return user.nick
             except (SlackApiError, SlackError) as e:
                 if not is_not_found_error(e):
                     raise e
-        username = self._message_json.get("username")
+        username = message_json.get("username")
         if username:
             return get_bot_nick(username)
-        if "bot_profile" in self._message_json:
-            return get_bot_nick(self._message_json["bot_profile"]["name"])
-        if "bot_id" in self._message_json:
+        if "bot_profile" in message_json:
+            return get_bot_nick(message_json["bot_profile"]["name"])
+        if "bot_id" in message_json:
             try:
-                bot = await self.workspace.bots[self._message_json["bot_id"]]
+                bot = await self.workspace.bots[message_json["bot_id"]]
                 return bot.nick
             except (SlackApiError, SlackError) as e:
                 if not is_not_found_error(e):
@@ -843,15 +1037,32 @@ class SlackMessage:
         self._rendered_prefix = await self._render_prefix()
         return self._rendered_prefix
 
+    # The parsed message only depends on these options, the rest of the config
+    # is applied to the PendingMessageItems when the message is rendered
+    def _parse_options(self) -> Tuple[str, str]:
+        return (
+            shared.config.look.display_link_previews.value,
+            shared.config.look.color_message_attachments.value,
+        )
+
     def parse_message_text(
         self, update: bool = False
     ) -> List[Union[str, PendingMessageItem]]:
-        if self._parsed_message is not None and not update:
+        parse_options = self._parse_options()
+        if (
+            self._parsed_message is not None
+            and self._parsed_message_options == parse_options
+            and not update
+        ):
             return self._parsed_message
+        self._parsed_message_options = parse_options
+        self._expand_message_json()
 
         if self.deleted:
             self._parsed_message = [
-                with_color(shared.config.color.deleted_message.value, "(deleted)")
+                PendingMessageItem(
+                    self, "text", "(deleted)", color_option="deleted_message"
+                )
             ]
 
         elif self._message_json.get("subtype") in [
@@ -865,9 +1076,13 @@ class SlackMessage:
                 "group_join",
             ]
             text_action = (
-                f"{with_color(shared.config.color.message_join.value, 'has joined')}"
+                PendingMessageItem(
+                    self, "text", "has joined", color_option="message_join"
+                )
                 if is_join
-                else f"{with_color(shared.config.color.message_quit.value, 'has left')}"
+                else PendingMessageItem(
+                    self, "text", "has left", color_option="message_quit"
+                )
             )
             conversation_item = PendingMessageItem(
                 self, "conversation", self.conversation.id, "chat"
@@ -921,6 +1136,7 @@ class SlackMessage:
             attachment_items = self._render_attachments(texts)
             self._parsed_message = texts + files + attachment_items
 
+        self._compact_message_json()
         return self._parsed_message
 
     async def _render_message(self, rerender: bool = False) -> str:
@@ -934,13 +1150,8 @@ class SlackMessage:
                 else ""
             )
 
-            parsed_message = self.parse_message_text(rerender)
-            text = "".join(
-                [
-                    text if isinstance(text, str) else await text.resolve()
-                    for text in parsed_message
-                ]
-            )
+            parsed_message = self.parse_message_text()
+            text = "".join(await self._resolve_message_items(parsed_message))
             text_edited = (
                 f" {with_color(shared.config.color.edited_message_suffix.value, '(edited)')}"
                 if self._message_json.get("edited")
@@ -958,6 +1169,31 @@ class SlackMessage:
 
         return self._rendered_message
 
+    async def _resolve_message_items(
+        self, items: List[Union[str, PendingMessageItem]]
+    ) -> List[str]:
+        pending_items = [
+            item
+            for item in items
+            if isinstance(item, PendingMessageItem) and not item.fetched
+        ]
+        if pending_items:
+            # Fetch all the unknown users and usergroups in one request each
+            self.workspace.users.initialize_items(
+                item.item_id for item in pending_items if item.item_type == "user"
+            )
+            self.workspace.usergroups.initialize_items(
+                item.item_id for item in pending_items if item.item_type == "usergroup"
+            )
+            results = await gather(
+                *(item.fetch() for item in pending_items), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+        return [item if isinstance(item, str) else item.format() for item in items]
+
     async def render_message(
         self,
         context: MessageContext,
@@ -1001,7 +1237,12 @@ class SlackMessage:
             link = parts[3] if len(parts) > 3 else None
             return format_date(timestamp, parts[2], link)
         else:
-            return format_url(item_id, fallback_name)
+            return PendingMessageItem(
+                self,
+                "url",
+                unhtmlescape(item_id),
+                fallback_name=unhtmlescape(fallback_name) if fallback_name else None,
+            )
 
     def _unfurl_refs(
         self, message: str
@@ -1031,8 +1272,10 @@ class SlackMessage:
             else:
                 yield item
 
-    async def _create_reaction_string(self, reaction: SlackMessageReaction) -> str:
-        if self.conversation.display_reaction_nicks():
+    async def _create_reaction_string(
+        self, reaction: SlackMessageReaction, display_reaction_nicks: bool
+    ) -> str:
+        if display_reaction_nicks:
             users = await gather(
                 *(self.workspace.users[user_id] for user_id in reaction["users"])
             )
@@ -1060,13 +1303,38 @@ class SlackMessage:
         reactions_with_users = [
             reaction for reaction in reactions if reaction["count"] > 0
         ]
-        reaction_strings = await gather(
-            *(
-                self._create_reaction_string(reaction)
-                for reaction in reactions_with_users
+        reactions_to_render = [
+            reaction
+            for reaction in reactions_with_users
+            if reaction["name"] not in self._rendered_reactions
+        ]
+        rendered_reactions = self._rendered_reactions
+        if reactions_to_render:
+            display_reaction_nicks = self.conversation.display_reaction_nicks()
+            if display_reaction_nicks:
+                # Fetch all the unknown users in one request
+                self.workspace.users.initialize_items(
+                    user_id
+                    for reaction in reactions_to_render
+                    for user_id in reaction["users"]
+                )
+            rendered_reactions = dict(self._rendered_reactions)
+            reactions_version = self._reactions_version
+            reaction_strings = await gather(
+                *(
+                    self._create_reaction_string(reaction, display_reaction_nicks)
+                    for reaction in reactions_to_render
+                )
             )
+            for reaction, reaction_string in zip(reactions_to_render, reaction_strings):
+                rendered_reactions[reaction["name"]] = reaction_string
+            # Don't cache the strings if the reactions changed while rendering
+            if reactions_version == self._reactions_version:
+                self._rendered_reactions = rendered_reactions
+
+        reactions_string = " ".join(
+            rendered_reactions[reaction["name"]] for reaction in reactions_with_users
         )
-        reactions_string = " ".join(reaction_strings)
         if reactions_string:
             return " " + with_color(
                 shared.config.color.reaction_suffix.value, f"[{reactions_string}]"
@@ -1102,6 +1370,9 @@ class SlackMessage:
         text = f"[ Thread: {self.hash} Replies: {reply_count}{subscribed_text} ]"
         return " " + with_color(nick_color(str(self.hash)), text)
 
+    def _render_error_item(self, text: str) -> PendingMessageItem:
+        return PendingMessageItem(self, "text", text, color_option="render_error")
+
     def _render_blocks(
         self, blocks: List[SlackMessageBlock]
     ) -> List[Union[str, PendingMessageItem]]:
@@ -1122,18 +1393,20 @@ class SlackMessage:
                         if element["type"] == "button":
                             items.extend(self._render_block_element(element["text"]))
                             if "url" in element:
-                                items.append(format_url(element["url"]))
+                                items.append(
+                                    PendingMessageItem(self, "url", element["url"])
+                                )
                         else:
                             text = (
                                 f'<Unsupported block action type "{element["type"]}">'
                             )
-                            items.append(
-                                with_color(shared.config.color.render_error.value, text)
-                            )
+                            items.append(self._render_error_item(text))
                     block_lines.append(intersperse(items, " | "))
                 elif block["type"] == "call":
                     url = block["call"]["v1"]["join_url"]
-                    block_lines.append(["Join via " + format_url(url)])
+                    block_lines.append(
+                        ["Join via ", PendingMessageItem(self, "url", url)]
+                    )
                 elif block["type"] == "divider":
                     block_lines.append(["---"])
                 elif block["type"] == "context":
@@ -1188,25 +1461,15 @@ class SlackMessage:
                                 block_lines.append([f"```\n{''.join(texts)}\n```"])
                         else:
                             text = f'<Unsupported rich text type "{element["type"]}">'
-                            block_lines.append(
-                                [
-                                    with_color(
-                                        shared.config.color.render_error.value, text
-                                    )
-                                ]
-                            )
+                            block_lines.append([self._render_error_item(text)])
                 else:
                     text = f'<Unsupported block type "{block["type"]}">'
-                    block_lines.append(
-                        [with_color(shared.config.color.render_error.value, text)]
-                    )
+                    block_lines.append([self._render_error_item(text)])
             except Exception as e:
                 uncaught_error = UncaughtError(e)
                 print_error(store_and_format_uncaught_error(uncaught_error))
                 text = f"<Error rendering message {self.ts}, error id: {uncaught_error.id}>"
-                block_lines.append(
-                    [with_color(shared.config.color.render_error.value, text)]
-                )
+                block_lines.append([self._render_error_item(text)])
 
         return [item for items in intersperse(block_lines, ["\n"]) for item in items]
 
@@ -1277,9 +1540,16 @@ class SlackMessage:
                 else:
                     return element["url"]
             else:
-                return format_url(unhtmlescape(element["url"]), element.get("text"))
+                return PendingMessageItem(
+                    self,
+                    "url",
+                    unhtmlescape(element["url"]),
+                    fallback_name=element.get("text"),
+                )
         elif element["type"] == "emoji":
-            return get_emoji(element["name"], element.get("skin_tone"))
+            return PendingMessageItem(
+                self, "emoji", element["name"], skin_tone=element.get("skin_tone")
+            )
         elif element["type"] == "color":
             rgb_int = int(element["value"].lstrip("#"), 16)
             weechat_color = weechat.info_get("color_rgb2term", str(rgb_int))
@@ -1296,7 +1566,7 @@ class SlackMessage:
             return PendingMessageItem(self, "broadcast", element["range"])
         else:
             text = f'<Unsupported rich text element type "{element["type"]}">'
-            return with_color(shared.config.color.render_error.value, text)
+            return self._render_error_item(text)
 
     def _render_block_element(
         self,
@@ -1313,10 +1583,17 @@ class SlackMessage:
                 unhtmlescape(item) if isinstance(item, str) else item for item in items
             ]
         elif element["type"] == "image":
-            return [format_url(element["image_url"], element.get("alt_text"))]
+            return [
+                PendingMessageItem(
+                    self,
+                    "url",
+                    element["image_url"],
+                    fallback_name=element.get("alt_text"),
+                )
+            ]
         else:
             text = f'<Unsupported block element type "{element["type"]}">'
-            return [with_color(shared.config.color.render_error.value, text)]
+            return [self._render_error_item(text)]
 
     def _render_block_rich_text_list_prefix(
         self, list_element: SlackMessageBlockRichTextList, item_index: int
@@ -1387,14 +1664,17 @@ class SlackMessage:
             link_shown = False
             title = attachment.get("title")
             title_link = attachment.get("title_link", "")
-            if title_link and any(
-                isinstance(text, str) and title_link in text for text in items_before
-            ):
+            if title_link and items_contain_text(items_before, title_link):
                 title_link = ""
                 link_shown = True
             if title and title_link:
                 lines.append(
-                    [f"{prepend_title_text}{format_url(htmlescape(title_link), title)}"]
+                    [
+                        prepend_title_text,
+                        PendingMessageItem(
+                            self, "url", title_link, fallback_name=unhtmlescape(title)
+                        ),
+                    ]
                 )
                 prepend_title_text = ""
             elif title and not title_link:
@@ -1402,12 +1682,10 @@ class SlackMessage:
                 prepend_title_text = ""
             from_url = unhtmlescape(attachment.get("from_url", ""))
             if (
-                not any(
-                    isinstance(text, str) and from_url in text for text in items_before
-                )
+                not items_contain_text(items_before, from_url)
                 and from_url != title_link
             ):
-                lines.append([format_url(htmlescape(from_url))])
+                lines.append([PendingMessageItem(self, "url", from_url)])
             elif from_url:
                 link_shown = True
 
@@ -1419,13 +1697,11 @@ class SlackMessage:
 
             image_url = attachment.get("image_url", "")
             if (
-                not any(
-                    isinstance(text, str) and image_url in text for text in items_before
-                )
+                not items_contain_text(items_before, image_url)
                 and image_url != from_url
                 and image_url != title_link
             ):
-                lines.append([format_url(htmlescape(image_url))])
+                lines.append([PendingMessageItem(self, "url", image_url)])
             elif image_url:
                 link_shown = True
 
@@ -1531,6 +1807,8 @@ class SlackMessage:
 
 
 class SlackMessageReplies(Mapping[SlackTs, SlackMessage]):
+    __slots__ = ("_parent",)
+
     def __init__(self, parent: SlackMessage):
         super().__init__()
         self._parent = parent
@@ -20,6 +20,7 @@ from typing import (
 import weechat
 
 from slack.log import print_error
+from slack.profiler import profiler
 from slack.shared import (
     EMOJI_CHAR_OR_NAME_REGEX_STRING,
     MESSAGE_ID_REGEX_STRING,
@@ -29,7 +30,7 @@ from slack.shared import (
 from slack.slack_buffer import SlackBuffer
 from slack.slack_message import MessageContext, SlackMessage, SlackTs, ts_from_tag
 from slack.slack_user import Nick
-from slack.task import gather, run_async
+from slack.task import gather, run_async, sleep
 from slack.util import htmlescape
 from slack.weechat_buffer import buffer_new
 
@@ -38,6 +39,10 @@ if TYPE_CHECKING:
 
     from slack.slack_conversation import SlackConversation
 
+# How long to wait before rerendering changed messages, so a burst of changes,
+# e.g. many reactions to the same message, only rerenders each message once
+RERENDER_DELAY_MS = 50
+
 
 def hdata_line_ts(line_pointer: str) -> Optional[SlackTs]:
     data = weechat.hdata_pointer(weechat.hdata_get("line"), line_pointer, "data")
@@ -60,22 +65,43 @@ def tags_set_notify_none(tags: List[str]) -> List[str]:
     return tags
 
 
-def modify_buffer_line(buffer_pointer: str, ts: SlackTs, new_text: str):
+def modify_buffer_line(
+    buffer_pointer: str,
+    ts: SlackTs,
+    new_text: str,
+    line_pointer: Optional[str] = None,
+):
+    with profiler.measure("modify_buffer_line"):
+        return _modify_buffer_line(buffer_pointer, ts, new_text, line_pointer)
+
+
+def _modify_buffer_line(
+    buffer_pointer: str,
+    ts: SlackTs,
+    new_text: str,
+    line_pointer: Optional[str],
+):
     if not buffer_pointer:
         return False
 
     own_lines = weechat.hdata_pointer(
         weechat.hdata_get("buffer"), buffer_pointer, "own_lines"
     )
-    line_pointer = weechat.hdata_pointer(
+    last_line_pointer = weechat.hdata_pointer(
         weechat.hdata_get("lines"), own_lines, "last_line"
     )
 
-    # Find the last line with this ts
-    is_last_line = True
-    while line_pointer and hdata_line_ts(line_pointer) != ts:
-        is_last_line = False
-        line_pointer = weechat.hdata_move(weechat.hdata_get("line"), line_pointer, -1)
+    if line_pointer is not None:
+        is_last_line = line_pointer == last_line_pointer
+    else:
+        # Find the last line with this ts
+        line_pointer = last_line_pointer
+        is_last_line = True
+        while line_pointer and hdata_line_ts(line_pointer) != ts:
+            is_last_line = False
+            line_pointer = weechat.hdata_move(
+                weechat.hdata_get("line"), line_pointer, -1
+            )
 
     if not line_pointer:
         return False
@@ -157,6 +183,12 @@ class SlackMessageBuffer(SlackBuffer):
         self.history_needs_refresh = False
         self.last_printed_ts: Optional[SlackTs] = None
         self.hotlist_tss: Set[SlackTs] = set()
+        # Pointer to the last line of each printed message, in the order they
+        # were printed, and the inverse mapping
+        self._line_pointers: Dict[SlackTs, str] = {}
+        self._line_tss: Dict[str, SlackTs] = {}
+        # Messages waiting to be rerendered, see schedule_rerender_message
+        self._rerender_pending: Dict[SlackTs, SlackMessage] = {}
 
         self.completion_context: Literal[
             "NO_COMPLETION",
@@ -265,41 +297,123 @@ class SlackMessageBuffer(SlackBuffer):
     async def set_hotlist(self) -> None:
         raise NotImplementedError()
 
+    def _own_lines(self) -> Optional[str]:
+        if self.buffer_pointer is None:
+            return None
+        return weechat.hdata_pointer(
+            weechat.hdata_get("buffer"), self.buffer_pointer, "own_lines"
+        )
+
+    def clear_line_pointers(self):
+        self._line_pointers.clear()
+        self._line_tss.clear()
+
+    def _set_line_pointer(self, ts: SlackTs, line_pointer: str):
+        old_line_pointer = self._line_pointers.get(ts)
+        if old_line_pointer is not None:
+            del self._line_tss[old_line_pointer]
+        self._line_pointers[ts] = line_pointer
+        self._line_tss[line_pointer] = ts
+
+    # WeeChat removes the oldest lines when the buffer exceeds its line limits,
+    # so drop the pointers to lines that have been removed. Lines are only
+    # removed from the start, so only the oldest pointers have to be checked.
+    def _prune_line_pointers(self):
+        own_lines = self._own_lines()
+        if not self._line_pointers or own_lines is None:
+            return
+
+        first_line = weechat.hdata_pointer(
+            weechat.hdata_get("lines"), own_lines, "first_line"
+        )
+        while self._line_pointers:
+            ts, line_pointer = next(iter(self._line_pointers.items()))
+            if (
+                weechat.hdata_check_pointer(
+                    weechat.hdata_get("line"), first_line, line_pointer
+                )
+                and hdata_line_ts(line_pointer) == ts
+            ):
+                break
+            del self._line_pointers[ts]
+            self._line_tss.pop(line_pointer, None)
+
+    def line_pointer_for_ts(self, ts: SlackTs) -> Optional[str]:
+        if ts not in self._line_pointers:
+            return None
+        self._prune_line_pointers()
+        return self._line_pointers.get(ts)
+
+    # Must only be called for line pointers which are valid
+    def _line_ts(self, line_pointer: str) -> Optional[SlackTs]:
+        ts = self._line_tss.get(line_pointer)
+        return ts if ts is not None else hdata_line_ts(line_pointer)
+
+    def _modify_message_line(self, ts: SlackTs, new_text: str) -> bool:
+        if self.buffer_pointer is None:
+            return False
+
+        line_pointer = self.line_pointer_for_ts(ts)
+        if line_pointer is None:
+            return False
+
+        did_update = modify_buffer_line(self.buffer_pointer, ts, new_text, line_pointer)
+        own_lines = self._own_lines()
+        if shared.weechat_version < 0x04000000 and own_lines is not None:
+            # Lines may have been added if this is the last message
+            last_line = weechat.hdata_pointer(
+                weechat.hdata_get("lines"), own_lines, "last_line"
+            )
+            if last_line != line_pointer and hdata_line_ts(last_line) == ts:
+                self._set_line_pointer(ts, last_line)
+        return did_update
+
     async def rerender_message(self, message: SlackMessage):
         if self.buffer_pointer is None:
             return
 
         new_text = await message.render_message(context=self.context, rerender=True)
-        modify_buffer_line(self.buffer_pointer, message.ts, new_text)
+        self._modify_message_line(message.ts, new_text)
+
+    # Marks the message as changed and rerenders all the changed messages in
+    # this buffer once after RERENDER_DELAY_MS
+    def schedule_rerender_message(self, message: SlackMessage):
+        if not self._rerender_pending:
+            run_async(self._rerender_pending_messages())
+        self._rerender_pending[message.ts] = message
+
+    async def _rerender_pending_messages(self):
+        await sleep(RERENDER_DELAY_MS)
+        messages = list(self._rerender_pending.values())
+        self._rerender_pending.clear()
+        for message in messages:
+            await self.rerender_message(message)
 
     async def rerender_history(self):
         if self.buffer_pointer is None:
             return
 
-        if shared.weechat_version >= 0x04000000:
-            own_lines = weechat.hdata_pointer(
-                weechat.hdata_get("buffer"), self.buffer_pointer, "own_lines"
-            )
-            line_pointer = weechat.hdata_pointer(
-                weechat.hdata_get("lines"), own_lines, "last_line"
-            )
+        for message in self.messages.values():
+            message.clear_rendered_reactions()
 
-            while line_pointer:
-                ts = hdata_line_ts(line_pointer)
-                if ts:
-                    message = self.messages[ts]
+        if shared.weechat_version >= 0x04000000:
+            self._prune_line_pointers()
+            for ts, line_pointer in list(self._line_pointers.items()):
+                # Messages may have been removed from memory if they are old
+                message = self.messages.get(ts)
+                if message is not None:
                     new_text = await message.render_message(
                         context=self.context, rerender=True
                     )
+                    # The line may have been removed while rendering
+                    if self.line_pointer_for_ts(ts) != line_pointer:
+                        continue
                     data = weechat.hdata_pointer(
                         weechat.hdata_get("line"), line_pointer, "data"
                     )
                     weechat.hdata_update(
                         weechat.hdata_get("line_data"), data, {"message": new_text}
                     )
-                    line_pointer = weechat.hdata_move(
-                        weechat.hdata_get("line"), line_pointer, -1
-                    )
         else:
             for message in self.messages.values():
                 await self.rerender_message(message)
@@ -319,7 +433,7 @@ class SlackMessageBuffer(SlackBuffer):
 
         if self.last_printed_ts is not None and message.ts <= self.last_printed_ts:
             new_text = await message.render_message(context=self.context, rerender=True)
-            did_update = modify_buffer_line(self.buffer_pointer, message.ts, new_text)
+            did_update = self._modify_message_line(message.ts, new_text)
             if not did_update:
                 print_error(
                     f"Didn't find message with ts {message.ts} when last_printed_ts is {self.last_printed_ts}, message: {message}"
@@ -332,6 +446,14 @@ class SlackMessageBuffer(SlackBuffer):
         if message.ts in self.hotlist_tss:
             tags += ",notify_none"
         weechat.prnt_date_tags(self.buffer_pointer, message.ts.major, tags, rendered)
+        own_lines = self._own_lines()
+        line_pointer = (
+            weechat.hdata_pointer(weechat.hdata_get("lines"), own_lines, "last_line")
+            if own_lines is not None
+            else None
+        )
+        if line_pointer:
+            self._set_line_pointer(message.ts, line_pointer)
         if backlog:
             weechat.buffer_set(self.buffer_pointer, "unread", "")
         else:
@@ -352,8 +474,9 @@ class SlackMessageBuffer(SlackBuffer):
             line = weechat.hdata_pointer(
                 weechat.hdata_get("lines"), own_lines, "last_read_line"
             )
+            self._prune_line_pointers()
             while line:
-                ts = hdata_line_ts(line)
+                ts = self._line_ts(line)
                 if ts:
                     return ts
                 line = weechat.hdata_move(weechat.hdata_get("line"), line, -1)
@@ -387,18 +510,19 @@ class SlackMessageBuffer(SlackBuffer):
         )
 
         line = weechat.hdata_pointer(weechat.hdata_get("lines"), lines, "last_line")
+        self._prune_line_pointers()
         while line and index:
             if not message_filter:
                 index -= 1
             elif message_filter == "sender_self":
-                ts = hdata_line_ts(line)
-                if ts is not None:
-                    message = self.messages[ts]
-                    if (
-                        message.sender_user_id == self.workspace.my_user.id
-                        and message.subtype in [None, "me_message", "thread_broadcast"]
-                    ):
-                        index -= 1
+                ts = self._line_ts(line)
+                message = self.messages.get(ts) if ts is not None else None
+                if (
+                    message is not None
+                    and message.sender_user_id == self.workspace.my_user.id
+                    and message.subtype in [None, "me_message", "thread_broadcast"]
+                ):
+                    index -= 1
             else:
                 assert_never(message_filter)
 
@@ -408,7 +532,7 @@ class SlackMessageBuffer(SlackBuffer):
             line = weechat.hdata_move(weechat.hdata_get("line"), line, -1)
 
         if line:
-            return hdata_line_ts(line)
+            return self._line_ts(line)
 
     def ts_from_hash_or_index(
         self,
@@ -456,14 +580,17 @@ class SlackMessageBuffer(SlackBuffer):
         emoji_name = emoji["name"] if emoji else emoji_char
 
         if change_type == "toggle":
-            message = self.messages[ts]
-            has_reacted = message.has_reacted(emoji_name)
+            message = self.messages.get(ts)
+            has_reacted = message is not None and message.has_reacted(emoji_name)
             change_type = "-" if has_reacted else "+"
 
         await self.api.reactions_change(self.conversation, ts, emoji_name, change_type)
 
     async def edit_message(self, ts: SlackTs, old: str, new: str, flags: str):
-        message = self.messages[ts]
+        message = self.messages.get(ts)
+        if message is None:
+            print_error("The message is too old to be changed")
+            return
 
         if new == "" and old == "":
             await self.api.chat_delete_message(self.conversation, message.ts)
@@ -576,3 +703,4 @@ class SlackMessageBuffer(SlackBuffer):
         self._buffer_pointer = None
         self.last_printed_ts = None
         self.hotlist_tss.clear()
+        self.clear_line_pointers()
@@ -24,6 +24,8 @@ if TYPE_CHECKING:
 
 @dataclass
 class Nick:
+    __slots__ = ("color", "raw_nick", "suffix", "type")
+
     color: str
     raw_nick: str
     suffix: str
@@ -93,6 +95,8 @@ def get_bot_nick(nick: str) -> Nick:
 
 
 class SlackUser:
+    __slots__ = ("workspace", "_info")
+
     def __init__(self, workspace: SlackWorkspace, info: SlackUserInfo):
         self.workspace = workspace
         self._info = info
@@ -106,6 +110,10 @@ class SlackUser:
     def id(self) -> str:
         return self._info["id"]
 
+    @property
+    def info(self) -> SlackUserInfo:
+        return self._info
+
     @property
     def is_self(self) -> bool:
         return self.id == self.workspace.my_user.id
@@ -149,6 +157,8 @@ class SlackUser:
 
 
 class SlackBot:
+    __slots__ = ("workspace", "_info")
+
     def __init__(self, workspace: SlackWorkspace, info: SlackBotInfo):
         self.workspace = workspace
         self._info = info
@@ -158,10 +168,17 @@ class SlackBot:
         info_response = await workspace.api.fetch_bot_info(id)
         return cls(workspace, info_response["bot"])
 
+    @property
+    def info(self) -> SlackBotInfo:
+        return self._info
+
     @property
     def nick(self) -> Nick:
         return get_bot_nick(self._info["name"])
 
+    def update_info_json(self, info_json: SlackBotInfo):
+        self._info.update(info_json)  # pyright: ignore [reportArgumentType, reportCallIssue]
+
 
 class SlackUsergroup:
     def __init__(
@@ -177,6 +194,10 @@ class SlackUsergroup:
             raise SlackError(workspace, "usergroup_not_found")
         return cls(workspace, info_response["results"][0])
 
+    @property
+    def info(self) -> Union[SlackUsergroupInfo, SlackSubteam]:
+        return self._info
+
     def handle(self) -> str:
         return self._info["handle"]
 
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import json
 import re
-import socket
 import ssl
 import time
 from abc import ABC, abstractmethod
@@ -25,26 +24,38 @@ from websocket import (
     ABNF,
     WebSocket,
     WebSocketConnectionClosedException,
-    create_connection,
 )
 
 from slack.error import (
+    SlackApiError,
     SlackError,
     SlackRtmError,
     store_and_format_exception,
 )
 from slack.log import DebugMessageType, LogLevel, log, print_error
+from slack.profiler import profiler
 from slack.proxy import Proxy
 from slack.shared import shared
 from slack.slack_api import SlackApi
 from slack.slack_buffer import SlackBuffer
 from slack.slack_conversation import SlackConversation
+from slack.slack_info_cache import SlackInfoCache
 from slack.slack_message import SlackMessage, SlackTs
 from slack.slack_message_buffer import SlackMessageBuffer
 from slack.slack_thread import SlackThread
 from slack.slack_user import SlackBot, SlackUser, SlackUsergroup
-from slack.task import Future, Task, create_task, gather, run_async, sleep
+from slack.task import (
+    Future,
+    PriorityLimiter,
+    Task,
+    create_task,
+    gather,
+    gather_limited,
+    run_async,
+    sleep,
+)
 from slack.util import get_callback_name, get_cookies
+from slack.websocket_connect import connect_websocket
 from slack.weechat_buffer import buffer_new
 
 if TYPE_CHECKING:
@@ -58,6 +69,7 @@ if TYPE_CHECKING:
     from typing_extensions import Literal
 
     from slack.slack_conversation import SlackConversationsInfoInternal
+    from slack.slack_info_cache import InfoCacheItemType
     from slack.slack_search_buffer import SearchType, SlackSearchBuffer
 else:
     SlackBotInfo = object
@@ -98,13 +110,35 @@ SlackItemInfo = TypeVar(
 class SlackItem(
     ABC, Generic[SlackItemClass, SlackItemInfo], Dict[str, Future[SlackItemClass]]
 ):
-    def __init__(self, workspace: SlackWorkspace, item_class: Type[SlackItemClass]):
+    def __init__(
+        self,
+        workspace: SlackWorkspace,
+        item_class: Type[SlackItemClass],
+        cache_type: Optional[InfoCacheItemType],
+    ):
         super().__init__()
         self.workspace = workspace
         self._item_class = item_class
+        self._cache_type: Optional[InfoCacheItemType] = cache_type
+        self._item_ids_to_revalidate: Set[str] = set()
+        self._revalidate_task: Optional[Task[None]] = None
+
+    def _get_cached_info(self, item_id: str) -> Optional[SlackItemInfo]:
+        if self._cache_type is None:
+            return None
+        return self.workspace.info_cache.get(self._cache_type, item_id)
+
+    def _set_cached_info(self, item_id: str, item_info: object):
+        if self._cache_type is not None:
+            self.workspace.info_cache.set(self._cache_type, item_id, item_info)
 
     def __missing__(self, key: str):
-        self[key] = create_task(self._create_item(key))
+        cached_info = self._get_cached_info(key)
+        if cached_info is not None:
+            self[key] = create_task(self._create_item_from_info(cached_info))
+            self._queue_revalidation([key])
+        else:
+            self[key] = create_task(self._create_item(key))
         return self[key]
 
     def initialize_items(
@@ -114,19 +148,29 @@ class SlackItem(
     ):
         item_ids_to_init = set(item_id for item_id in item_ids if item_id not in self)
         if item_ids_to_init:
-            item_ids_to_fetch = (
-                set(
-                    item_id
-                    for item_id in item_ids_to_init
-                    if item_id not in items_info_prefetched
-                )
-                if items_info_prefetched
-                else item_ids_to_init
+            items_info_known: Dict[str, SlackItemInfo] = {
+                item_id: items_info_prefetched[item_id]
+                for item_id in item_ids_to_init
+                if items_info_prefetched and item_id in items_info_prefetched
+            }
+            items_info_cached: Dict[str, SlackItemInfo] = {}
+            for item_id in item_ids_to_init:
+                if item_id not in items_info_known:
+                    cached_info = self._get_cached_info(item_id)
+                    if cached_info is not None:
+                        items_info_cached[item_id] = cached_info
+            items_info_known.update(items_info_cached)
+            self._queue_revalidation(items_info_cached)
+
+            item_ids_to_fetch = item_ids_to_init - set(items_info_known)
+            items_info_task = (
+                create_task(self._fetch_items_info(item_ids_to_fetch))
+                if item_ids_to_fetch
+                else None
             )
-            items_info_task = create_task(self._fetch_items_info(item_ids_to_fetch))
             for item_id in item_ids_to_init:
                 self[item_id] = create_task(
-                    self._create_item(item_id, items_info_task, items_info_prefetched)
+                    self._create_item(item_id, items_info_task, items_info_known)
                 )
 
     async def _create_item(
@@ -136,15 +180,51 @@ class SlackItem(
         items_info_prefetched: Optional[Mapping[str, SlackItemInfo]] = None,
     ) -> SlackItemClass:
         if items_info_prefetched and item_id in items_info_prefetched:
-            return await self._create_item_from_info(items_info_prefetched[item_id])
+            item = await self._create_item_from_info(items_info_prefetched[item_id])
         elif items_info_task:
             items_info = await items_info_task
-            item = items_info.get(item_id)
-            if item is None:
+            item_info = items_info.get(item_id)
+            if item_info is None:
                 raise SlackError(self.workspace, "item_not_found")
-            return await self._create_item_from_info(item)
+            item = await self._create_item_from_info(item_info)
         else:
-            return await self._item_class.create(self.workspace, item_id)
+            item = await self._item_class.create(self.workspace, item_id)
+        self._set_cached_info(item_id, item.info)
+        return item
+
+    async def update_item_info(self, item_id: str, item_info: SlackItemInfo):
+        if item_id in self:
+            item = await self[item_id]
+            item.update_info_json(item_info)  # pyright: ignore [reportArgumentType]
+            self._set_cached_info(item_id, item.info)
+        elif self._get_cached_info(item_id) is not None:
+            self._set_cached_info(item_id, item_info)
+
+    def _queue_revalidation(self, item_ids: Iterable[str]):
+        self._item_ids_to_revalidate.update(item_ids)
+        if self._item_ids_to_revalidate and self._revalidate_task is None:
+            self._revalidate_task = create_task(self._revalidate_items())
+
+    async def _revalidate_items(self):
+        # Wait a bit, so more items are fetched in one request and so the
+        # requests don't compete with the ones needed for connecting
+        await sleep(5000)
+        item_ids = self._item_ids_to_revalidate
+        self._item_ids_to_revalidate = set()
+        self._revalidate_task = None
+
+        try:
+            items_info = await self._fetch_items_info(item_ids)
+        except (SlackApiError, SlackError) as e:
+            log(
+                LogLevel.INFO,
+                DebugMessageType.LOG,
+                f"failed revalidating cached {self._cache_type}: {e}",
+            )
+            return
+
+        for item_id, item_info in items_info.items():
+            await self.update_item_info(item_id, item_info)
 
     @abstractmethod
     async def _fetch_items_info(
@@ -159,16 +239,22 @@ class SlackItem(
 
 class SlackConversations(SlackItem[SlackConversation, SlackConversationsInfoInternal]):
     def __init__(self, workspace: SlackWorkspace):
-        super().__init__(workspace, SlackConversation)
+        # The conversation info includes the read status and whether it's open,
+        # which are used for opening buffers and the hotlist and may have
+        # changed since it was cached, so conversations aren't cached on disk
+        super().__init__(workspace, SlackConversation, None)
 
     async def _fetch_items_info(
         self, item_ids: Iterable[str]
     ) -> Dict[str, SlackConversationsInfoInternal]:
-        responses = await gather(
+        # There is no API for fetching info for multiple conversations at once,
+        # so limit how many requests are run at the same time
+        responses = await gather_limited(
+            self.workspace.config.max_concurrent_requests.value,
             *(
                 self.workspace.api.fetch_conversations_info(item_id)
                 for item_id in item_ids
-            )
+            ),
         )
         return {
             response["channel"]["id"]: response["channel"] for response in responses
@@ -182,7 +268,7 @@ class SlackConversations(SlackItem[SlackConversation, SlackConversationsInfoInte
 
 class SlackUsers(SlackItem[SlackUser, SlackUserInfo]):
     def __init__(self, workspace: SlackWorkspace):
-        super().__init__(workspace, SlackUser)
+        super().__init__(workspace, SlackUser, "users")
 
     async def _fetch_items_info(
         self, item_ids: Iterable[str]
@@ -196,7 +282,7 @@ class SlackUsers(SlackItem[SlackUser, SlackUserInfo]):
 
 class SlackBots(SlackItem[SlackBot, SlackBotInfo]):
     def __init__(self, workspace: SlackWorkspace):
-        super().__init__(workspace, SlackBot)
+        super().__init__(workspace, SlackBot, "bots")
 
     async def _fetch_items_info(
         self, item_ids: Iterable[str]
@@ -212,7 +298,7 @@ class SlackUsergroups(
     SlackItem[SlackUsergroup, Union[SlackUsergroupInfo, SlackSubteam]]
 ):
     def __init__(self, workspace: SlackWorkspace):
-        super().__init__(workspace, SlackUsergroup)
+        super().__init__(workspace, SlackUsergroup, "usergroups")
 
     async def _fetch_items_info(
         self, item_ids: Iterable[str]
@@ -244,9 +330,15 @@ class SlackWorkspace(SlackBuffer):
         self._debug_ws_buffer_pointer: Optional[str] = None
         self._reconnect_url: Optional[str] = None
         self.my_user: SlackUser
+        self.info_cache = SlackInfoCache(self)
         self.conversations = SlackConversations(self)
         self.open_conversations: Dict[str, SlackConversation] = {}
         self.search_buffers: Dict[SearchType, SlackSearchBuffer] = {}
+        # There is no API for fetching replies for multiple threads at once, so
+        # limit how many requests are run at the same time across conversations
+        self.replies_limiter = PriorityLimiter(
+            lambda: self.config.max_concurrent_requests.value
+        )
         self.users = SlackUsers(self)
         self.bots = SlackBots(self)
         self.usergroups = SlackUsergroups(self)
@@ -364,6 +456,12 @@ class SlackWorkspace(SlackBuffer):
         self.is_connected = await self._connect_task
         self._connect_task = None
 
+    def _websocket_base_url(self) -> str:
+        api_base_url = self.config.api_base_url.value.rstrip("/")
+        if api_base_url:
+            return re.sub(r"^http", "ws", api_base_url)
+        return "wss://wss-primary.slack.com"
+
     async def _connect(self) -> bool:
         if self._reconnect_url is not None:
             try:
@@ -384,14 +482,16 @@ class SlackWorkspace(SlackBuffer):
                     else None
                 )
                 self.domain = team_info["team"]["domain"]
+                self.info_cache.set_team_id(self.id)
                 await self._connect_ws(
-                    f"wss://wss-primary.slack.com/?token={self.config.api_token.value}&gateway_server={self.id}-1&slack_client=desktop&batch_presence_aware=1"
+                    f"{self._websocket_base_url()}/?token={self.config.api_token.value}&gateway_server={self.id}-1&slack_client=desktop&batch_presence_aware=1"
                 )
             else:
                 rtm_connect = await self.api.fetch_rtm_connect()
                 self.id = rtm_connect["team"]["id"]
                 self.enterprise_id = rtm_connect["team"].get("enterprise_id")
                 self.domain = rtm_connect["team"]["domain"]
+                self.info_cache.set_team_id(self.id)
                 self.my_user = await self.users[rtm_connect["self"]["id"]]
                 await self._connect_ws(rtm_connect["url"])
         except Exception as e:
@@ -467,7 +567,16 @@ class SlackWorkspace(SlackBuffer):
             "public_channel,private_channel,mpim,im"
         )
         channels = users_conversations_response["channels"]
-        self.conversations.initialize_items(channel["id"] for channel in channels)
+        # users.conversations includes last_read for group conversations, so
+        # those don't have to be fetched with conversations.info
+        channels_info: Dict[str, SlackConversationsInfoInternal] = {
+            channel["id"]: channel
+            for channel in channels
+            if channel["is_im"] is False and "last_read" in channel
+        }
+        self.conversations.initialize_items(
+            [channel["id"] for channel in channels], channels_info
+        )
 
         conversations_if_should_open = await gather(
             *(self._conversation_if_should_open(channel) for channel in channels)
@@ -476,13 +585,13 @@ class SlackWorkspace(SlackBuffer):
             c for c in conversations_if_should_open if c is not None
         ]
 
-        # Load the first 1000 chanels to be able to look them up by name, since
+        # Load the first 1000 channels to be able to look them up by name, since
         # we can't look up a channel id from channel name with OAuth tokens
-        first_channels = await self.api.fetch_conversations_list_public(limit=1000)
-        self.conversations.initialize_items(
-            [channel["id"] for channel in first_channels["channels"]],
-            {channel["id"]: channel for channel in first_channels["channels"]},
-        )
+        async for page in self.api.fetch_conversations_list_public_pages(limit=1000):
+            self.conversations.initialize_items(
+                [channel["id"] for channel in page["channels"]],
+                {channel["id"]: channel for channel in page["channels"]},
+            )
 
         return conversations_to_open
 
@@ -595,6 +704,63 @@ class SlackWorkspace(SlackBuffer):
             )
         )
 
+    # Only fetch what has changed while disconnected, instead of initializing
+    # everything again. Uses client.counts, so only works with session tokens.
+    async def _initialize_delta(self):
+        try:
+            client_counts = await self.api.fetch_client_counts()
+        except Exception as e:
+            print_error(
+                f'Failed connecting to workspace "{self.name}": {store_and_format_exception(e)}'
+            )
+            self.disconnect()
+            return
+
+        counts = (
+            client_counts["channels"] + client_counts["mpims"] + client_counts["ims"]
+        )
+        # Fetch the conversations which aren't open yet at the same time, and
+        # open their buffers in order afterwards
+        new_conversations = await gather(
+            *(
+                self.conversations[count["id"]]
+                for count in counts
+                if count["id"] not in self.open_conversations and count["has_unreads"]
+            )
+        )
+        for conversation in sorted(
+            new_conversations, key=lambda conversation: conversation.sort_key()
+        ):
+            await conversation.open_buffer()
+
+        changed_conversations: List[SlackConversation] = []
+        for count in counts:
+            conversation = self.open_conversations.get(count["id"])
+            if conversation is None:
+                continue
+
+            last_read = SlackTs(count["last_read"])
+            if last_read != conversation.last_read:
+                conversation.last_read = last_read
+
+            known_latest_ts = conversation.latest_message_ts or conversation.last_read
+            if SlackTs(count["latest"]) > known_latest_ts:
+                changed_conversations.append(conversation)
+
+        await gather_limited(
+            self.config.max_concurrent_requests.value,
+            *(
+                self._update_changed_conversation(conversation)
+                for conversation in changed_conversations
+            ),
+        )
+
+    async def _update_changed_conversation(self, conversation: SlackConversation):
+        if conversation.last_printed_ts is not None:
+            await conversation.fill_history(update=True)
+        else:
+            await conversation.set_hotlist()
+
     async def _conversation_if_should_open(self, info: SlackUsersConversations):
         conversation = await self.conversations[info["id"]]
         if not conversation.should_open():
@@ -612,9 +778,10 @@ class SlackWorkspace(SlackBuffer):
 
         return conversation
 
-    async def _load_unread_conversations(self):
-        open_conversations = list(self.open_conversations.values())
-        for conversation in open_conversations:
+    async def _load_unread_conversations(
+        self, conversations: Iterable[SlackConversation]
+    ):
+        for conversation in list(conversations):
             if (
                 conversation.hotlist_tss
                 and not conversation.muted
@@ -629,18 +796,17 @@ class SlackWorkspace(SlackBuffer):
 
     async def _connect_ws(self, url: str):
         proxy = Proxy()
-        # TODO: Handle errors
-        self._ws = create_connection(
+        ws = await connect_websocket(
             url,
-            self.config.network_timeout.value,
-            cookie=get_cookies(self.config.api_cookies.value),
-            proxy_type=proxy.type,
-            http_proxy_host=proxy.address,
-            http_proxy_port=proxy.port,
-            http_proxy_auth=(proxy.username, proxy.password),
-            http_proxy_timeout=self.config.network_timeout.value,
+            proxy.name if proxy.enabled else "",
+            get_cookies(self.config.api_cookies.value),
+            self.config.network_timeout.value * 1000,
         )
 
+        if self._ws:
+            self._ws.close()
+        self._ws = ws
+
         self._hook_ws_fd = weechat.hook_fd(
             self._ws.sock.fileno(),
             1,
@@ -651,6 +817,16 @@ class SlackWorkspace(SlackBuffer):
         )
         self._ws.sock.setblocking(False)
         self._last_ws_received_time = time.time()
+        # Frames received together with the handshake response are already
+        # buffered, so the fd won't become readable for them
+        if self._ws.frame_buffer.recv_buffer:
+            run_async(self._read_buffered_ws_frames(self._ws))
+
+    async def _read_buffered_ws_frames(self, ws: WebSocket):
+        # Wait until the connect has finished, like when reading from the fd
+        await sleep(1)
+        if self._ws is ws:
+            self._ws_read_cb("", ws.sock.fileno())
 
     def _ws_read_cb(self, data: str, fd: int) -> int:
         if self._ws is None:
@@ -658,10 +834,10 @@ class SlackWorkspace(SlackBuffer):
         while True:
             try:
                 opcode, recv_data = self._ws.recv_data(control_frame=True)
-            except ssl.SSLWantReadError:
+            except (ssl.SSLWantReadError, BlockingIOError):
                 # No more data to read at this time.
                 return weechat.WEECHAT_RC_OK
-            except (WebSocketConnectionClosedException, socket.error) as e:
+            except (OSError, WebSocketConnectionClosedException) as e:
                 print("lost connection on receive, reconnecting", e)
                 run_async(self.reconnect())
                 return weechat.WEECHAT_RC_OK
@@ -676,17 +852,43 @@ class SlackWorkspace(SlackBuffer):
             run_async(self.ws_recv(json.loads(recv_data.decode())))
 
     async def ws_recv(self, data: SlackRtmMessage):
-        # TODO: Remove old messages
-        log(LogLevel.DEBUG, DebugMessageType.WEBSOCKET_RECV, json.dumps(data))
+        if not profiler.enabled:
+            return await self._ws_recv(data)
+
+        start = time.perf_counter()
+        try:
+            await self._ws_recv(data)
+        finally:
+            duration = time.perf_counter() - start
+            profiler.add(f"ws_recv {data['type']}", duration)
+            channel = data.get("channel")
+            if isinstance(channel, str):
+                profiler.add(f"ws_recv channel {channel}", duration)
+
+    async def _ws_recv(self, data: SlackRtmMessage):
+        log(LogLevel.DEBUG, DebugMessageType.WEBSOCKET_RECV, lambda: json.dumps(data))
 
         try:
             if data["type"] == "hello":
-                if self._initial_connect or not data["fast_reconnect"]:
+                is_delta = not self._initial_connect and self.token_type == "session"
+                if self._initial_connect:
                     await self._initialize()
+                elif not data["fast_reconnect"]:
+                    if is_delta:
+                        await self._initialize_delta()
+                    else:
+                        await self._initialize()
                 if self.is_connected:
                     self.print(f"Connected to workspace {self.name}")
                 if self._initial_connect or not data["fast_reconnect"]:
-                    await self._load_unread_conversations()
+                    # The delta sync has already updated the history of the
+                    # conversations which have been printed, so only load the
+                    # ones which haven't, e.g. conversations opened by it
+                    await self._load_unread_conversations(
+                        conversation
+                        for conversation in self.open_conversations.values()
+                        if not is_delta or conversation.last_printed_ts is None
+                    )
                 self._initial_connect = False
                 return
             elif data["type"] == "error":
@@ -703,23 +905,20 @@ class SlackWorkspace(SlackBuffer):
                 elif data["name"] == "all_notifications_prefs":
                     self._set_all_notification_prefs(data["value"])
                 return
-            elif data["type"] == "user_status_changed":
-                user_id = data["user"]["id"]
-                if user_id in self.users:
-                    user = await self.users[user_id]
-                    user.update_info_json(data["user"])
+            elif data["type"] == "user_status_changed" or data["type"] == "user_change":
+                await self.users.update_item_info(data["user"]["id"], data["user"])
                 return
             elif data["type"] == "user_invalidated":
                 user_id = data["user"]["id"]
-                if user_id in self.users:
-                    has_dm_conversation = any(
-                        conversation.im_user_id == user_id
-                        for conversation in self.open_conversations.values()
-                    )
-                    if has_dm_conversation:
-                        user = await self.users[user_id]
-                        user_info = await self.api.fetch_user_info(user_id)
-                        user.update_info_json(user_info["user"])
+                has_dm_conversation = user_id in self.users and any(
+                    conversation.im_user_id == user_id
+                    for conversation in self.open_conversations.values()
+                )
+                if has_dm_conversation:
+                    user_info = await self.api.fetch_user_info(user_id)
+                    await self.users.update_item_info(user_id, user_info["user"])
+                else:
+                    self.info_cache.remove("users", user_id)
                 return
             elif data["type"] == "subteam_created":
                 subteam_id = data["subteam"]["id"]
@@ -728,10 +927,9 @@ class SlackWorkspace(SlackBuffer):
                 )
                 return
             elif data["type"] == "subteam_updated":
-                subteam_id = data["subteam"]["id"]
-                if subteam_id in self.usergroups:
-                    usergroup = await self.usergroups[subteam_id]
-                    usergroup.update_info_json(data["subteam"])
+                await self.usergroups.update_item_info(
+                    data["subteam"]["id"], data["subteam"]
+                )
                 return
             elif data["type"] == "subteam_members_changed":
                 # Handling subteam_updated should be enough
@@ -767,7 +965,8 @@ class SlackWorkspace(SlackBuffer):
                     log(
                         LogLevel.DEBUG,
                         DebugMessageType.LOG,
-                        f"unknown websocket message type (without channel): {data.get('type')}",
+                        "unknown websocket message type (without channel): %s",
+                        data.get("type"),
                     )
                 return
 
@@ -862,7 +1061,8 @@ class SlackWorkspace(SlackBuffer):
                 log(
                     LogLevel.DEBUG,
                     DebugMessageType.LOG,
-                    f"unknown websocket message type (with channel): {data.get('type')}",
+                    "unknown websocket message type (with channel): %s",
+                    data.get("type"),
                 )
         except Exception as e:
             slack_error = SlackRtmError(self, e, data)
@@ -899,7 +1099,7 @@ class SlackWorkspace(SlackBuffer):
 
         try:
             self.ws_send({"type": "ping"})
-        except (WebSocketConnectionClosedException, socket.error):
+        except (OSError, WebSocketConnectionClosedException):
             print("lost connection on ping, reconnecting")
             run_async(self.reconnect())
 
@@ -24,10 +24,12 @@ import weechat
 
 from slack.error import store_and_format_exception
 from slack.log import print_error
+from slack.profiler import profiler
 from slack.shared import shared
 from slack.util import get_callback_name
 
 if TYPE_CHECKING:
+    from _typeshed import SupportsRichComparison
     from typing_extensions import Literal, Self
 
 T = TypeVar("T")
@@ -163,6 +165,14 @@ class FutureTimer(Future[Tuple[int]]):
     pass
 
 
+class FutureFd(Future[Tuple[int]]):
+    pass
+
+
+class FutureConnect(Future[Tuple[int, int, int, str, str]]):
+    pass
+
+
 class Task(Future[T]):
     def __init__(self, coroutine: Coroutine[Future[T], None, T]):
         super().__init__()
@@ -179,11 +189,21 @@ class Task(Future[T]):
 
 
 def weechat_task_cb(data: str, *args: object) -> int:
-    future = shared.active_futures.pop(data)
-    future.set_result(args)
-    tasks = shared.active_tasks.pop(data)
-    for task in tasks:
-        task_runner(task)
+    with profiler.measure("weechat_task_cb"):
+        future = shared.active_futures.pop(data)
+        future.set_result(args)
+        tasks = shared.active_tasks.pop(data)
+        for task in tasks:
+            task_runner(task)
+    return weechat.WEECHAT_RC_OK
+
+
+def weechat_timeout_cb(data: str, remaining_calls: int) -> int:
+    future = shared.active_futures.pop(data, None)
+    if future is not None:
+        future.set_exception(TimeoutError())
+        for task in shared.active_tasks.pop(data, []):
+            task_runner(task)
     return weechat.WEECHAT_RC_OK
 
 
@@ -202,7 +222,11 @@ def task_runner(task: Task[Any]):
         if task.cancelled():
             break
         try:
-            future = task.coroutine.send(None)
+            if profiler.enabled:
+                with profiler.measure(f"task_runner {task.coroutine.__qualname__}"):
+                    future = task.coroutine.send(None)
+            else:
+                future = task.coroutine.send(None)
         except BaseException as e:
             if isinstance(e, StopIteration):
                 task.set_result(e.value)
@@ -282,8 +306,106 @@ async def gather(
     return results
 
 
+# Like gather, but runs at most limit of the coroutines at the same time
+async def gather_limited(limit: int, *coroutines: Coroutine[Any, None, T]) -> List[T]:
+    results: List[Optional[T]] = [None] * len(coroutines)
+    remaining = iter(enumerate(coroutines))
+
+    async def worker():
+        for i, coroutine in remaining:
+            results[i] = await coroutine
+
+    try:
+        await gather(*(worker() for _ in range(min(limit, len(coroutines)))))
+    finally:
+        for _, coroutine in remaining:
+            coroutine.close()
+    return results  # pyright: ignore [reportReturnType]
+
+
+# Limits how many coroutines run at the same time, like gather_limited, but for
+# coroutines started from different places. When a coroutine finishes, the
+# waiting one with the lowest priority is started next. The priorities are
+# checked at that time, so they can change while the coroutines are waiting.
+# The next coroutine is resumed from a timer callback, like sleep, so it doesn't
+# run inside the stack of the one that finished.
+class PriorityLimiter:
+    def __init__(self, limit: Callable[[], int]):
+        self._limit = limit
+        self._running = 0
+        self._waiting: List[
+            Tuple[Callable[[], SupportsRichComparison], FutureTimer]
+        ] = []
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    async def run(
+        self,
+        coroutine: Coroutine[Any, None, T],
+        priority: Callable[[], SupportsRichComparison],
+    ) -> T:
+        if self._running >= self._limit():
+            future = FutureTimer()
+            waiter = (priority, future)
+            self._waiting.append(waiter)
+            try:
+                await future
+            except BaseException:
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                else:
+                    # The slot was already taken for this coroutine, so give
+                    # it to the next one
+                    self._running -= 1
+                    self._start_next()
+                coroutine.close()
+                raise
+        else:
+            self._running += 1
+
+        try:
+            return await coroutine
+        finally:
+            self._running -= 1
+            self._start_next()
+
+    def _start_next(self):
+        if self._waiting and self._running < self._limit():
+            waiter = min(self._waiting, key=lambda waiter: waiter[0]())
+            self._waiting.remove(waiter)
+            # Take the slot now, so no other coroutine starts before this
+            # one is resumed
+            self._running += 1
+            weechat.hook_timer(
+                1, 0, 1, get_callback_name(weechat_task_cb), waiter[1].id
+            )
+
+
 async def sleep(milliseconds: int):
     future = FutureTimer()
     sleep_ms = milliseconds if milliseconds > 0 else 1
     weechat.hook_timer(sleep_ms, 0, 1, get_callback_name(weechat_task_cb), future.id)
     return await future
+
+
+# Waits until fd is readable, or writable if write is True. Raises TimeoutError
+# if that doesn't happen within timeout_ms.
+async def wait_for_fd(fd: int, write: bool, timeout_ms: int):
+    future = FutureFd()
+    hook_fd = weechat.hook_fd(
+        fd, int(not write), int(write), 0, get_callback_name(weechat_task_cb), future.id
+    )
+    hook_timer = weechat.hook_timer(
+        timeout_ms, 0, 1, get_callback_name(weechat_timeout_cb), future.id
+    )
+    try:
+        await future
+    finally:
+        weechat.unhook(hook_fd)
+        weechat.unhook(hook_timer)
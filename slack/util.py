@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right, insort
 from functools import partial
 from itertools import islice
 from typing import (
     TYPE_CHECKING,
+    Any,
     Callable,
+    Dict,
     Iterable,
     Iterator,
     List,
+    MutableMapping,
     Optional,
     Sequence,
     TypeVar,
@@ -20,10 +24,14 @@ import weechat
 from slack.shared import WeechatCallbackReturnType, shared
 
 if TYPE_CHECKING:
+    from _typeshed import SupportsDunderLT
+
     from slack.task import Future
 
 T = TypeVar("T")
 T2 = TypeVar("T2")
+SortedKey = TypeVar("SortedKey", bound="SupportsDunderLT[Any]")
+SortedValue = TypeVar("SortedValue")
 
 
 def get_callback_name(callback: Callable[..., WeechatCallbackReturnType]) -> str:
@@ -116,3 +124,91 @@ def intersperse(lst: Sequence[Union[T, T2]], item: T2) -> List[Union[T, T2]]:
     result: List[Union[T, T2]] = [item] * (len(lst) * 2 - 1)
     result[0::2] = lst
     return result
+
+
+# A set of strings which can efficiently check if any of the strings starts
+# with a given prefix, by keeping them sorted and bisecting
+class PrefixIndex:
+    def __init__(self):
+        self._sorted: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def __contains__(self, value: str) -> bool:
+        index = bisect_left(self._sorted, value)
+        return index < len(self._sorted) and self._sorted[index] == value
+
+    def add(self, value: str):
+        if value not in self:
+            insort(self._sorted, value)
+
+    def remove(self, value: str):
+        index = bisect_left(self._sorted, value)
+        if index < len(self._sorted) and self._sorted[index] == value:
+            del self._sorted[index]
+
+    def has_prefix(self, prefix: str) -> bool:
+        index = bisect_left(self._sorted, prefix)
+        return index < len(self._sorted) and self._sorted[index].startswith(prefix)
+
+
+# A dict which keeps its keys sorted, without having to sort all the items when
+# one is added. Keys larger than the last key, which is the common case for new
+# messages, are appended, and other keys are inserted by bisecting. Removing the
+# first key, which is how old messages are evicted, only moves a start offset,
+# and the removed keys are dropped from the list once they make up half of it.
+class SortedDict(MutableMapping[SortedKey, SortedValue]):
+    def __init__(self):
+        self._keys: List[SortedKey] = []
+        self._start = 0
+        self._dict: Dict[SortedKey, SortedValue] = {}
+
+    def __getitem__(self, key: SortedKey) -> SortedValue:
+        return self._dict[key]
+
+    def __setitem__(self, key: SortedKey, value: SortedValue):
+        if key not in self._dict:
+            if len(self._keys) == self._start or self._keys[-1] < key:
+                self._keys.append(key)
+            else:
+                insort(self._keys, key, self._start)
+        self._dict[key] = value
+
+    def __delitem__(self, key: SortedKey):
+        del self._dict[key]
+        index = bisect_left(self._keys, key, self._start)
+        if index == self._start:
+            self._start += 1
+            if self._start * 2 >= len(self._keys):
+                del self._keys[: self._start]
+                self._start = 0
+        else:
+            del self._keys[index]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._dict
+
+    def __iter__(self) -> Iterator[SortedKey]:
+        return islice(self._keys, self._start, None)
+
+    def __reversed__(self) -> Iterator[SortedKey]:
+        return islice(reversed(self._keys), len(self._keys) - self._start)
+
+    def __len__(self) -> int:
+        return len(self._dict)
+
+    def clear(self):
+        self._keys.clear()
+        self._start = 0
+        self._dict.clear()
+
+    # Returns the keys after key in ascending order
+    def after(self, key: SortedKey, inclusive: bool = False) -> List[SortedKey]:
+        bisect = bisect_left if inclusive else bisect_right
+        return self._keys[bisect(self._keys, key, self._start) :]
+
+    # Returns the keys before key in ascending order
+    def before(self, key: SortedKey, inclusive: bool = False) -> List[SortedKey]:
+        bisect = bisect_right if inclusive else bisect_left
+        return self._keys[self._start : bisect(self._keys, key, self._start)]
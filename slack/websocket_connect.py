@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import os
+import socket
+import ssl
+import time
+from base64 import b64encode
+from hashlib import sha1
+from math import ceil
+from typing import Tuple
+from urllib.parse import urlsplit
+
+import weechat
+from websocket import WebSocket, WebSocketException
+
+from slack.log import DebugMessageType, LogLevel, log
+from slack.task import FutureConnect, wait_for_fd, weechat_task_cb, weechat_timeout_cb
+from slack.util import get_callback_name
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+# Returns the milliseconds left until deadline, which is a time.monotonic()
+# value, or raises TimeoutError if it has passed
+def _remaining_ms(deadline: float) -> int:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError()
+    return ceil(remaining * 1000)
+
+
+async def _wait_for_socket(sock: socket.socket, write: bool, deadline: float):
+    await wait_for_fd(sock.fileno(), write, _remaining_ms(deadline))
+
+
+async def hook_connect(
+    proxy: str, address: str, port: int, timeout_ms: int
+) -> socket.socket:
+    future = FutureConnect()
+    hook = weechat.hook_connect(
+        proxy, address, port, 1, 0, "", get_callback_name(weechat_task_cb), future.id
+    )
+    hook_timer = weechat.hook_timer(
+        timeout_ms, 0, 1, get_callback_name(weechat_timeout_cb), future.id
+    )
+    try:
+        status, _, sock, error, _ = await future
+    except BaseException:
+        # WeeChat removes the hook itself after calling the callback, so only
+        # unhook if the connect hasn't finished
+        weechat.unhook(hook)
+        raise
+    finally:
+        weechat.unhook(hook_timer)
+    if status != weechat.WEECHAT_HOOK_CONNECT_OK:
+        raise WebSocketException(
+            f"Connecting to {address}:{port} failed with status {status}: {error}"
+        )
+    return socket.socket(fileno=sock)
+
+
+async def _do_handshake(sock: ssl.SSLSocket, deadline: float):
+    while True:
+        try:
+            sock.do_handshake()
+            return
+        except ssl.SSLWantReadError:
+            await _wait_for_socket(sock, False, deadline)
+        except ssl.SSLWantWriteError:
+            await _wait_for_socket(sock, True, deadline)
+
+
+async def _send_all(sock: socket.socket, data: bytes, deadline: float):
+    while data:
+        try:
+            sent = sock.send(data)
+            data = data[sent:]
+        except (BlockingIOError, ssl.SSLWantWriteError):
+            await _wait_for_socket(sock, True, deadline)
+        except ssl.SSLWantReadError:
+            await _wait_for_socket(sock, False, deadline)
+
+
+# Returns the response headers, and the data received after them, which is the
+# start of the websocket frames the server sent right after the response
+async def _recv_headers(sock: socket.socket, deadline: float) -> Tuple[bytes, bytes]:
+    response = b""
+    while b"\r\n\r\n" not in response:
+        try:
+            data = sock.recv(4096)
+        except (BlockingIOError, ssl.SSLWantReadError):
+            await _wait_for_socket(sock, False, deadline)
+            continue
+        except ssl.SSLWantWriteError:
+            await _wait_for_socket(sock, True, deadline)
+            continue
+        if not data:
+            raise WebSocketException("Connection closed during websocket handshake")
+        response += data
+        if len(response) > 65536:
+            raise WebSocketException("Websocket handshake response is too long")
+    headers, _, rest = response.partition(b"\r\n\r\n")
+    return headers, rest
+
+
+async def _websocket_handshake(
+    sock: socket.socket,
+    host: str,
+    resource: str,
+    origin: str,
+    cookie: str,
+    deadline: float,
+) -> bytes:
+    key = b64encode(os.urandom(16)).decode()
+    headers = [
+        f"GET {resource} HTTP/1.1",
+        "Upgrade: websocket",
+        "Connection: Upgrade",
+        f"Host: {host}",
+        f"Origin: {origin}",
+        f"Sec-WebSocket-Key: {key}",
+        "Sec-WebSocket-Version: 13",
+    ]
+    if cookie:
+        headers.append(f"Cookie: {cookie}")
+    request = "\r\n".join(headers) + "\r\n\r\n"
+    await _send_all(sock, request.encode(), deadline)
+
+    headers, rest = await _recv_headers(sock, deadline)
+    status_line, *header_lines = headers.decode("latin-1").split("\r\n")
+    status = status_line.split(" ", 2)
+    if len(status) < 2 or status[1] != "101":
+        raise WebSocketException(f"Websocket handshake failed: {status_line}")
+
+    response_headers = {
+        name.strip().lower(): value.strip()
+        for name, _, value in (line.partition(":") for line in header_lines if line)
+    }
+    accept = b64encode(sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+    if response_headers.get("sec-websocket-accept") != accept:
+        raise WebSocketException("Websocket handshake failed: invalid accept key")
+    return rest
+
+
+# Connects to a websocket without blocking the main loop. WeeChat resolves the
+# address and connects (through its proxy, if one is configured) in a child
+# process with hook_connect, and the TLS and websocket handshakes are driven by
+# hook_fd on the non-blocking socket. timeout_ms applies to the whole connect.
+async def connect_websocket(
+    url: str, proxy: str, cookie: str, timeout_ms: int
+) -> WebSocket:
+    parsed_url = urlsplit(url)
+    is_secure = parsed_url.scheme == "wss"
+    if parsed_url.scheme not in ("ws", "wss") or not parsed_url.hostname:
+        raise WebSocketException(f"Invalid websocket url: {url}")
+    hostname = parsed_url.hostname
+    default_port = 443 if is_secure else 80
+    port = parsed_url.port or default_port
+    host = hostname if port == default_port else f"{hostname}:{port}"
+    origin = f"{'https' if is_secure else 'http'}://{host}"
+    resource = parsed_url.path or "/"
+    if parsed_url.query:
+        resource += f"?{parsed_url.query}"
+
+    log(LogLevel.DEBUG, DebugMessageType.LOG, "connecting websocket to %s", host)
+    deadline = time.monotonic() + timeout_ms / 1000
+    sock = await hook_connect(proxy, hostname, port, timeout_ms)
+    try:
+        sock.setblocking(False)
+        if is_secure:
+            sock = ssl.create_default_context().wrap_socket(
+                sock, server_hostname=hostname, do_handshake_on_connect=False
+            )
+            await _do_handshake(sock, deadline)
+        rest = await _websocket_handshake(
+            sock, host, resource, origin, cookie, deadline
+        )
+    except BaseException:
+        sock.close()
+        raise
+
+    ws = WebSocket()
+    ws.sock = sock
+    ws.connected = True
+    if rest:
+        ws.frame_buffer.recv_buffer.append(rest)
+    return ws
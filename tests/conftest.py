@@ -171,8 +171,7 @@ with open("mock_data/slack_conversations_info_channel_public.json") as f:
     channel_public_id = channel_public_info["id"]
 
 
-@pytest.fixture
-def workspace():
+def create_workspace():
     shared.config = SlackConfig()
     w = SlackWorkspace("workspace_name")
     w.id = workspace_id
@@ -200,6 +199,11 @@ def workspace():
     return w
 
 
+@pytest.fixture
+def workspace():
+    return create_workspace()
+
+
 @pytest.fixture
 def channel_public(workspace: SlackWorkspace):
     return workspace.conversations[channel_public_id].result()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import weechat
+
+from slack.api_metrics import ApiMetrics
+from slack.http import HttpError, HttpRequestInfo, http_request
+from slack.slack_workspace import SlackWorkspace
+from slack.task import FutureTimer, FutureUrl, create_task
+
+
+def test_api_metrics_add():
+    metrics = ApiMetrics()
+    metrics.add("users.info", 0.02, HttpRequestInfo(response_bytes=100), False)
+    metrics.add("users.info", 0.3, HttpRequestInfo(retries=1, ratelimited=1), False)
+    metrics.add("users.info", 40, HttpRequestInfo(server_errors=6), True)
+
+    stats = metrics.methods["users.info"]
+    assert stats.count == 3
+    assert stats.failed == 1
+    assert stats.retries == 1
+    assert stats.ratelimited == 1
+    assert stats.server_errors == 6
+    assert stats.response_bytes == 100
+    assert stats.max_latency == 40
+    assert stats.latency_percentile(0.3) == "<50"
+    assert stats.latency_percentile(0.5) == "<500"
+    assert stats.latency_percentile(1) == ">30000"
+    assert stats.to_json()["latency_histogram_ms"] == {
+        "50": 1,
+        "100": 0,
+        "250": 0,
+        "500": 1,
+        "1000": 0,
+        "2500": 0,
+        "5000": 0,
+        "10000": 0,
+        "30000": 0,
+        "inf": 1,
+    }
+
+
+def url_result(
+    url: str, status: int, headers: str = "", output: str = "response"
+) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    return (
+        url,
+        {},
+        {"response_code": str(status), "headers": headers, "output": output},
+    )
+
+
+@patch.object(weechat, "hook_timer")
+def test_http_request_fills_request_info(mock_hook_timer: MagicMock):
+    url = "http://example.com"
+    request_info = HttpRequestInfo()
+    coroutine = http_request(url, {}, 0, request_info=request_info)
+
+    future = coroutine.send(None)
+    assert isinstance(future, FutureUrl)
+    future.set_result(url_result(url, 500))
+
+    future = coroutine.send(None)
+    assert isinstance(future, FutureTimer)
+    future.set_result((0,))
+
+    future = coroutine.send(None)
+    assert isinstance(future, FutureUrl)
+    future.set_result(url_result(url, 429, "HTTP/2 429\r\nRetry-After: 1"))
+
+    future = coroutine.send(None)
+    assert isinstance(future, FutureTimer)
+    future.set_result((0,))
+
+    future = coroutine.send(None)
+    assert isinstance(future, FutureUrl)
+    future.set_result(url_result(url, 200))
+
+    with pytest.raises(StopIteration):
+        coroutine.send(None)
+
+    assert request_info == HttpRequestInfo(
+        retries=1,
+        ratelimited=1,
+        server_errors=1,
+        http_status=200,
+        response_bytes=len("response") * 3,
+    )
+
+
+def test_slack_api_records_metrics(workspace: SlackWorkspace):
+    async def fake_http_request(
+        url: str,
+        options: Dict[str, str],
+        timeout: int,
+        ratelimit_callback: object,
+        acquire_token: object,
+        request_info: Optional[HttpRequestInfo],
+    ):
+        assert request_info is not None
+        request_info.response_bytes = 11
+        return '{"ok": true}'
+
+    with patch("slack.slack_api.http_request", side_effect=fake_http_request):
+        create_task(workspace.api.fetch_users_get_prefs())
+
+    with patch(
+        "slack.slack_api.http_request",
+        AsyncMock(side_effect=HttpError("url", {}, None, 400, "")),
+    ):
+        create_task(workspace.api.fetch_users_get_prefs())
+
+    stats = workspace.api.metrics.methods["users.prefs.get"]
+    assert stats.count == 2
+    assert stats.failed == 1
+    assert stats.response_bytes == 11
+    assert workspace.api.edgeapi.metrics is workspace.api.metrics
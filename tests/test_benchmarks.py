@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+
+import benchmarks.bench_slack  # pyright: ignore [reportUnusedImport]
+from benchmarks.memory import measure_messages, measure_users
+from benchmarks.rtm_load import RtmEventGenerator, run_legacy_load, run_slack_load
+from benchmarks.runner import benchmarks, results_to_json, run_benchmarks
+
+
+def test_benchmarks_run():
+    results = run_benchmarks(repeat=1, scale=0.001)
+
+    assert [result.name for result in results] == list(benchmarks)
+    assert all(result.size >= 1 for result in results)
+    data = results_to_json(results)
+    assert data["results"] == [asdict(result) for result in results]
+
+
+def test_rtm_event_generator_is_deterministic():
+    def generate():
+        generator = RtmEventGenerator(["C1", "C2"], ["U1", "U2"], seed=1)
+        return list(generator.events(200))
+
+    events = generate()
+    assert events == generate()
+    assert {event["type"] for event in events} == {
+        "message",
+        "reaction_added",
+        "reaction_removed",
+        "user_typing",
+        "thread_marked",
+        "presence_change",
+    }
+    assert any(event.get("subtype") == "message_changed" for event in events)
+
+
+def test_rtm_load_runs_without_errors():
+    generator_args = {"unknown_user_ratio": 0.1, "seed": 1}
+
+    result = run_slack_load(generator_args, 200, 0)
+    assert result.errors == 0
+    assert result.api_requests["users.info"] > 0
+
+    result = run_legacy_load(generator_args, 200, 0)
+    assert result.errors == 0
+
+
+def test_memory_benchmark_runs():
+    results = measure_messages(5) + measure_users(5)
+
+    assert [result.name for result in results] == [
+        "message.text",
+        "message.blocks",
+        "message.attachments",
+        "message.text.compact",
+        "message.blocks.compact",
+        "message.attachments.compact",
+        "user",
+        "nick",
+    ]
+    assert all(result.bytes_per_item > 0 for result in results)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import slack.log as log_module
+from slack.log import DebugMessage, DebugMessages, DebugMessageType, LogLevel, log
+from slack.shared import shared
+
+
+def debug_message(time: float, message_type: DebugMessageType):
+    return DebugMessage(time, LogLevel.DEBUG, message_type, str(time))
+
+
+def test_debug_messages_limit_per_type():
+    messages = DebugMessages(10, {DebugMessageType.WEBSOCKET_RECV: 2})
+
+    messages.append(debug_message(1, DebugMessageType.LOG))
+    for i in range(2, 6):
+        messages.append(debug_message(i, DebugMessageType.WEBSOCKET_RECV))
+
+    assert [m.time for m in messages] == [1, 4, 5]
+
+
+def test_debug_messages_limit_total_removes_oldest():
+    messages = DebugMessages(3, {})
+
+    messages.append(debug_message(1, DebugMessageType.LOG))
+    messages.append(debug_message(2, DebugMessageType.HTTP_REQUEST))
+    messages.append(debug_message(3, DebugMessageType.LOG))
+    messages.append(debug_message(4, DebugMessageType.WEBSOCKET_SEND))
+
+    assert len(messages) == 3
+    assert [m.time for m in messages] == [2, 3, 4]
+
+
+def test_debug_messages_set_limits_trims_existing():
+    messages = DebugMessages(10, {})
+    for i in range(5):
+        messages.append(debug_message(i, DebugMessageType.LOG))
+
+    messages.set_limits(10, {DebugMessageType.LOG: 2})
+
+    assert [m.time for m in messages] == [3, 4]
+
+
+def test_log_skips_formatting_below_min_level():
+    shared.debug_buffer_pointer = None
+    producer = MagicMock(return_value="message")
+
+    with patch.object(log_module, "debug_messages", DebugMessages(10, {})):
+        log_module.debug_messages.min_level = LogLevel.INFO
+        log(LogLevel.DEBUG, DebugMessageType.WEBSOCKET_RECV, producer)
+        assert len(log_module.debug_messages) == 0
+
+    producer.assert_not_called()
+
+
+def test_log_formats_enabled_messages():
+    shared.debug_buffer_pointer = None
+    producer = MagicMock(return_value="message")
+
+    with patch.object(log_module, "debug_messages", DebugMessages(10, {})):
+        log_module.debug_messages.min_level = LogLevel.TRACE
+        log(LogLevel.DEBUG, DebugMessageType.WEBSOCKET_RECV, producer)
+        log(LogLevel.DEBUG, DebugMessageType.LOG, "request %s: %s", 1, "url")
+        messages = [m.message for m in log_module.debug_messages]
+
+    assert messages == ["message", "request 1: url"]
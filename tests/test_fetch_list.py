@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+
+from slack.slack_api import SlackApi
+from slack.slack_conversation import SlackConversation
+from slack.task import Future, create_task, weechat_task_cb
+
+
+def members_page(members: List[str], next_cursor: str):
+    return {
+        "ok": True,
+        "members": members,
+        "response_metadata": {"next_cursor": next_cursor},
+    }
+
+
+def test_fetch_list_follows_cursor(channel_public: SlackConversation):
+    pages = [members_page(["U1"], "cursor1"), members_page(["U2"], "")]
+    requests: List[Dict[str, object]] = []
+
+    async def fetch(method: str, params: Dict[str, object]):
+        requests.append(params)
+        return pages[len(requests) - 1]
+
+    with patch.object(SlackApi, "_fetch", side_effect=fetch):
+        task = create_task(
+            channel_public.api._fetch_list(  # pyright: ignore [reportPrivateUsage]
+                "conversations.members", "members", {"channel": channel_public.id}
+            )
+        )
+
+    assert requests == [
+        {"channel": channel_public.id, "limit": 1000},
+        {"channel": channel_public.id, "limit": 1000, "cursor": "cursor1"},
+    ]
+    assert task.result()["members"] == ["U1", "U2"]
+
+
+def test_fetch_list_respects_limit(channel_public: SlackConversation):
+    requests: List[Dict[str, object]] = []
+
+    async def fetch(method: str, params: Dict[str, object]):
+        requests.append(params)
+        return members_page(["U1"], "cursor")
+
+    with patch.object(SlackApi, "_fetch", side_effect=fetch):
+        task = create_task(
+            channel_public.api._fetch_list(  # pyright: ignore [reportPrivateUsage]
+                "conversations.members", "members", {}, limit=1500
+            )
+        )
+
+    assert requests == [{"limit": 1000}, {"limit": 500, "cursor": "cursor"}]
+    assert task.result()["members"] == ["U1", "U1"]
+
+
+def test_load_members_pages_yields_pages_as_they_arrive(
+    channel_public: SlackConversation,
+):
+    futures = [Future[Tuple[Dict[str, object]]]() for _ in range(2)]
+    received: List[List[str]] = []
+
+    async def fetch(method: str, params: Dict[str, object]):
+        (response,) = await futures[1 if "cursor" in params else 0]
+        return response
+
+    async def consume():
+        async for members in channel_public.load_members_pages(load_all=True):
+            received.append(members)
+
+    with patch.object(SlackApi, "_fetch", side_effect=fetch):
+        task = create_task(consume())
+        weechat_task_cb(futures[0].id, members_page(["U1"], "cursor1"))
+        assert received == [["U1"]]
+
+        weechat_task_cb(futures[1].id, members_page(["U2"], ""))
+        assert received == [["U1"], ["U2"]]
+
+    assert task.done()
+    assert channel_public._members == ["U1", "U2"]  # pyright: ignore [reportPrivateUsage]
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from copy import deepcopy
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import weechat
+
+from slack.shared import shared
+from slack.slack_api import SlackApi
+from slack.slack_info_cache import INFO_CACHE_VERSION
+from slack.slack_user import SlackUser
+from slack.slack_workspace import SlackWorkspace
+from slack.task import Future
+from tests.conftest import channel_public_info, user_test2_info, workspace_id
+
+user_test3_info = deepcopy(user_test2_info)
+user_test3_info["id"] = "U3"
+
+
+@pytest.fixture
+def workspace_with_cache(workspace: SlackWorkspace):
+    workspace.config.cache_info.value = True
+    workspace.info_cache.set_team_id(workspace_id)
+    yield workspace
+    workspace.config.cache_info.value = False
+
+
+@patch.object(SlackApi, "fetch_user_info")
+def test_user_is_created_from_cache(
+    mock_method: MagicMock, workspace_with_cache: SlackWorkspace
+):
+    shared.active_tasks = defaultdict(list)
+    shared.active_futures = {}
+    workspace_with_cache.info_cache.set("users", "U3", user_test3_info)
+
+    user_future = workspace_with_cache.users["U3"]
+
+    mock_method.assert_not_called()
+    user = user_future.result()
+    assert isinstance(user, SlackUser)
+    assert user.id == "U3"
+    assert workspace_with_cache.users._item_ids_to_revalidate == {"U3"}  # pyright: ignore [reportPrivateUsage]
+
+
+def test_info_cache_write_and_read(
+    workspace_with_cache: SlackWorkspace, tmp_path: Path
+):
+    with patch.object(weechat, "info_get", return_value=str(tmp_path)):
+        workspace_with_cache.info_cache.set("users", "U3", user_test3_info)
+        workspace_with_cache.info_cache.write()
+
+        with open(workspace_with_cache.info_cache.path) as f:
+            cache = json.load(f)
+        assert cache["version"] == INFO_CACHE_VERSION
+        assert cache["team_id"] == workspace_id
+        assert cache["users"] == {"U3": user_test3_info}
+
+        new_workspace = SlackWorkspace(workspace_with_cache.name)
+        assert new_workspace.info_cache.get("users", "U3") == user_test3_info
+
+        new_workspace.info_cache.set_team_id("T_OTHER_TEAM")
+        assert new_workspace.info_cache.get("users", "U3") is None
+
+
+def test_update_item_info_writes_to_cache(workspace_with_cache: SlackWorkspace):
+    user_future = Future[SlackUser]()
+    user_future.set_result(SlackUser(workspace_with_cache, deepcopy(user_test3_info)))
+    workspace_with_cache.users["U3"] = user_future
+    new_info = deepcopy(user_test3_info)
+    new_info["profile"]["display_name"] = "New_name"
+
+    coroutine = workspace_with_cache.users.update_item_info("U3", new_info)
+    with pytest.raises(StopIteration):
+        coroutine.send(None)
+
+    user = user_future.result()
+    assert user.nick.raw_nick == "New_name"
+    assert workspace_with_cache.info_cache.get("users", "U3") == new_info
+
+
+def test_conversation_is_fetched_and_not_cached(workspace_with_cache: SlackWorkspace):
+    shared.active_tasks = defaultdict(list)
+    shared.active_futures = {}
+    conversation_info = deepcopy(channel_public_info)
+    conversation_info["id"] = "C3"
+    fetch_conversations_info = AsyncMock(
+        return_value={"ok": True, "channel": conversation_info}
+    )
+
+    with patch.object(SlackApi, "fetch_conversations_info", fetch_conversations_info):
+        conversation = workspace_with_cache.conversations["C3"].result()
+
+    fetch_conversations_info.assert_awaited_once()
+    assert conversation.id == "C3"
+    assert not workspace_with_cache.conversations._item_ids_to_revalidate  # pyright: ignore [reportPrivateUsage]
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import weechat
+
+from slack.register import signal_buffer_cleared_cb
+from slack.shared import shared
+from slack.slack_api import SlackApi
+from slack.slack_conversation import SlackConversation
+from slack.slack_message import SlackMessage, SlackTs
+from slack.task import Future, create_task, weechat_task_cb
+
+if TYPE_CHECKING:
+    from slack.slack_message import MessageContext
+
+
+class FakeLines:
+    def __init__(self):
+        self.pointers: List[str] = []
+        self.tags: Dict[str, List[str]] = {}
+        self.messages: Dict[str, str] = {}
+        self.moves = 0
+
+    def prnt_date_tags(self, buffer: str, date: int, tags: str, message: str):
+        pointer = f"0x{len(self.tags) + 1:x}"
+        self.pointers.append(pointer)
+        self.tags[pointer] = tags.split(",")
+        self.messages[pointer] = message
+
+    def hdata_pointer(self, hdata: str, pointer: str, name: str) -> str:
+        if name in ("own_lines", "lines"):
+            return "lines"
+        if name == "first_line":
+            return self.pointers[0] if self.pointers else ""
+        if name == "last_line":
+            return self.pointers[-1] if self.pointers else ""
+        if name == "data":
+            return pointer
+        raise NotImplementedError(name)
+
+    def hdata_integer(self, hdata: str, pointer: str, name: str) -> int:
+        return len(self.tags[pointer])
+
+    def hdata_string(self, hdata: str, pointer: str, name: str) -> str:
+        return self.tags[pointer][int(name.split("|")[0])]
+
+    def hdata_move(self, hdata: str, pointer: str, count: int) -> str:
+        self.moves += 1
+        index = self.pointers.index(pointer) + count
+        return self.pointers[index] if 0 <= index < len(self.pointers) else ""
+
+    def hdata_check_pointer(self, hdata: str, list: str, pointer: str) -> int:
+        return int(pointer in self.pointers)
+
+    def hdata_update(self, hdata: str, pointer: str, hashtable: Dict[str, str]):
+        self.messages[pointer] = hashtable["message"]
+
+
+@pytest.fixture
+def lines(channel_public: SlackConversation):
+    fake_lines = FakeLines()
+    channel_public._buffer_pointer = "buffer"  # pyright: ignore [reportPrivateUsage]
+    shared.buffers["buffer"] = channel_public
+    weechat_version = shared.weechat_version
+    shared.weechat_version = 0x04000000
+
+    with patch.multiple(
+        weechat,
+        prnt_date_tags=fake_lines.prnt_date_tags,
+        hdata_get=lambda name: name,  # pyright: ignore [reportUnknownLambdaType]
+        hdata_pointer=fake_lines.hdata_pointer,
+        hdata_integer=fake_lines.hdata_integer,
+        hdata_string=fake_lines.hdata_string,
+        hdata_move=fake_lines.hdata_move,
+        hdata_check_pointer=fake_lines.hdata_check_pointer,
+        hdata_update=fake_lines.hdata_update,
+        buffer_set=MagicMock(),
+    ):
+        yield fake_lines
+
+    shared.weechat_version = weechat_version
+    del shared.buffers["buffer"]
+
+
+def print_messages(conversation: SlackConversation, tss: List[str]):
+    for ts in tss:
+        message_json = {"type": "message", "ts": ts, "text": ts}
+        message = SlackMessage(conversation, message_json)  # pyright: ignore [reportArgumentType]
+        conversation._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+        with patch.object(
+            SlackMessage, "render", AsyncMock(return_value=ts)
+        ), patch.object(SlackMessage, "tags", AsyncMock(return_value=f"slack_ts_{ts}")):
+            create_task(conversation.print_message(message))
+
+
+def rerender(conversation: SlackConversation, ts: str, text: str):
+    message = conversation.messages[SlackTs(ts)]
+    with patch.object(SlackMessage, "render_message", AsyncMock(return_value=text)):
+        create_task(conversation.rerender_message(message))
+
+
+def line_text(lines: FakeLines, ts: str) -> Optional[str]:
+    for pointer in lines.pointers:
+        if f"slack_ts_{ts}" in lines.tags[pointer]:
+            return lines.messages[pointer]
+
+
+def test_rerender_message_uses_line_pointer(
+    channel_public: SlackConversation, lines: FakeLines
+):
+    print_messages(channel_public, ["1.1", "1.2", "1.3"])
+
+    rerender(channel_public, "1.1", "changed")
+
+    assert line_text(lines, "1.1") == "changed"
+    assert line_text(lines, "1.3") == "1.3"
+    assert lines.moves == 0
+
+
+def test_line_pointers_pruned_when_lines_removed(
+    channel_public: SlackConversation, lines: FakeLines
+):
+    print_messages(channel_public, ["1.1", "1.2", "1.3"])
+    del lines.pointers[0]
+
+    assert channel_public.line_pointer_for_ts(SlackTs("1.1")) is None
+    assert channel_public.line_pointer_for_ts(SlackTs("1.2")) == lines.pointers[0]
+
+    rerender(channel_public, "1.1", "changed")
+    assert lines.moves == 0
+
+
+def test_ts_from_index(channel_public: SlackConversation, lines: FakeLines):
+    print_messages(channel_public, ["1.1", "1.2", "1.3"])
+
+    assert channel_public.ts_from_index(1) == SlackTs("1.3")
+    assert channel_public.ts_from_index(3) == SlackTs("1.1")
+
+
+def test_buffer_cleared_clears_line_pointers(
+    channel_public: SlackConversation, lines: FakeLines
+):
+    print_messages(channel_public, ["1.1"])
+    lines.pointers.clear()
+
+    signal_buffer_cleared_cb("", "buffer_cleared", "buffer")
+
+    assert channel_public.line_pointer_for_ts(SlackTs("1.1")) is None
+
+
+def test_changes_to_message_rerender_it_once(
+    channel_public: SlackConversation, lines: FakeLines
+):
+    print_messages(channel_public, ["1.1", "1.2"])
+    timer_futures: List[str] = []
+
+    def hook_timer(*args: object):
+        timer_futures.append(str(args[-1]))
+
+    render_message = AsyncMock(return_value="changed")
+    with patch.object(weechat, "hook_timer", hook_timer), patch.object(
+        SlackMessage, "render_message", render_message
+    ):
+        for user_id in ["U01", "U02", "U03"]:
+            create_task(channel_public.reaction_add(SlackTs("1.1"), "smile", user_id))
+        assert line_text(lines, "1.1") == "1.1"
+        assert len(timer_futures) == 1
+
+        weechat_task_cb(timer_futures.pop(), 0)
+
+    assert render_message.call_count == 1
+    assert line_text(lines, "1.1") == "changed"
+    assert line_text(lines, "1.2") == "1.2"
+
+
+def test_fill_history_prints_messages_while_fetching_replies(
+    channel_public: SlackConversation, lines: FakeLines
+):
+    shared.config.look.display_thread_replies_in_channel.value = True
+    channel_public.workspace.config.max_concurrent_requests.value = 1
+    shared.current_buffer_pointer = "buffer"
+
+    def message_json(ts: str, thread_ts: Optional[str] = None):
+        thread = {"thread_ts": thread_ts} if thread_ts else {}
+        return {"type": "message", "ts": ts, "text": ts, **thread}
+
+    history = {
+        "messages": [
+            message_json("4.1"),
+            message_json("3.1", "3.1"),
+            message_json("2.1"),
+            message_json("1.1", "1.1"),
+        ]
+    }
+    replies_futures: Dict[str, Future[object]] = {}
+
+    async def fetch_conversations_replies(
+        api: SlackApi, conversation: SlackConversation, parent_message_ts: SlackTs
+    ):
+        future = replies_futures[str(parent_message_ts)] = Future()
+        await future
+        reply_ts = f"{parent_message_ts.major}.2"
+        return {
+            "messages": [
+                message_json(parent_message_ts, parent_message_ts),
+                message_json(reply_ts, parent_message_ts),
+            ]
+        }
+
+    def printed_tss():
+        return [lines.tags[pointer][0] for pointer in lines.pointers]
+
+    async def render(self: SlackMessage, context: MessageContext) -> str:
+        return self.ts
+
+    async def tags(self: SlackMessage, context: MessageContext, backlog: bool) -> str:
+        return f"slack_ts_{self.ts}"
+
+    timers: List[str] = []
+
+    def hook_timer(interval: int, align: int, max_calls: int, cb: str, data: str):
+        timers.append(data)
+        return "hook_timer"
+
+    def run_timers():
+        while timers:
+            weechat_task_cb(timers.pop(0), 0)
+
+    with patch.object(
+        SlackApi, "fetch_conversations_history", AsyncMock(return_value=history)
+    ), patch.object(
+        SlackApi, "fetch_conversations_replies", fetch_conversations_replies
+    ), patch.object(weechat, "buffer_get_string", return_value=""), patch.object(
+        SlackMessage, "render", render
+    ), patch.object(SlackMessage, "tags", tags), patch.object(
+        weechat, "hook_timer", side_effect=hook_timer
+    ):
+        task = create_task(channel_public.fill_history())
+        assert list(replies_futures) == ["1.1"]
+        assert printed_tss() == []
+
+        weechat_task_cb(replies_futures["1.1"].id)
+        run_timers()
+        assert list(replies_futures) == ["1.1", "3.1"]
+        assert printed_tss() == ["slack_ts_1.1", "slack_ts_1.2", "slack_ts_2.1"]
+
+        weechat_task_cb(replies_futures["3.1"].id)
+
+    assert task.done_with_result()
+    assert printed_tss() == [
+        "slack_ts_1.1",
+        "slack_ts_1.2",
+        "slack_ts_2.1",
+        "slack_ts_3.1",
+        "slack_ts_3.2",
+        "slack_ts_4.1",
+    ]
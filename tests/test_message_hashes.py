@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from itertools import combinations
+
+from slack.slack_conversation import SlackConversation, SlackConversationMessageHashes
+from slack.slack_message import SlackTs
+from slack.util import PrefixIndex
+
+
+def test_prefix_index():
+    index = PrefixIndex()
+    index.add("abc")
+    index.add("abd")
+    index.add("b12")
+
+    assert "abc" in index
+    assert "ab" not in index
+    assert index.has_prefix("ab")
+    assert index.has_prefix("abd")
+    assert not index.has_prefix("abe")
+    assert not index.has_prefix("c")
+
+    index.remove("abd")
+    assert "abd" not in index
+    assert not index.has_prefix("abd")
+    assert len(index) == 2
+
+
+def test_message_hashes_are_unique_prefixes(channel_public: SlackConversation):
+    hashes = SlackConversationMessageHashes(channel_public)
+    tss = [SlackTs(f"1700000000.{i:06}") for i in range(500)]
+    for ts in tss:
+        hashes[ts]
+
+    all_hashes = [hashes[ts] for ts in tss]
+    assert len(set(all_hashes)) == len(tss)
+    assert any(len(ts_hash) > 3 for ts_hash in all_hashes)
+    for hash1, hash2 in combinations(all_hashes, 2):
+        assert not hash1.startswith(hash2)
+        assert not hash2.startswith(hash1)
+    for ts in tss:
+        assert hashes.get_ts(hashes[ts]) == ts
+
+
+def test_message_hashes_delete(channel_public: SlackConversation):
+    hashes = SlackConversationMessageHashes(channel_public)
+    ts = SlackTs("1700000000.000001")
+    ts_hash = hashes[ts]
+
+    del hashes[ts]
+    assert hashes.get_ts(ts_hash) is None
+    assert hashes[ts] == ts_hash
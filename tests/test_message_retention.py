@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from slack.shared import shared
+from slack.slack_conversation import SlackConversation
+from slack.slack_message import SlackMessage, SlackTs
+
+if TYPE_CHECKING:
+    from slack_api.slack_conversations_history import SlackMessageStandardFinal
+
+
+def create_message(conversation: SlackConversation, ts: str, **kwargs: str):
+    message_json: SlackMessageStandardFinal = {
+        "type": "message",
+        "ts": ts,
+        "user": conversation.workspace.my_user.id,
+        "text": "message",
+        **kwargs,
+    }  # pyright: ignore [reportAssignmentType]
+    return SlackMessage(conversation, message_json)
+
+
+def test_trim_messages_removes_oldest_messages(channel_public: SlackConversation):
+    shared.config.look.max_messages_per_conversation.value = 3
+    for i in range(5):
+        message = create_message(channel_public, f"1700000000.00000{i}")
+        channel_public._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+        channel_public.message_hashes[message.ts]
+
+    channel_public._trim_messages()  # pyright: ignore [reportPrivateUsage]
+
+    assert list(channel_public.messages) == [
+        SlackTs("1700000000.000002"),
+        SlackTs("1700000000.000003"),
+        SlackTs("1700000000.000004"),
+    ]
+    assert SlackTs("1700000000.000000") not in channel_public.message_hashes
+    assert SlackTs("1700000000.000002") in channel_public.message_hashes
+
+
+def test_trim_messages_keeps_pinned_messages(channel_public: SlackConversation):
+    shared.config.look.max_messages_per_conversation.value = 2
+    for i in range(4):
+        message = create_message(channel_public, f"1700000000.00000{i}")
+        channel_public._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+    channel_public.hotlist_tss.add(SlackTs("1700000000.000000"))
+
+    channel_public._trim_messages()  # pyright: ignore [reportPrivateUsage]
+
+    assert list(channel_public.messages) == [
+        SlackTs("1700000000.000000"),
+        SlackTs("1700000000.000003"),
+    ]
+
+
+def test_trim_messages_updates_replies_of_parent(channel_public: SlackConversation):
+    shared.config.look.max_messages_per_conversation.value = 2
+    parent = create_message(channel_public, "1700000000.000000")
+    channel_public._add_or_update_message(parent)  # pyright: ignore [reportPrivateUsage]
+    channel_public.hotlist_tss.add(parent.ts)
+    for i in range(1, 3):
+        reply = create_message(
+            channel_public, f"1700000000.00000{i}", thread_ts=parent.ts
+        )
+        channel_public._add_or_update_message(reply)  # pyright: ignore [reportPrivateUsage]
+        parent.replies_tss.append(reply.ts)
+    parent.reply_history_filled = True
+
+    channel_public._trim_messages()  # pyright: ignore [reportPrivateUsage]
+
+    assert parent.replies_tss == [SlackTs("1700000000.000002")]
+    assert not parent.reply_history_filled
+
+
+def test_trim_messages_keeps_parent_of_kept_replies(channel_public: SlackConversation):
+    shared.config.look.max_messages_per_conversation.value = 2
+    parent = create_message(channel_public, "1700000000.000000")
+    channel_public._add_or_update_message(parent)  # pyright: ignore [reportPrivateUsage]
+    for i in range(1, 4):
+        message = create_message(channel_public, f"1700000000.00000{i}")
+        channel_public._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+    reply = create_message(channel_public, "1700000000.000004", thread_ts=parent.ts)
+    channel_public._add_or_update_message(reply)  # pyright: ignore [reportPrivateUsage]
+    parent.replies_tss.append(reply.ts)
+    parent.reply_history_filled = True
+
+    channel_public._trim_messages()  # pyright: ignore [reportPrivateUsage]
+
+    assert list(channel_public.messages) == [
+        SlackTs("1700000000.000000"),
+        SlackTs("1700000000.000004"),
+    ]
+    assert parent.reply_history_filled
+
+
+def test_trim_messages_keeps_hashes_of_lines_in_buffer(
+    channel_public: SlackConversation,
+):
+    shared.config.look.max_messages_per_conversation.value = 1
+    for i in range(3):
+        message = create_message(channel_public, f"1700000000.00000{i}")
+        channel_public._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+        channel_public.message_hashes[message.ts]
+    channel_public._set_line_pointer(SlackTs("1700000000.000001"), "0x1")  # pyright: ignore [reportPrivateUsage]
+
+    channel_public._trim_messages()  # pyright: ignore [reportPrivateUsage]
+
+    assert list(channel_public.messages) == [SlackTs("1700000000.000002")]
+    assert SlackTs("1700000000.000000") not in channel_public.message_hashes
+    assert SlackTs("1700000000.000001") in channel_public.message_hashes
+
+    channel_public.clear_line_pointers()
+    channel_public._trim_messages()  # pyright: ignore [reportPrivateUsage]
+
+    assert SlackTs("1700000000.000001") not in channel_public.message_hashes
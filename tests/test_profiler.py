@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import weechat
+
+from slack.profiler import Profiler
+
+
+def test_profiler_disabled_records_nothing():
+    profiler = Profiler()
+
+    with profiler.measure("name"):
+        pass
+
+    assert profiler.stats == {}
+
+
+@patch("slack.profiler.time.perf_counter", side_effect=[1.0, 1.5, 2.0, 2.1])
+def test_profiler_measure(mock_perf_counter: MagicMock):
+    profiler = Profiler()
+    profiler.enabled = True
+
+    with profiler.measure("name"):
+        pass
+    with profiler.measure("name"):
+        pass
+
+    stats = profiler.stats["name"]
+    assert stats.count == 2
+    assert abs(stats.total_time - 0.6) < 1e-9
+    assert stats.max_time == 0.5
+
+
+def test_profiler_start_stop_writes_cprofile_stats(tmp_path: Path):
+    profiler = Profiler()
+
+    with patch.object(weechat, "info_get", return_value=str(tmp_path)):
+        profiler.start()
+        with profiler.measure("name"):
+            pass
+        path = profiler.stop()
+
+    assert path is not None
+    assert os.path.dirname(path) == str(tmp_path / "slack")
+    assert os.path.exists(path)
+    assert not profiler.enabled
+    report = profiler.report()
+    assert report[0].startswith("Profile stopped")
+    assert report[2].endswith("  name")
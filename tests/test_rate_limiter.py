@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from typing import List
+from unittest.mock import MagicMock, patch
+
+import pytest
+import weechat
+
+from slack.http import http_request
+from slack.rate_limiter import RateLimitBucket, SlackRateLimiter
+from slack.task import FutureTimer, FutureUrl
+
+
+@patch("slack.rate_limiter.time.monotonic", return_value=1000.0)
+@patch.object(weechat, "hook_timer")
+def test_rate_limit_bucket_acquire_burst(
+    mock_hook_timer: MagicMock, mock_monotonic: MagicMock
+):
+    bucket = RateLimitBucket("test", 60)
+
+    for _ in range(60):
+        with pytest.raises(StopIteration):
+            bucket.acquire().send(None)
+
+    mock_hook_timer.assert_not_called()
+    assert bucket.queue_depth == 0
+
+
+@patch("slack.rate_limiter.time.monotonic", return_value=1000.0)
+@patch.object(weechat, "hook_timer")
+def test_rate_limit_bucket_acquire_waits_in_order(
+    mock_hook_timer: MagicMock, mock_monotonic: MagicMock
+):
+    bucket = RateLimitBucket("test", 1)
+
+    with pytest.raises(StopIteration):
+        bucket.acquire().send(None)
+
+    coroutine_1 = bucket.acquire()
+    coroutine_2 = bucket.acquire()
+    future_1 = coroutine_1.send(None)
+    future_2 = coroutine_2.send(None)
+    assert isinstance(future_1, FutureTimer)
+    assert isinstance(future_2, FutureTimer)
+    assert bucket.queue_depth == 2
+    assert mock_hook_timer.call_args_list[0].args[0] == 60000
+    assert mock_hook_timer.call_args_list[1].args[0] == 120000
+
+    mock_monotonic.return_value = 1060.0
+    future_1.set_result((0,))
+    with pytest.raises(StopIteration):
+        coroutine_1.send(None)
+    assert bucket.queue_depth == 1
+
+
+@patch("slack.rate_limiter.time.monotonic", return_value=1000.0)
+@patch.object(weechat, "hook_timer")
+def test_rate_limit_bucket_pause(mock_hook_timer: MagicMock, mock_monotonic: MagicMock):
+    bucket = RateLimitBucket("test", 60)
+    bucket.pause(30)
+
+    coroutine = bucket.acquire()
+    future = coroutine.send(None)
+    assert isinstance(future, FutureTimer)
+    assert mock_hook_timer.call_args.args[0] == 31000
+
+    mock_monotonic.return_value = 1031.0
+    future.set_result((0,))
+    with pytest.raises(StopIteration):
+        coroutine.send(None)
+
+
+@patch("slack.rate_limiter.time.monotonic", return_value=1000.0)
+@patch.object(weechat, "hook_timer")
+def test_rate_limit_bucket_pause_with_waiters(
+    mock_hook_timer: MagicMock, mock_monotonic: MagicMock
+):
+    bucket = RateLimitBucket("test", 60)
+    bucket.tokens = 0
+
+    coroutines = [bucket.acquire() for _ in range(3)]
+    futures = [coroutine.send(None) for coroutine in coroutines]
+    assert bucket.tokens == -3
+    assert [call.args[0] for call in mock_hook_timer.call_args_list] == [
+        1000,
+        2000,
+        3000,
+    ]
+
+    bucket.pause(30)
+    mock_monotonic.return_value = 1001.0
+    for coroutine, future in zip(coroutines, futures):
+        future.set_result((0,))
+        assert isinstance(coroutine.send(None), FutureTimer)
+
+    # Each waiter still holds one token, so the count is the same as before
+    # the pause, apart from the one second of refill
+    assert bucket.tokens == -2
+    assert bucket.queue_depth == 3
+    assert [call.args[0] for call in mock_hook_timer.call_args_list[3:]] == [
+        31000,
+        31000,
+        31000,
+    ]
+
+
+def test_rate_limiter_bucket_per_method():
+    rate_limiter = SlackRateLimiter()
+    assert rate_limiter.bucket("users.info") is rate_limiter.bucket("users.info")
+    assert rate_limiter.bucket("users.info").capacity == 100
+    assert rate_limiter.bucket("conversations.list").capacity == 20
+    assert rate_limiter.bucket("users/search").capacity == 50
+
+
+def test_rate_limiter_pause_only_affects_method():
+    rate_limiter = SlackRateLimiter()
+    history = rate_limiter.bucket("conversations.history")
+    replies = rate_limiter.bucket("conversations.replies")
+    assert history is not replies
+    assert history.capacity == replies.capacity
+
+    history.pause(10)
+
+    assert history.paused_for > 0
+    assert replies.paused_for == 0
+    with pytest.raises(StopIteration):
+        replies.acquire().send(None)
+
+
+@patch.object(weechat, "hook_timer")
+def test_http_request_ratelimit_callback(mock_hook_timer: MagicMock):
+    url = "http://example.com"
+    ratelimit_callback = MagicMock()
+    coroutine = http_request(url, {}, 0, ratelimit_callback=ratelimit_callback)
+
+    future_1 = coroutine.send(None)
+    assert isinstance(future_1, FutureUrl)
+    future_1.set_result(
+        (
+            url,
+            {},
+            {
+                "response_code": "429",
+                "headers": "HTTP/2 429\r\nRetry-After: 12",
+                "output": "response",
+            },
+        )
+    )
+
+    future_2 = coroutine.send(None)
+    assert isinstance(future_2, FutureTimer)
+    ratelimit_callback.assert_called_once_with(12)
+
+
+@patch.object(weechat, "hook_timer")
+def test_http_request_ratelimit_acquires_token_before_retry(
+    mock_hook_timer: MagicMock,
+):
+    url = "http://example.com"
+    acquired: List[int] = []
+
+    async def acquire_token():
+        acquired.append(len(acquired))
+
+    coroutine = http_request(url, {}, 0, acquire_token=acquire_token)
+    future_1 = coroutine.send(None)
+    assert isinstance(future_1, FutureUrl)
+    future_1.set_result(
+        (
+            url,
+            {},
+            {
+                "response_code": "429",
+                "headers": "HTTP/2 429\r\nRetry-After: 1",
+                "output": "response",
+            },
+        )
+    )
+
+    future_2 = coroutine.send(None)
+    assert isinstance(future_2, FutureTimer)
+    assert acquired == []
+    future_2.set_result((0,))
+
+    future_3 = coroutine.send(None)
+    assert isinstance(future_3, FutureUrl)
+    assert acquired == [0]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import TYPE_CHECKING, List
+from unittest.mock import AsyncMock, patch
+
+from slack.slack_api import SlackApi
+from slack.slack_conversation import SlackConversation
+from slack.slack_message import SlackMessage, SlackTs
+from slack.slack_workspace import SlackWorkspace
+from slack.task import create_task
+from tests.conftest import channel_public_info
+
+if TYPE_CHECKING:
+    from slack_api.slack_conversations_history import SlackMessageStandardFinal
+
+
+def client_counts(channel_id: str, last_read: str, latest: str):
+    return {
+        "ok": True,
+        "channels": [
+            {
+                "id": channel_id,
+                "last_read": last_read,
+                "latest": latest,
+                "updated": latest,
+                "history_invalid": "0000000000.000000",
+                "mention_count": 0,
+                "has_unreads": latest > last_read,
+            }
+        ],
+        "mpims": [],
+        "ims": [],
+    }
+
+
+def setup_open_conversation(workspace: SlackWorkspace, conversation: SlackConversation):
+    workspace.config.max_concurrent_requests.value = 10
+    message_json: SlackMessageStandardFinal = {
+        "type": "message",
+        "ts": "1700000000.000001",
+        "user": workspace.my_user.id,
+        "text": "a",
+    }  # pyright: ignore [reportAssignmentType]
+    message = SlackMessage(conversation, message_json)
+    conversation._add_or_update_message(message)  # pyright: ignore [reportPrivateUsage]
+    conversation.last_printed_ts = message.ts
+    workspace.open_conversations[conversation.id] = conversation
+
+
+def test_initialize_delta_fetches_changed_conversation(
+    workspace: SlackWorkspace, channel_public: SlackConversation
+):
+    setup_open_conversation(workspace, channel_public)
+    counts = client_counts(channel_public.id, "1700000000.000001", "1700000000.000002")
+
+    with patch.object(
+        SlackApi, "fetch_client_counts", AsyncMock(return_value=counts)
+    ), patch.object(SlackConversation, "fill_history", AsyncMock()) as fill_history:
+        create_task(workspace._initialize_delta())  # pyright: ignore [reportPrivateUsage]
+
+    fill_history.assert_awaited_once_with(update=True)
+    assert channel_public.last_read == SlackTs("1700000000.000001")
+
+
+def test_initialize_delta_skips_unchanged_conversation(
+    workspace: SlackWorkspace, channel_public: SlackConversation
+):
+    setup_open_conversation(workspace, channel_public)
+    counts = client_counts(channel_public.id, "1700000000.000001", "1700000000.000001")
+
+    with patch.object(
+        SlackApi, "fetch_client_counts", AsyncMock(return_value=counts)
+    ), patch.object(SlackConversation, "fill_history", AsyncMock()) as fill_history:
+        create_task(workspace._initialize_delta())  # pyright: ignore [reportPrivateUsage]
+
+    fill_history.assert_not_awaited()
+
+
+def test_hello_after_delta_only_loads_unprinted_conversations(
+    workspace: SlackWorkspace,
+    channel_public: SlackConversation,
+):
+    channel_new_info = deepcopy(channel_public_info)
+    channel_new_info["id"] = "CNEW"
+    channel_new = create_task(SlackConversation(workspace, channel_new_info)).result()
+    workspace.is_connected = True
+    workspace._initial_connect = False  # pyright: ignore [reportPrivateUsage]
+    setup_open_conversation(workspace, channel_public)
+    channel_public.hotlist_tss.add(SlackTs("1700000000.000001"))
+    workspace.open_conversations[channel_new.id] = channel_new
+    channel_new.hotlist_tss.add(SlackTs("1700000000.000001"))
+    loaded: List[SlackConversation] = []
+
+    async def fill_history(conversation: SlackConversation, update: bool = False):
+        loaded.append(conversation)
+
+    with patch.object(SlackWorkspace, "token_type", "session"), patch.object(
+        SlackWorkspace, "_initialize_delta", AsyncMock()
+    ) as initialize_delta, patch.object(
+        SlackConversation, "fill_history", fill_history
+    ):
+        create_task(workspace._ws_recv({"type": "hello", "fast_reconnect": False}))  # pyright: ignore [reportPrivateUsage, reportArgumentType]
+
+    initialize_delta.assert_awaited_once()
+    assert loaded == [channel_new]
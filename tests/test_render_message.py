@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import TYPE_CHECKING, Iterable, List
+from unittest.mock import patch
+
+from slack.shared import shared
+from slack.slack_api import SlackApi
+from slack.slack_conversation import SlackConversation
+from slack.slack_message import PendingMessageItem, SlackMessage
+from slack.task import create_task
+from tests.conftest import color_default, color_user_mention, user_test2_info
+
+if TYPE_CHECKING:
+    from slack_api.slack_conversations_history import SlackMessageStandardFinal
+    from slack_api.slack_users_info import SlackUserInfo
+
+
+def test_render_message_fetches_unknown_users_in_one_request(
+    channel_public: SlackConversation,
+):
+    users_info: List[SlackUserInfo] = []
+    for user_id, display_name in [("U3", "Test_3"), ("U4", "Test_4")]:
+        user_info = deepcopy(user_test2_info)
+        user_info["id"] = user_id
+        user_info["profile"]["display_name"] = display_name
+        users_info.append(user_info)
+
+    async def fetch_users_info(user_ids: Iterable[str]):
+        return {"ok": True, "users": [i for i in users_info if i["id"] in user_ids]}
+
+    message_json: SlackMessageStandardFinal = {
+        "type": "message",
+        "ts": "1234567890.123456",
+        "user": "U3",
+        "text": "<@U3> and <@U4>",
+    }  # pyright: ignore [reportAssignmentType]
+    message = SlackMessage(channel_public, message_json)
+
+    with patch.object(
+        SlackApi, "fetch_users_info", side_effect=fetch_users_info
+    ) as mock_method:
+        task = create_task(message._render_message())  # pyright: ignore [reportPrivateUsage]
+
+    mock_method.assert_called_once()
+    assert set(mock_method.call_args.args[0]) == {"U3", "U4"}
+    assert task.result() == (
+        f"{color_user_mention}@Test_3{color_default} and "
+        f"{color_user_mention}@Test_4{color_default}"
+    )
+
+
+def test_render_message_after_config_change_does_not_parse_or_fetch(
+    channel_public: SlackConversation,
+):
+    message_json: SlackMessageStandardFinal = {
+        "type": "message",
+        "ts": "1234567890.123456",
+        "user": user_test2_info["id"],
+        "text": "",
+        "blocks": [
+            {
+                "type": "rich_text",
+                "block_id": "b",
+                "elements": [
+                    {
+                        "type": "rich_text_section",
+                        "elements": [
+                            {"type": "user", "user_id": user_test2_info["id"]},
+                            {"type": "text", "text": " "},
+                            {"type": "emoji", "name": "smile", "unicode": "1f604"},
+                        ],
+                    }
+                ],
+            }
+        ],
+    }  # pyright: ignore [reportAssignmentType]
+    message = SlackMessage(channel_public, message_json)
+    shared.config.look.render_emoji_as.value = "emoji"
+
+    task = create_task(message._render_message())  # pyright: ignore [reportPrivateUsage]
+    assert task.result() == f"{color_user_mention}@Test_2{color_default} 😄"
+
+    shared.config.look.render_emoji_as.value = "name"
+    with patch.object(
+        SlackMessage, "_render_blocks", side_effect=AssertionError
+    ), patch.object(PendingMessageItem, "fetch", side_effect=AssertionError):
+        task = create_task(message._render_message(rerender=True))  # pyright: ignore [reportPrivateUsage]
+
+    assert task.result() == f"{color_user_mention}@Test_2{color_default} :smile:"
+
+
+def test_compact_message_is_parsed_again_from_compacted_fields(
+    channel_public: SlackConversation,
+):
+    message_json: SlackMessageStandardFinal = {
+        "type": "message",
+        "ts": "1234567890.123456",
+        "user": user_test2_info["id"],
+        "text": "fallback",
+        "blocks": [
+            {
+                "type": "rich_text",
+                "block_id": "b",
+                "elements": [
+                    {
+                        "type": "rich_text_section",
+                        "elements": [{"type": "text", "text": "hello"}],
+                    }
+                ],
+            }
+        ],
+    }  # pyright: ignore [reportAssignmentType]
+    blocks = message_json["blocks"]
+    message = SlackMessage(channel_public, message_json)
+    shared.config.look.compact_messages.value = True
+
+    task = create_task(message._render_message())  # pyright: ignore [reportPrivateUsage]
+    assert task.result() == "hello"
+    assert message.is_compacted
+    assert "blocks" not in message._message_json  # pyright: ignore [reportPrivateUsage]
+    assert message.text == "fallback"
+    assert not message.is_compacted
+    assert message.message_json.get("blocks") == blocks
+
+    shared.config.look.display_link_previews.value = "never"
+    task = create_task(message._render_message(rerender=True))  # pyright: ignore [reportPrivateUsage]
+    assert task.result() == "hello"
+    assert message.is_compacted
+
+    message.update_message_json({"edited": {"user": "U2", "ts": "1"}})  # pyright: ignore [reportArgumentType]
+    assert not message.is_compacted
+    assert message.message_json.get("blocks") == blocks
+
+
+def test_nick_of_compact_message_does_not_decompress_fields(
+    channel_public: SlackConversation,
+):
+    message_json: SlackMessageStandardFinal = {
+        "type": "message",
+        "ts": "1234567890.123456",
+        "user": "U3",
+        "text": "hello",
+        "user_profile": {"name": "test3", "display_name": "Test_3"},
+    }  # pyright: ignore [reportAssignmentType]
+    message = SlackMessage(channel_public, message_json)
+    shared.config.look.compact_messages.value = True
+    create_task(message._render_message())  # pyright: ignore [reportPrivateUsage]
+    assert message.is_compacted
+
+    with patch.object(SlackMessage, "_expand_message_json", side_effect=AssertionError):
+        task = create_task(message.nick())
+
+    assert task.result().raw_nick == "Test_3"
+    assert message.is_compacted
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING, List
+from unittest.mock import patch
 
 import pytest
 
@@ -71,3 +72,37 @@ def test_create_reactions_string(case: Case, message1_in_channel_public: SlackMe
     with pytest.raises(StopIteration) as excinfo:
         coroutine.send(None)
     assert excinfo.value.value == case["rendered"]
+
+
+def test_only_changed_reaction_is_rendered_again(
+    message1_in_channel_public: SlackMessage,
+):
+    shared.config.look.display_reaction_nicks.value = True
+    message = message1_in_channel_public
+    message.reaction_add("custom", user_test2_id)
+    message.reaction_add("other", user_test2_id)
+
+    def create_reactions_string():
+        coroutine = message._create_reactions_string()  # pyright: ignore [reportPrivateUsage]
+        with pytest.raises(StopIteration) as excinfo:
+            coroutine.send(None)
+        return excinfo.value.value
+
+    create_reactions_string()
+    message.reaction_add("other", user_test1_id)
+
+    with patch.object(
+        SlackMessage,
+        "_create_reaction_string",
+        autospec=True,
+        side_effect=SlackMessage._create_reaction_string,  # pyright: ignore [reportPrivateUsage]
+    ) as create_reaction_string:
+        rendered = create_reactions_string()
+
+    assert create_reaction_string.call_count == 1
+    assert create_reaction_string.call_args.args[1]["name"] == "other"
+    assert rendered == (
+        f" {color_reaction_suffix}[:custom:1(Test_2) "
+        f"{color_reaction_self_suffix}:other:2(Test_2, Test_1){color_reaction_suffix}]"
+        f"{color_default}"
+    )
@@ -87,3 +87,20 @@ def test_slackts_le():
     assert not ts_different_major <= ts_base
     assert not str_different_minor <= ts_base
     assert not str_different_major <= ts_base
+
+
+def test_slackts_key():
+    assert ts_base.key == 1234567890012345
+    assert ts_base.major == 1234567890
+    assert ts_base.minor == 12345
+    assert SlackTs(ts_base).key == ts_base.key
+    assert sorted([ts_different_major, ts_base, ts_different_minor]) == [
+        ts_base,
+        ts_different_minor,
+        ts_different_major,
+    ]
+
+
+def test_slackts_hash():
+    assert hash(ts_base) == hash(ts_base_not_padded)
+    assert {ts_base: 1}[SlackTs(str_base)] == 1
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from slack.slack_message import SlackTs
+from slack.util import SortedDict
+
+
+def test_sorted_dict_keeps_keys_sorted():
+    sorted_dict: SortedDict[SlackTs, str] = SortedDict()
+    for ts in ["1700000000.000002", "1700000000.000004", "1700000000.000001"]:
+        sorted_dict[SlackTs(ts)] = ts
+    sorted_dict[SlackTs("1700000000.000003")] = "3"
+    sorted_dict[SlackTs("1700000000.000002")] = "2"
+    del sorted_dict[SlackTs("1700000000.000004")]
+
+    assert list(sorted_dict.items()) == [
+        (SlackTs("1700000000.000001"), "1700000000.000001"),
+        (SlackTs("1700000000.000002"), "2"),
+        (SlackTs("1700000000.000003"), "3"),
+    ]
+    assert next(reversed(sorted_dict)) == SlackTs("1700000000.000003")
+
+
+def test_sorted_dict_range():
+    sorted_dict: SortedDict[int, int] = SortedDict()
+    for key in [5, 1, 3, 2, 4]:
+        sorted_dict[key] = key
+
+    assert sorted_dict.after(3) == [4, 5]
+    assert sorted_dict.after(3, inclusive=True) == [3, 4, 5]
+    assert sorted_dict.before(3) == [1, 2]
+    assert sorted_dict.before(3, inclusive=True) == [1, 2, 3]
+    assert sorted_dict.after(0) == [1, 2, 3, 4, 5]
+    assert sorted_dict.before(0) == []
+
+
+def test_sorted_dict_remove_from_front():
+    sorted_dict: SortedDict[int, int] = SortedDict()
+    for key in range(10):
+        sorted_dict[key] = key
+    for key in range(4):
+        del sorted_dict[key]
+    sorted_dict[3] = 3
+    del sorted_dict[5]
+
+    assert list(sorted_dict) == [3, 4, 6, 7, 8, 9]
+    assert list(reversed(sorted_dict)) == [9, 8, 7, 6, 4, 3]
+    assert len(sorted_dict) == 6
+    assert sorted_dict.after(4) == [6, 7, 8, 9]
+    assert sorted_dict.before(6) == [3, 4]
+
+    for key in [3, 4, 6, 7, 8, 9]:
+        del sorted_dict[key]
+    sorted_dict[1] = 1
+    assert list(sorted_dict.items()) == [(1, 1)]
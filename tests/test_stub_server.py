@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+from typing import Dict, Iterator, List, Optional
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+from websocket import create_connection
+
+from benchmarks.fake_slack_api import FakeSlackApi
+from benchmarks.stub_server import StubFaults, StubRtmOptions, StubSlackServer
+from slack.http import HttpRequestInfo
+from slack.slack_workspace import SlackWorkspace
+from slack.task import create_task
+
+
+@pytest.fixture
+def server() -> Iterator[StubSlackServer]:
+    server = StubSlackServer(FakeSlackApi(num_channels=3, num_users=5))
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_stub_server_api(server: StubSlackServer):
+    with urlopen(f"{server.url}/api/users.info?user=U01", b"") as response:
+        assert json.loads(response.read())["user"]["id"] == "U01"
+
+    with urlopen(f"{server.url}/api/client.counts", b"") as response:
+        channels = json.loads(response.read())["channels"]
+        assert [channel["id"] for channel in channels] == server.api.channel_ids
+
+    assert server.api.requests == {"users.info": 1, "client.counts": 1}
+    assert server.stats.requests == 2
+
+
+def test_stub_server_injects_ratelimits(server: StubSlackServer):
+    server.faults = StubFaults(ratelimit_ratio=1, retry_after=3)
+
+    with pytest.raises(HTTPError) as excinfo:
+        urlopen(f"{server.url}/api/users.info?user=U01", b"")
+    assert excinfo.value.code == 429
+    assert excinfo.value.headers["Retry-After"] == "3"
+    assert server.stats.ratelimited == 1
+    assert server.api.requests == {}
+
+
+def test_stub_server_websocket(server: StubSlackServer):
+    server.rtm = StubRtmOptions(events_per_second=100)
+    ws = create_connection(server.api.ws_url, timeout=5)
+    try:
+        assert json.loads(ws.recv())["type"] == "hello"
+        assert json.loads(ws.recv())["type"] == "reconnect_url"
+        assert "type" in json.loads(ws.recv())
+
+        ws.send(json.dumps({"type": "ping", "id": 1}))
+        events = [json.loads(ws.recv()) for _ in range(20)]
+        assert {"type": "pong", "reply_to": 1} in events
+    finally:
+        ws.close()
+    assert server.stats.ws_connections == 1
+
+
+def test_slack_api_uses_api_base_url(workspace: SlackWorkspace):
+    urls: List[str] = []
+
+    async def fake_http_request(
+        url: str,
+        options: Dict[str, str],
+        timeout: int,
+        ratelimit_callback: object,
+        acquire_token: object,
+        request_info: Optional[HttpRequestInfo],
+    ):
+        urls.append(url)
+        return '{"ok": true}'
+
+    workspace.config.api_base_url.value = "http://localhost:8080/"
+    with patch("slack.slack_api.http_request", side_effect=fake_http_request):
+        create_task(workspace.api.fetch_users_get_prefs())
+
+    assert urls == ["http://localhost:8080/api/users.prefs.get"]
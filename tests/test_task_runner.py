@@ -1,9 +1,19 @@
 from __future__ import annotations
 
 from collections import defaultdict
+from typing import List, Tuple
+from unittest.mock import patch
 
 from slack.shared import shared
-from slack.task import Future, create_task, weechat_task_cb
+from slack.task import (
+    Future,
+    PriorityLimiter,
+    create_task,
+    gather_limited,
+    wait_for_fd,
+    weechat_task_cb,
+    weechat_timeout_cb,
+)
 
 
 def test_run_single_task():
@@ -79,3 +89,148 @@ def test_task_without_await():
 
     assert not shared.active_tasks
     assert not shared.active_futures
+
+
+def test_gather_limited():
+    shared.active_tasks = defaultdict(list)
+    shared.active_futures = {}
+    futures = [Future[str]() for _ in range(5)]
+    started: List[int] = []
+
+    async def awaitable(i: int):
+        started.append(i)
+        result = await futures[i]
+        return i, result
+
+    task = create_task(gather_limited(2, *(awaitable(i) for i in range(5))))
+    assert started == [0, 1]
+
+    weechat_task_cb(futures[1].id, "data1")
+    assert started == [0, 1, 2]
+
+    for i in [0, 2, 3, 4]:
+        weechat_task_cb(futures[i].id, f"data{i}")
+
+    assert not shared.active_tasks
+    assert not shared.active_futures
+    assert task.result() == [(i, (f"data{i}",)) for i in range(5)]
+
+
+def test_priority_limiter():
+    shared.active_tasks = defaultdict(list)
+    shared.active_futures = {}
+    futures = [Future[str]() for _ in range(5)]
+    priorities = [0, 3, 2, 1, 4]
+    started: List[int] = []
+    timers: List[str] = []
+    limiter = PriorityLimiter(lambda: 2)
+
+    def hook_timer(interval: int, align: int, max_calls: int, cb: str, data: str):
+        timers.append(data)
+        return "hook_timer"
+
+    def run_timers():
+        while timers:
+            weechat_task_cb(timers.pop(0), 0)
+
+    async def awaitable(i: int):
+        started.append(i)
+        result = await futures[i]
+        return i, result
+
+    with patch("weechat.hook_timer", side_effect=hook_timer):
+        tasks = [
+            create_task(limiter.run(awaitable(i), lambda i=i: priorities[i]))
+            for i in range(5)
+        ]
+        assert started == [0, 1]
+        assert limiter.waiting == 3
+
+        priorities[4] = -1
+        weechat_task_cb(futures[1].id, "data1")
+        # The next coroutine is started from a timer, not when the first ends
+        assert started == [0, 1]
+        assert limiter.running == 2
+        run_timers()
+        assert started == [0, 1, 4]
+
+        for i in [0, 4, 3, 2]:
+            weechat_task_cb(futures[i].id, f"data{i}")
+            run_timers()
+        assert started == [0, 1, 4, 3, 2]
+
+    assert not shared.active_tasks
+    assert not shared.active_futures
+    assert limiter.running == 0
+    assert [task.result() for task in tasks] == [(i, (f"data{i}",)) for i in range(5)]
+
+
+def test_priority_limiter_cancel_started_waiter():
+    shared.active_tasks = defaultdict(list)
+    shared.active_futures = {}
+    futures = [Future[str]() for _ in range(3)]
+    started: List[int] = []
+    timers: List[str] = []
+    limiter = PriorityLimiter(lambda: 1)
+
+    def hook_timer(interval: int, align: int, max_calls: int, cb: str, data: str):
+        timers.append(data)
+        return "hook_timer"
+
+    async def awaitable(i: int):
+        started.append(i)
+        return await futures[i]
+
+    with patch("weechat.hook_timer", side_effect=hook_timer):
+        tasks = [
+            create_task(limiter.run(awaitable(i), lambda i=i: i)) for i in range(3)
+        ]
+        weechat_task_cb(futures[0].id, "data0")
+        # Cancel the waiter which was picked before its timer has run, so its
+        # slot goes to the next one
+        tasks[1].cancel()
+        for timer in timers:
+            weechat_task_cb(timer, 0)
+
+    assert started == [0, 2]
+    assert limiter.running == 1
+    assert limiter.waiting == 0
+
+
+def test_wait_for_fd():
+    shared.active_tasks = defaultdict(list)
+    shared.active_futures = {}
+    hooks: List[Tuple[int, int, int, str]] = []
+
+    def hook_fd(fd: int, read: int, write: int, exception: int, cb: str, data: str):
+        hooks.append((fd, read, write, data))
+        return "hook_fd"
+
+    with patch("weechat.hook_fd", side_effect=hook_fd):
+        task = create_task(wait_for_fd(5, True, 1000))
+
+    assert [hook[:3] for hook in hooks] == [(5, 0, 1)]
+    weechat_task_cb(hooks[0][3], 5)
+
+    assert not shared.active_tasks
+    assert not shared.active_futures
+    assert task.done_with_result()
+
+
+def test_wait_for_fd_timeout():
+    shared.active_tasks = defaultdict(list)
+    shared.active_futures = {}
+    timers: List[str] = []
+
+    def hook_timer(interval: int, align: int, max_calls: int, cb: str, data: str):
+        timers.append(data)
+        return "hook_timer"
+
+    with patch("weechat.hook_timer", side_effect=hook_timer):
+        task = create_task(wait_for_fd(5, False, 1000))
+
+    weechat_timeout_cb(timers[0], 0)
+
+    assert not shared.active_tasks
+    assert not shared.active_futures
+    assert isinstance(task.exception(), TimeoutError)
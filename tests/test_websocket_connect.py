@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import select
+import socket
+import threading
+from typing import Dict, Iterator, List, Tuple
+from unittest.mock import MagicMock, patch
+
+import pytest
+import weechat
+from websocket import WebSocketException
+
+from benchmarks.fake_slack_api import FakeSlackApi
+from benchmarks.stub_server import StubSlackServer
+from slack.slack_workspace import SlackWorkspace
+from slack.task import create_task, weechat_task_cb, weechat_timeout_cb
+from slack.websocket_connect import connect_websocket
+
+
+@pytest.fixture
+def server() -> Iterator[StubSlackServer]:
+    server = StubSlackServer(FakeSlackApi(num_channels=1, num_users=1))
+    server.start()
+    yield server
+    server.stop()
+
+
+# Runs connect_websocket with the WeeChat hooks replaced by a blocking connect
+# and a select loop
+def run_connect(url: str, cookie: str = ""):
+    connects: Dict[str, socket.socket] = {}
+    fd_hooks: Dict[str, Tuple[int, int, int]] = {}
+
+    def hook_connect(
+        proxy: str,
+        address: str,
+        port: int,
+        ipv6: int,
+        retry: int,
+        local_hostname: str,
+        callback: str,
+        callback_data: str,
+    ):
+        connects[callback_data] = socket.create_connection((address, port))
+        return callback_data
+
+    def hook_fd(fd: int, read: int, write: int, exception: int, cb: str, data: str):
+        fd_hooks[data] = (fd, read, write)
+        return data
+
+    def unhook(hook: str):
+        fd_hooks.pop(hook, None)
+
+    with patch("weechat.hook_connect", side_effect=hook_connect), patch(
+        "weechat.hook_fd", side_effect=hook_fd
+    ), patch("weechat.unhook", side_effect=unhook):
+        task = create_task(connect_websocket(url, "", cookie, 5000))
+        for data, sock in connects.items():
+            weechat_task_cb(
+                data, weechat.WEECHAT_HOOK_CONNECT_OK, 0, sock.detach(), "", ""
+            )
+        while not task.done():
+            data, (fd, read, write) = next(iter(fd_hooks.items()))
+            select.select([fd] if read else [], [fd] if write else [], [], 5)
+            weechat_task_cb(data, fd)
+    return task.result()
+
+
+def test_connect_websocket(server: StubSlackServer):
+    ws = run_connect(server.api.ws_url, cookie="d=abc")
+    try:
+        ws.sock.setblocking(True)
+        _, data = ws.recv_data(control_frame=False)
+        assert json.loads(data)["type"] == "hello"
+    finally:
+        ws.close()
+    assert server.stats.ws_connections == 1
+
+
+def test_connect_websocket_fails_without_upgrade():
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def respond():
+        conn, _ = listener.accept()
+        with conn:
+            conn.recv(4096)
+            conn.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+
+    thread = threading.Thread(target=respond)
+    thread.start()
+    try:
+        port = listener.getsockname()[1]
+        with pytest.raises(WebSocketException, match="400 Bad Request"):
+            run_connect(f"ws://127.0.0.1:{port}/websocket")
+    finally:
+        thread.join()
+        listener.close()
+
+
+def test_connect_websocket_hook_connect_timeout():
+    timers: List[str] = []
+    unhooked: List[str] = []
+
+    def hook_timer(interval: int, align: int, max_calls: int, cb: str, data: str):
+        timers.append(data)
+        return "hook_timer"
+
+    def unhook(hook: str):
+        unhooked.append(hook)
+
+    with patch("weechat.hook_connect", return_value="hook_connect"), patch(
+        "weechat.hook_timer", side_effect=hook_timer
+    ), patch("weechat.unhook", side_effect=unhook):
+        task = create_task(connect_websocket("ws://127.0.0.1/websocket", "", "", 5000))
+        weechat_timeout_cb(timers[0], 0)
+
+    assert isinstance(task.exception(), TimeoutError)
+    assert sorted(unhooked) == ["hook_connect", "hook_timer"]
+
+
+def test_connect_websocket_times_out_on_slow_response():
+    listener = socket.create_server(("127.0.0.1", 0))
+    clock = [0.0]
+
+    def respond():
+        conn, _ = listener.accept()
+        with conn:
+            conn.recv(4096)
+            conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\n")
+            # The deadline covers the whole connect, so it passes even though
+            # data keeps arriving
+            clock[0] = 10.0
+            conn.sendall(b"Upgrade: websocket\r\n")
+            conn.recv(1)
+
+    thread = threading.Thread(target=respond)
+    thread.start()
+    try:
+        port = listener.getsockname()[1]
+        with patch("slack.websocket_connect.time.monotonic", lambda: clock[0]):
+            with pytest.raises(TimeoutError):
+                run_connect(f"ws://127.0.0.1:{port}/websocket")
+    finally:
+        thread.join()
+        listener.close()
+
+
+def test_connect_ws_reads_frames_buffered_during_handshake(workspace: SlackWorkspace):
+    ws = MagicMock()
+    ws.frame_buffer.recv_buffer = [b"frame"]
+    ws.sock.fileno.return_value = 5
+    timers: List[str] = []
+    reads: List[int] = []
+
+    def hook_timer(interval: int, align: int, max_calls: int, cb: str, data: str):
+        timers.append(data)
+        return "hook_timer"
+
+    def ws_read_cb(data: str, fd: int):
+        reads.append(fd)
+        return weechat.WEECHAT_RC_OK
+
+    with patch("slack.slack_workspace.connect_websocket", return_value=ws), patch(
+        "weechat.hook_timer", side_effect=hook_timer
+    ), patch.object(workspace, "_ws_read_cb", ws_read_cb):
+        task = create_task(workspace._connect_ws("wss://example.com"))  # pyright: ignore [reportPrivateUsage]
+        assert task.done_with_result()
+        assert reads == []
+        weechat_task_cb(timers[0], 0)
+
+    assert reads == [5]
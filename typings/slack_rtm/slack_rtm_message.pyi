@@ -320,6 +320,13 @@ class SlackUserStatusChanged(TypedDict):
     cache_ts: str
     event_ts: str
 
+@final
+class SlackUserChange(TypedDict):
+    type: Literal["user_change"]
+    user: SlackUserInfoPerson
+    cache_ts: int
+    event_ts: str
+
 class SlackUserInvalidatedUser(TypedDict):
     id: str
 
@@ -409,6 +416,7 @@ SlackRtmMessage = (
     | SlackUserTyping
     | SlackPrefChange
     | SlackUserStatusChanged
+    | SlackUserChange
     | SlackUserInvalidated
     | SlackSubteamCreated
     | SlackSubteamUpdated
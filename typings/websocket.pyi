@@ -48,11 +48,17 @@ class ABNF:
 class WebSocketException(Exception): ...
 class WebSocketConnectionClosedException(WebSocketException): ...
 
+class frame_buffer:
+    recv_buffer: list[bytes]
+
 class WebSocket:
     sock: socket
+    connected: bool
+    frame_buffer: frame_buffer
 
     def send(self, payload: str, opcode: int = ABNF.OPCODE_TEXT) -> int: ...
     def ping(self, payload: str = ...) -> None: ...
+    def recv(self) -> str | bytes: ...
     def recv_data(
         self, control_frame: bool
     ) -> tuple[
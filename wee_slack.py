@@ -5,6 +5,7 @@
 
 from __future__ import print_function, unicode_literals
 
+from bisect import bisect_left, bisect_right, insort
 from collections import OrderedDict, namedtuple
 from datetime import date, datetime, timedelta
 from functools import partial, wraps
@@ -50,11 +51,19 @@ try:
         Iterable,
         KeysView,
         Mapping,
+        MutableMapping,
         Reversible,
         ValuesView,
     )
 except ImportError:
-    from collections import ItemsView, Iterable, KeysView, Mapping, ValuesView
+    from collections import (
+        ItemsView,
+        Iterable,
+        KeysView,
+        Mapping,
+        MutableMapping,
+        ValuesView,
+    )
 
     Reversible = object
 
@@ -339,6 +348,64 @@ class MappingReversible(Mapping, Reversible):
         return ValuesViewReversible(self)
 
 
+class SortedDict(MutableMapping, MappingReversible):
+    """
+    A dict which keeps its keys sorted, without having to sort all the items
+    when one is added. Keys larger than the last key, which is the common case
+    for new messages, are appended, and other keys are inserted by bisecting.
+    Removing the first key, which is how old messages are evicted, only moves
+    a start offset, and the removed keys are dropped from the list once they
+    make up half of it.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._start = 0
+        self._dict = {}
+
+    def __getitem__(self, key):
+        return self._dict[key]
+
+    def __setitem__(self, key, value):
+        if key not in self._dict:
+            if len(self._keys) == self._start or self._keys[-1] < key:
+                self._keys.append(key)
+            else:
+                insort(self._keys, key, self._start)
+        self._dict[key] = value
+
+    def __delitem__(self, key):
+        del self._dict[key]
+        index = bisect_left(self._keys, key, self._start)
+        if index == self._start:
+            self._start += 1
+            if self._start * 2 >= len(self._keys):
+                del self._keys[: self._start]
+                self._start = 0
+        else:
+            del self._keys[index]
+
+    def __contains__(self, key):
+        return key in self._dict
+
+    def __iter__(self):
+        return islice(self._keys, self._start, None)
+
+    def __reversed__(self):
+        return islice(reversed(self._keys), len(self._keys) - self._start)
+
+    def __len__(self):
+        return len(self._dict)
+
+    def after(self, key, inclusive=False):
+        bisect = bisect_left if inclusive else bisect_right
+        return self._keys[bisect(self._keys, key, self._start) :]
+
+    def before(self, key, inclusive=False):
+        bisect = bisect_right if inclusive else bisect_left
+        return self._keys[self._start : bisect(self._keys, key, self._start)]
+
+
 class KeysViewReversible(KeysView, Reversible):
     def __reversed__(self):
         return reversed(self._mapping)
@@ -2180,7 +2247,7 @@ class SlackChannel(SlackChannelCommon):
         self.got_members = False
         self.history_needs_update = False
         self.pending_history_requests = set()
-        self.messages = OrderedDict()
+        self.messages = SortedDict()
         self.visible_messages = SlackChannelVisibleMessages(self)
         self.hashed_messages = SlackChannelHashedMessages(self)
         self.thread_channels = {}
@@ -2470,7 +2537,7 @@ class SlackChannel(SlackChannelCommon):
 
     def destroy_buffer(self, update_remote):
         super(SlackChannel, self).destroy_buffer(update_remote)
-        self.messages = OrderedDict()
+        self.messages = SortedDict()
         if update_remote and not self.eventrouter.shutting_down:
             s = SlackRequest(
                 self.team,
@@ -2540,7 +2607,6 @@ class SlackChannel(SlackChannelCommon):
             message_to_store.submessages = old_message.submessages
 
         self.messages[message_to_store.ts] = message_to_store
-        self.messages = OrderedDict(sorted(self.messages.items()))
 
         max_history = w.config_integer(
             w.config_get("weechat.history.max_buffer_lines_number")
@@ -2845,9 +2911,55 @@ class SlackChannelVisibleMessages(MappingReversible):
                 yield ts
 
 
+class PrefixIndex(object):
+    """
+    A set of strings which can efficiently check if any of the strings starts
+    with a given prefix, by keeping them sorted and bisecting.
+    """
+
+    def __init__(self):
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def __contains__(self, value):
+        index = bisect_left(self._sorted, value)
+        return index < len(self._sorted) and self._sorted[index] == value
+
+    def add(self, value):
+        if value not in self:
+            insort(self._sorted, value)
+
+    def remove(self, value):
+        index = bisect_left(self._sorted, value)
+        if index < len(self._sorted) and self._sorted[index] == value:
+            del self._sorted[index]
+
+    def has_prefix(self, prefix):
+        index = bisect_left(self._sorted, prefix)
+        return index < len(self._sorted) and self._sorted[index].startswith(prefix)
+
+
 class SlackChannelHashedMessages(dict):
     def __init__(self, channel):
         self.channel = channel
+        self.hash_index = PrefixIndex()
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, SlackTS):
+            self.hash_index.add(key)
+        super(SlackChannelHashedMessages, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if not isinstance(key, SlackTS):
+            self.hash_index.remove(key)
+        super(SlackChannelHashedMessages, self).__delitem__(key)
+
+    def pop(self, key, *args):
+        if not isinstance(key, SlackTS):
+            self.hash_index.remove(key)
+        return super(SlackChannelHashedMessages, self).pop(key, *args)
 
     def __missing__(self, key):
         if not isinstance(key, SlackTS):
@@ -2857,7 +2969,7 @@ class SlackChannelHashedMessages(dict):
         full_hash = sha1_hex(str(key))
         short_hash = full_hash[:hash_len]
 
-        while any(x.startswith(short_hash) for x in self if isinstance(x, str)):
+        while self.hash_index.has_prefix(short_hash):
             hash_len += 1
             short_hash = full_hash[:hash_len]
 
@@ -3601,59 +3713,75 @@ class Hdata(object):
         self.lines = w.hdata_get("lines")
 
 
+def slack_ts_key(ts):
+    """
+    Returns a ts as a single integer which sorts in the same order as the ts.
+    """
+    major, _, minor = ts.partition(".")
+    return int(major) * 1000000 + int(minor or 0)
+
+
 class SlackTS(object):
+    """
+    A ts which is compared and hashed by its integer key, which is only
+    computed once. Comparing with a string parses it, without creating a
+    SlackTS.
+    """
+
+    __slots__ = ("key",)
+
     def __init__(self, ts=None):
-        if isinstance(ts, int):
-            self.major = ts
-            self.minor = 0
+        if isinstance(ts, SlackTS):
+            self.key = ts.key
+        elif isinstance(ts, int):
+            self.key = ts * 1000000
         elif ts is not None:
-            self.major, self.minor = [int(x) for x in ts.split(".", 1)]
+            self.key = slack_ts_key(ts)
         else:
-            self.major = int(time.time())
-            self.minor = 0
+            self.key = int(time.time()) * 1000000
+
+    @property
+    def major(self):
+        return self.key // 1000000
 
-    def __cmp__(self, other):
+    @property
+    def minor(self):
+        return self.key % 1000000
+
+    def _other_key(self, other):
         if isinstance(other, SlackTS):
-            if self.major < other.major:
-                return -1
-            elif self.major > other.major:
-                return 1
-            elif self.major == other.major:
-                if self.minor < other.minor:
-                    return -1
-                elif self.minor > other.minor:
-                    return 1
-                else:
-                    return 0
-        elif isinstance(other, str):
-            s = self.__str__()
-            if s < other:
-                return -1
-            elif s > other:
-                return 1
-            elif s == other:
-                return 0
+            return other.key
+        elif isinstance(other, basestring):
+            return slack_ts_key(other)
+        else:
+            return None
 
     def __lt__(self, other):
-        return self.__cmp__(other) < 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key < other_key
 
     def __le__(self, other):
-        return self.__cmp__(other) <= 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key <= other_key
 
     def __eq__(self, other):
-        return self.__cmp__(other) == 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key == other_key
 
     def __ne__(self, other):
-        return self.__cmp__(other) != 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key != other_key
 
     def __ge__(self, other):
-        return self.__cmp__(other) >= 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key >= other_key
 
     def __gt__(self, other):
-        return self.__cmp__(other) > 0
+        other_key = self._other_key(other)
+        return NotImplemented if other_key is None else self.key > other_key
 
     def __hash__(self):
-        return hash("{}.{}".format(self.major, self.minor))
+        return hash(self.key)
 
     def __repr__(self):
         return str("{0}.{1:06d}".format(self.major, self.minor))
@@ -3784,8 +3912,8 @@ def handle_rtmstart(login_data, eventrouter, team, channel, metadata):
             users,
             bots,
             channels,
-            muted_channels=notifications_prefs["muted_channels"],
-            highlight_words=notifications_prefs["global_keywords"] or "",
+            muted_channels=all_notifications_prefs["muted_channels"],
+            highlight_words=all_notifications_prefs["global_keywords"] or "",
         )
         eventrouter.register_team(t)
 